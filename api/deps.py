@@ -117,8 +117,13 @@ def get_allowlist() -> set[str]:
     return set(_load_models().keys())
 
 
+@lru_cache(maxsize=4)
 def get_guardrail_config(engine: str) -> GuardrailConfig:
-    """Build guardrail config, adding BQ project/dataset constraints when needed."""
+    """Build guardrail config once per engine, adding BQ project/dataset constraints.
+
+    The config is shared across requests so its normalized allow-list sets are computed
+    only once; callers must treat it as read-only.
+    """
     models = _load_models()
     allowlist = set(models.keys())
 
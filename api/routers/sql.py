@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import os
 import sys
 from pathlib import Path
 
@@ -20,7 +19,7 @@ from api.models import (
     ValidateSqlResponse,
 )
 from whyline.engines import bigquery_engine
-from whyline.llm import adapt_sql_for_engine, build_prompt, call_provider
+from whyline.llm import LLM_PROVIDER, adapt_sql_for_engine, build_prompt, call_provider_async
 from whyline.logs import prompt_cache
 from whyline.sql_guardrails import SqlValidationError, sanitize_sql
 
@@ -119,15 +118,16 @@ router = APIRouter()
 
 
 @router.post("/sql/generate", response_model=GenerateSqlResponse)
-def generate_sql(req: GenerateSqlRequest) -> GenerateSqlResponse:
+async def generate_sql(req: GenerateSqlRequest) -> GenerateSqlResponse:
     """
     Convert a natural language question to SQL using the LLM provider.
-    Checks prompt_cache before calling the LLM.
+    Checks prompt_cache before calling the LLM. The provider call is awaited so a
+    single worker can serve other requests while Gemini is thinking.
     """
     models = get_models()
     schema_brief = get_schema_brief()
     guardrail_config = get_guardrail_config(req.engine)
-    provider = os.getenv("LLM_PROVIDER", "stub").lower()
+    provider = LLM_PROVIDER
 
     # Convert FilterState to dict for prompt_cache and add_filter_clauses
     filters_dict = req.filters.model_dump()
@@ -150,7 +150,7 @@ def generate_sql(req: GenerateSqlRequest) -> GenerateSqlResponse:
     # No cache hit — call the LLM
     prompt = build_prompt(req.question, filters_dict, schema_brief)
     try:
-        llm_output = call_provider(prompt)
+        llm_output = await call_provider_async(prompt)
     except NotImplementedError as exc:
         return GenerateSqlResponse(sql="", explanation="", error=str(exc))
     except Exception as exc:
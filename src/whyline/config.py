@@ -1,5 +1,6 @@
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Final
 
@@ -76,5 +77,12 @@ class Settings:
             raise ValueError("ENGINE must be duckdb or bigquery")
 
 
-settings = Settings()
-settings.validate()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide validated Settings; field defaults are read from the env once."""
+    resolved = Settings()
+    resolved.validate()
+    return resolved
+
+
+settings = get_settings()
@@ -1,7 +1,9 @@
+import atexit
 import os
 from functools import lru_cache
 
 import pandas as pd
+import pyarrow as pa
 from google.api_core import exceptions
 from google.auth.exceptions import DefaultCredentialsError
 from google.cloud import bigquery
@@ -22,47 +24,101 @@ def _client() -> bigquery.Client:
         ) from exc
 
 
+@lru_cache(maxsize=1)
+def _bqstorage_client():
+    """Shared Storage Read API client; None when google-cloud-bigquery-storage is absent.
+
+    Passing one client to to_arrow() reuses its gRPC channel across queries instead of
+    the per-call client that create_bqstorage_client=True builds and tears down.
+    """
+    try:
+        from google.cloud import bigquery_storage
+    except ImportError:  # pragma: no cover - optional dependency at runtime
+        return None
+    return bigquery_storage.BigQueryReadClient()
+
+
+# Set once the Storage Read API refuses this identity (e.g. missing readsessions.create).
+_bqstorage_denied = False
+
+
 @lru_cache(maxsize=1)
 def _allowed_models():
     return DbtArtifacts().allowed_models()
 
 
+@lru_cache(maxsize=512)
 def _adapt(sql: str) -> str:
     return adapt_sql_for_engine(sql, "bigquery", _allowed_models())
 
 
 def _dry_run_bytes(sql: str) -> int:
-    sql = _adapt(sql)
+    return _dry_run_bytes_adapted(_adapt(sql))
+
+
+@lru_cache(maxsize=256)
+def _dry_run_bytes_adapted(sql: str) -> int:
+    # Keyed on the adapted SQL so repeat previews of the same query skip the API call.
     job = _client().query(
         sql, job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=True)
     )
     return job.total_bytes_processed
 
 
+@atexit.register
+def _close_clients() -> None:
+    # Only close clients that were actually created; never build one at shutdown.
+    if _client.cache_info().currsize:
+        _client().close()
+    _client.cache_clear()
+    _bqstorage_client.cache_clear()
+
+
+def reset() -> None:
+    """Drop memoized adaptations and byte estimates (e.g. after the marts are rebuilt)."""
+    _adapt.cache_clear()
+    _dry_run_bytes_adapted.cache_clear()
+
+
 def estimate(sql: str) -> dict[str, int]:
     return {"bq_est_bytes": _dry_run_bytes(sql)}
 
 
+# Keep the nullable integer/boolean dtypes that RowIterator.to_dataframe produced.
+_PANDAS_TYPES = {pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype()}
+
+
 def execute(sql: str) -> tuple[dict, pd.DataFrame]:
+    stats, table = execute_arrow(sql)
+    # self_destruct releases each Arrow column as it is converted, so peak memory stays
+    # near one copy of the result instead of Arrow + pandas side by side.
+    df = table.to_pandas(self_destruct=True, split_blocks=True, types_mapper=_PANDAS_TYPES.get)
+    return stats, df
+
+
+def execute_arrow(sql: str) -> tuple[dict, pa.Table]:
+    """Run the query and return the result as an Arrow table, without a pandas copy."""
+    global _bqstorage_denied
     sql = _adapt(sql)
-    est_bytes = _dry_run_bytes(sql)
+    # query() returns as soon as the job is submitted, so the informational dry run
+    # overlaps the real execution instead of delaying it by a round-trip.
     job = _client().query(
         sql,
         job_config=bigquery.QueryJobConfig(
             maximum_bytes_billed=int(os.getenv("MAX_BYTES_BILLED", "2000000000"))
         ),
     )
+    est_bytes = _dry_run_bytes(sql)
     results = job.result()
+    storage_client = None if _bqstorage_denied else _bqstorage_client()
     try:
-        df = results.to_dataframe(create_bqstorage_client=True)
+        # Falls back to the REST download when the Storage API client is unavailable.
+        table = results.to_arrow(bqstorage_client=storage_client, create_bqstorage_client=False)
     except exceptions.PermissionDenied:
-        # Re-execute query since the RowIterator has already been consumed
-        job = _client().query(
-            sql,
-            job_config=bigquery.QueryJobConfig(
-                maximum_bytes_billed=int(os.getenv("MAX_BYTES_BILLED", "2000000000"))
-            ),
-        )
-        results = job.result()
-        df = results.to_dataframe(create_bqstorage_client=False)
-    return {"engine": "bigquery", "rows": len(df), "bq_est_bytes": est_bytes}, df
+        if storage_client is None:
+            raise
+        # Remember the refusal so later queries go straight to REST. The job has already
+        # finished, so a fresh iterator re-reads its results without re-running the query.
+        _bqstorage_denied = True
+        table = job.result().to_arrow(create_bqstorage_client=False)
+    return {"engine": "bigquery", "rows": table.num_rows, "bq_est_bytes": est_bytes}, table
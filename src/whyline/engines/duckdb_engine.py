@@ -1,6 +1,7 @@
 # ruff: noqa: I001
 from __future__ import annotations
 
+import hashlib
 import logging
 import os
 import shutil
@@ -10,8 +11,10 @@ from pathlib import Path
 
 import duckdb
 import pandas as pd
+import pyarrow as pa
 
 _thread_local = threading.local()
+_FINGERPRINT_BYTES = 64 * 1024
 _logger = logging.getLogger(__name__)
 
 
@@ -39,7 +42,8 @@ def _ensure_local_copy(src: Path) -> Path:
 
     If DUCKDB_COPY_LOCAL is not explicitly set to "0", copy the DB file to
     DUCKDB_LOCAL_PATH (default /tmp/warehouse.duckdb) on first access or when
-    the source has a newer mtime. Falls back to src if copy fails.
+    the source's fingerprint no longer matches the one recorded beside the copy.
+    Falls back to src if copy fails.
     """
     if os.getenv("DUCKDB_COPY_LOCAL", "1") == "0":
         _logger.debug("DUCKDB_COPY_LOCAL=0, using source path directly: %s", src)
@@ -49,15 +53,15 @@ def _ensure_local_copy(src: Path) -> Path:
     dst = Path(os.getenv("DUCKDB_LOCAL_PATH", str(default_local)))
     try:
         dst.parent.mkdir(parents=True, exist_ok=True)
+        fingerprint = _quick_fingerprint(src) if src.exists() else None
+        sidecar = dst.with_name(f"{dst.name}.fp")
         needs_copy = True
-        if dst.exists() and src.exists():
-            # Copy if source is newer or sizes differ
-            needs_copy = (src.stat().st_mtime > dst.stat().st_mtime) or (
-                src.stat().st_size != dst.stat().st_size
-            )
-        if needs_copy and src.exists():
-            _logger.info("Copying DuckDB from %s to %s", src, dst)
-            shutil.copy2(src, dst)
+        if dst.exists() and fingerprint is not None and sidecar.exists():
+            # mtimes are not trusted: remounted volumes can report new ones for the same file.
+            needs_copy = sidecar.read_text(encoding="utf-8") != fingerprint
+        if needs_copy and fingerprint is not None:
+            _stage_local_copy(src, dst)
+            sidecar.write_text(fingerprint, encoding="utf-8")
         elif dst.exists():
             _logger.debug("Using existing local DuckDB copy: %s", dst)
         return dst if dst.exists() else src
@@ -67,13 +71,57 @@ def _ensure_local_copy(src: Path) -> Path:
         return src
 
 
+def _quick_fingerprint(path: Path) -> str:
+    """Identify a DuckDB file by its size plus a hash of its first and last 64 KiB.
+
+    DuckDB rewrites its header blocks on every checkpoint, so the head changes whenever
+    the contents do, and reading 128 KiB is far cheaper than hashing the whole file.
+    """
+    size = path.stat().st_size
+    digest = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as handle:
+        digest.update(handle.read(_FINGERPRINT_BYTES))
+        if size > _FINGERPRINT_BYTES:
+            handle.seek(max(size - _FINGERPRINT_BYTES, _FINGERPRINT_BYTES))
+            digest.update(handle.read(_FINGERPRINT_BYTES))
+    return f"{size}:{digest.hexdigest()}"
+
+
+def _stage_local_copy(src: Path, dst: Path) -> None:
+    """Place ``src`` at ``dst``, hardlinking when possible and copying otherwise.
+
+    A hardlink is only used for read-only connections, since a writable connection
+    would modify the source through it. Either way the file is staged under a
+    temporary name and renamed into place so readers never see a partial copy.
+    """
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        if _read_only():
+            try:
+                os.link(src, tmp)
+                _logger.info("Hardlinked DuckDB %s to %s", src, dst)
+            except OSError:
+                # Cross-device or unsupported filesystem; fall back to a real copy.
+                pass
+        if not tmp.exists():
+            _logger.info("Copying DuckDB from %s to %s", src, dst)
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _read_only() -> bool:
+    return os.getenv("DUCKDB_READ_ONLY", "1") not in {"0", "false", "False"}
+
+
 def _create_connection_internal(db_path: Path) -> duckdb.DuckDBPyConnection:
     """Create a new DuckDB connection with configured PRAGMAs.
 
     This is the actual connection creation logic, separated for caching.
     """
-    read_only_env = os.getenv("DUCKDB_READ_ONLY", "1")
-    read_only = read_only_env not in {"0", "false", "False"}
+    read_only = _read_only()
 
     _logger.info("Opening DuckDB connection: path=%s, read_only=%s", db_path, read_only)
     con = duckdb.connect(database=str(db_path), read_only=read_only)
@@ -128,3 +176,21 @@ def execute(sql: str) -> tuple[dict, pd.DataFrame]:
     except Exception as exc:
         _logger.error("DuckDB query failed: %s", exc, exc_info=True)
         raise
+
+
+def execute_arrow(sql: str) -> tuple[dict, pa.Table]:
+    """Execute SQL query and return stats and the result as an Arrow table.
+
+    DuckDB hands Arrow buffers over without a pandas conversion, so callers that can
+    consume Arrow directly skip building a DataFrame altogether.
+    """
+    try:
+        con = _get_connection()
+        _logger.debug("Executing query: %s", sql[:200])
+        table = con.execute(sql).fetch_record_batch().read_all()
+        stats = {"engine": "duckdb", "rows": table.num_rows}
+        _logger.info("Query executed successfully: %d rows", table.num_rows)
+        return stats, table
+    except Exception as exc:
+        _logger.error("DuckDB query failed: %s", exc, exc_info=True)
+        raise
@@ -3,21 +3,23 @@
 from __future__ import annotations
 
 import argparse
-import gzip
 import os
 from collections.abc import Sequence
 from datetime import date, datetime
-from io import BytesIO
 from pathlib import Path
 from typing import Any, Union
 
 import pandas as pd
-import requests
 import yaml
 from dotenv import load_dotenv
 
 from whyline.ingest import io
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # pragma: no cover - PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader  # type: ignore[assignment]
+
 load_dotenv(override=False)
 
 CENSUS_BASE_URL = "https://api.census.gov/data"
@@ -88,15 +90,14 @@ def run(args: argparse.Namespace) -> int:
     )
 
     df = build_dataframe(rows, args.geo, args.year, var_config["vars"])
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    payload = gzip_compress(csv_bytes)
-    _write_bytes(output_path, payload, content_type="application/gzip")
+    size_bytes, hash_md5 = io.write_csv_gzip(df, output_path)
 
     manifest = build_manifest(
         extract_date=extract_date,
         filename=filename,
         df=df,
-        payload=payload,
+        size_bytes=size_bytes,
+        hash_md5=hash_md5,
         args=args,
         variables=var_config["vars"],
     )
@@ -165,7 +166,7 @@ def load_variables(path: Path, year: int) -> dict[str, Any]:
     if not path.exists():
         raise FileNotFoundError(f"Variable configuration not found: {path}")
     with path.open("r", encoding="utf-8") as handle:
-        config = yaml.safe_load(handle)
+        config = yaml.load(handle, Loader=_YamlLoader)
     if not config or "vars" not in config:
         raise ValueError(f"Variable configuration missing 'vars' section: {path}")
     if "year" in config and int(config["year"]) != year:
@@ -206,7 +207,7 @@ def fetch_acs_data(
     if api_key:
         params["key"] = api_key
 
-    response = requests.get(url, params=params, timeout=timeout)
+    response = io.http_get_with_retry(url, params=params, timeout=timeout, logger=LOGGER)
     response.raise_for_status()
     data = response.json()
     if not data or len(data) < 2:
@@ -221,11 +222,10 @@ def build_dataframe(
     variables: dict[str, str],
 ) -> pd.DataFrame:
     header, *rows = data
-    df = pd.DataFrame(rows, columns=header)
+    raw = pd.DataFrame(rows, columns=header)
 
     value_columns = list(variables.values())
-    for column in value_columns:
-        df[column] = pd.to_numeric(df[column], errors="coerce")
+    values = raw[value_columns].apply(pd.to_numeric, errors="coerce")
 
     alias_map = {
         "no_vehicle_households": "hh_no_vehicle",
@@ -236,35 +236,33 @@ def build_dataframe(
         "total_population": "pop_total",
     }
 
+    counts: dict[str, pd.Series] = {}
     for alias, output_name in alias_map.items():
         code = variables.get(alias)
         if not code:
             raise KeyError(f"Variable alias '{alias}' missing in configuration.")
-        df[output_name] = df[code]
-
-    df["name"] = df["NAME"]
-    df["year"] = int(year)
-    prefix = GEO_PREFIX[geo]
-
-    state_series = df["state"]
-    county_series = df["county"]
-    if geo == "tract":
-        tract_series = df["tract"]
-        df["geoid"] = prefix + state_series + county_series + tract_series
-    else:
-        tract_series = df["tract"]
-        block_series = df["block group"]
-        df["geoid"] = prefix + state_series + county_series + tract_series + block_series
-
-    df["pct_hh_no_vehicle"] = compute_ratio(df["hh_no_vehicle"], df["hh_total"])
-    df["pct_transit_commute"] = compute_ratio(df["workers_transit"], df["workers_total"])
-    df["pct_poverty"] = compute_ratio(df["persons_poverty"], df["pop_total"])
-
-    for column in ["pct_hh_no_vehicle", "pct_transit_commute", "pct_poverty"]:
-        df[column] = df[column].round(4)
-
-    result = df[COLUMNS_OUT].copy()
-    return result
+        counts[output_name] = values[code]
+
+    geoid_parts = ["county", "tract"] if geo == "tract" else ["county", "tract", "block group"]
+    geoid = GEO_PREFIX[geo] + raw["state"].str.cat(raw[geoid_parts])
+
+    # Built in COLUMNS_OUT order so the frame needs no trailing projection.
+    return pd.DataFrame(
+        {
+            "geoid": geoid,
+            "name": raw["NAME"],
+            "year": int(year),
+            **counts,
+            "pct_hh_no_vehicle": compute_ratio(counts["hh_no_vehicle"], counts["hh_total"]).round(
+                4
+            ),
+            "pct_transit_commute": compute_ratio(
+                counts["workers_transit"], counts["workers_total"]
+            ).round(4),
+            "pct_poverty": compute_ratio(counts["persons_poverty"], counts["pop_total"]).round(4),
+        },
+        copy=False,
+    )
 
 
 def compute_ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
@@ -278,7 +276,8 @@ def build_manifest(
     extract_date: str,
     filename: str,
     df: pd.DataFrame,
-    payload: bytes,
+    size_bytes: int,
+    hash_md5: str,
     args: argparse.Namespace,
     variables: dict[str, str],
 ) -> dict[str, Any]:
@@ -293,8 +292,8 @@ def build_manifest(
         "written_at_utc": io.utc_now_iso(),
         "file_count": 1,
         "row_count": int(len(df)),
-        "bytes": io.sizeof_bytes(payload),
-        "hash_md5": io.hash_bytes_md5(payload),
+        "bytes": size_bytes,
+        "hash_md5": hash_md5,
         "schema_version": "v1",
         "notes": f"ACS {args.year} {args.geo} level for state {args.state_fips} county {args.county_fips}",
         "year": int(args.year),
@@ -306,20 +305,13 @@ def build_manifest(
         "files": {
             filename: {
                 "row_count": int(len(df)),
-                "bytes": io.sizeof_bytes(payload),
-                "hash_md5": io.hash_bytes_md5(payload),
+                "bytes": size_bytes,
+                "hash_md5": hash_md5,
             }
         },
     }
 
 
-def gzip_compress(data: bytes) -> bytes:
-    buffer = BytesIO()
-    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
-        gz.write(data)
-    return buffer.getvalue()
-
-
 def _validate_iso_date(value: str, flag: str) -> None:
     if value is None:
         return
@@ -344,25 +336,5 @@ def _ensure_directory_target(path: PathLike) -> PathLike:
     return path
 
 
-def _write_bytes(path: PathLike, data: bytes, *, content_type: str) -> None:
-    if isinstance(path, str) and path.startswith("gs://"):
-        bucket, blob_path = _split_gcs_uri(path)
-        io.upload_bytes_gcs(bucket, blob_path, data, content_type)
-    else:
-        path_obj = Path(path) if isinstance(path, str) else path
-        path_obj.parent.mkdir(parents=True, exist_ok=True)
-        path_obj.write_bytes(data)
-
-
-def _split_gcs_uri(uri: str) -> tuple[str, str]:
-    if not uri.startswith("gs://"):
-        raise ValueError(f"Not a GCS URI: {uri}")
-    bucket_and_key = uri[5:]
-    if "/" not in bucket_and_key:
-        raise ValueError(f"GCS URI missing object path: {uri}")
-    bucket, key = bucket_and_key.split("/", 1)
-    return bucket, key
-
-
 if __name__ == "__main__":
     raise SystemExit(main())
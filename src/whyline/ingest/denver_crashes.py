@@ -3,11 +3,9 @@
 from __future__ import annotations
 
 import argparse
-import gzip
 from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import UTC, date, datetime, timedelta
-from io import BytesIO
 from math import atan, exp, pi
 from pathlib import Path
 from typing import Any, Union
@@ -84,16 +82,14 @@ def run(args: argparse.Namespace) -> int:
     )
 
     df = pd.DataFrame(records, columns=COLUMNS)
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    payload = gzip_compress(csv_bytes)
-
-    _write_bytes(output_path, payload, content_type="application/gzip")
+    size_bytes, hash_md5 = io.write_csv_gzip(df, output_path)
 
     manifest = build_manifest(
         extract_date=extract_date,
         since_date=since_date,
         source_url=args.source_url,
-        payload=payload,
+        size_bytes=size_bytes,
+        hash_md5=hash_md5,
         df=df,
         stats=stats,
     )
@@ -102,7 +98,7 @@ def run(args: argparse.Namespace) -> int:
         "Wrote %d rows to %s (bytes=%d hash=%s)",
         len(df),
         output_path,
-        len(payload),
+        size_bytes,
         manifest["hash_md5"],
     )
     return 0
@@ -171,6 +167,7 @@ def fetch_features(source_url: str, since_date: str, timeout: int) -> list[dict[
         "orderByFields": "first_occurrence_date",
     }
 
+    session = io.http_session()
     while True:
         batch_params = {
             **params,
@@ -182,6 +179,7 @@ def fetch_features(source_url: str, since_date: str, timeout: int) -> list[dict[
             params=batch_params,
             timeout=timeout,
             logger=LOGGER,
+            session=session,
         )
         data = response.json()
         batch = data.get("features") or []
@@ -289,7 +287,8 @@ def build_manifest(
     extract_date: str,
     since_date: str,
     source_url: str,
-    payload: bytes,
+    size_bytes: int,
+    hash_md5: str,
     df: pd.DataFrame,
     stats: Stats,
 ) -> dict[str, Any]:
@@ -307,8 +306,8 @@ def build_manifest(
         "written_at_utc": io.utc_now_iso(),
         "file_count": 1,
         "row_count": row_count,
-        "bytes": io.sizeof_bytes(payload),
-        "hash_md5": io.hash_bytes_md5(payload),
+        "bytes": size_bytes,
+        "hash_md5": hash_md5,
         "schema_version": "v1",
         "notes": notes,
         "since": since_date,
@@ -323,20 +322,13 @@ def build_manifest(
         "files": {
             OUTPUT_FILENAME: {
                 "row_count": row_count,
-                "bytes": io.sizeof_bytes(payload),
-                "hash_md5": io.hash_bytes_md5(payload),
+                "bytes": size_bytes,
+                "hash_md5": hash_md5,
             }
         },
     }
 
 
-def gzip_compress(data: bytes) -> bytes:
-    buffer = BytesIO()
-    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
-        gz.write(data)
-    return buffer.getvalue()
-
-
 def _derive_severity(
     severity_text_raw: str | None,
     seriously_injured: Any | None,
@@ -443,26 +435,6 @@ def _ensure_directory_target(path: PathLike) -> PathLike:
     return path
 
 
-def _write_bytes(path: PathLike, data: bytes, *, content_type: str) -> None:
-    if isinstance(path, str) and path.startswith("gs://"):
-        bucket, blob_path = _split_gcs_uri(path)
-        io.upload_bytes_gcs(bucket, blob_path, data, content_type)
-    else:
-        path_obj = Path(path) if isinstance(path, str) else path
-        path_obj.parent.mkdir(parents=True, exist_ok=True)
-        path_obj.write_bytes(data)
-
-
-def _split_gcs_uri(uri: str) -> tuple[str, str]:
-    if not uri.startswith("gs://"):
-        raise ValueError(f"Not a GCS URI: {uri}")
-    bucket_and_key = uri[5:]
-    if "/" not in bucket_and_key:
-        raise ValueError(f"GCS URI missing object path: {uri}")
-    bucket, key = bucket_and_key.split("/", 1)
-    return bucket, key
-
-
 def _safe_str(value: Any) -> str | None:
     if value in (None, ""):
         return None
@@ -3,15 +3,20 @@
 from __future__ import annotations
 
 import argparse
-import gzip
-import json
-from collections.abc import Sequence
-from dataclasses import dataclass
+import hashlib
+import os
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import date
+from itertools import islice
 from pathlib import Path
 from typing import Any
 
-import pandas as pd
+import numpy as np
+import orjson
+import requests
 
 from whyline.ingest import io
 
@@ -21,12 +26,24 @@ DEFAULT_SOURCE_URL = (
 )
 DEFAULT_STATE_FIPS = "08"
 DEFAULT_COUNTY_FIPS = "031"
+# Decimal places for returned coordinates; 6 is ~10 cm, well below tract boundary accuracy.
+GEOMETRY_PRECISION = 6
 
-OUTPUT_FILENAME = "tracts.csv.gz"
+OUTPUT_FILENAMES = {"csv_gz": "tracts.csv.gz", "parquet": "tracts.parquet"}
+OUTPUT_FILENAME = OUTPUT_FILENAMES["csv_gz"]
 COLUMNS = ["geoid", "name", "aland_m2", "awater_m2", "geometry_geojson"]
 
 LOGGER = io.get_logger(__name__)
 
+# Resolved field mappings are cached per layer URL; TIGERweb field names change rarely.
+FIELD_MAP_CACHE_DIR = Path(os.getenv("WLD_CACHE_DIR") or Path.home() / ".cache" / "whyline")
+FIELD_MAP_CACHE_TTL_SEC = 7 * 24 * 3600
+
+# Features are normalized in page-sized batches; only batches at least this large are
+# worth shipping to worker processes (Denver County itself has ~180 tracts).
+NORMALIZE_BATCH_SIZE = 2000
+PARALLEL_GEOMETRY_MIN_FEATURES = 500
+
 GEOID_CANDIDATES = ["GEOID", "GEOID20", "geoid", "GEOID10"]
 NAME_CANDIDATES = ["NAME", "NAMELSAD", "NAMELSAD20", "name"]
 ALAND_CANDIDATES = ["ALAND", "ALAND20", "AREA_LAND", "AREALAND"]
@@ -49,10 +66,10 @@ def run(args: argparse.Namespace) -> int:
         root = f"gs://{bucket.strip('/')}/raw"
 
     date_dir = _join_path(root, "denver_tracts", f"extract_date={extract_date}")
-    output_path = _join_path(date_dir, OUTPUT_FILENAME)
+    output_path = _join_path(date_dir, OUTPUT_FILENAMES[args.format])
 
     if io.exists(output_path):
-        if _output_has_records(output_path):
+        if _manifest_has_records(date_dir):
             LOGGER.info("Skipping ingest; %s already populated.", output_path)
             return 0
         LOGGER.warning("Existing output %s is empty; regenerating.", output_path)
@@ -64,10 +81,12 @@ def run(args: argparse.Namespace) -> int:
         args.source_url,
     )
 
+    session = io.http_session()
     try:
-        field_map = detect_field_mapping(
+        field_map = cached_field_mapping(
             source_url=args.source_url,
             timeout=args.timeout_sec,
+            session=session,
         )
     except Exception as exc:  # pragma: no cover - metadata failure
         LOGGER.error("Unable to inspect tract layer metadata: %s", exc)
@@ -75,21 +94,32 @@ def run(args: argparse.Namespace) -> int:
 
     LOGGER.debug("Resolved field mapping: %s", field_map)
 
+    stats = Stats(total=0, missing_geometry=0)
     try:
-        features = list(
-            fetch_features(
-                source_url=args.source_url,
-                state_fips=args.state_fips,
-                county_fips=args.county_fips,
-                timeout=args.timeout_sec,
-                field_map=field_map,
-            )
+        features = fetch_features(
+            source_url=args.source_url,
+            state_fips=args.state_fips,
+            county_fips=args.county_fips,
+            timeout=args.timeout_sec,
+            field_map=field_map,
+            session=session,
         )
+        # Pages are normalized and written as they arrive; only one page is held at a time.
+        # Worker processes start lazily, so small counties never pay for the pool.
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            rows = (
+                tuple(record[column] for column in COLUMNS)
+                for record in normalize_stream(features, field_map, stats, pool=pool)
+            )
+            if args.format == "parquet":
+                record_count = io.write_parquet_rows(rows, output_path, header=COLUMNS)
+            else:
+                record_count = io.write_csv_rows(rows, output_path, header=COLUMNS)
     except Exception as exc:  # pragma: no cover - network failure path
         LOGGER.error("Failed to fetch remote tracts: %s", exc)
         return 1
 
-    if not features:
+    if not stats.fetched:
         LOGGER.error(
             "No features returned for state=%s county=%s from %s. "
             "Verify the endpoint and query parameters.",
@@ -99,28 +129,24 @@ def run(args: argparse.Namespace) -> int:
         )
         return 1
 
-    LOGGER.info("Retrieved %d raw feature records.", len(features))
+    LOGGER.info("Retrieved %d raw feature records.", stats.fetched)
 
-    records, stats = normalize_records(features, field_map)
-    if not records:
+    if not record_count:
         LOGGER.error("Normalized dataset is empty; aborting ingest.")
         return 1
 
     LOGGER.info("Normalized tracts: %d rows; missing_geom=%d", stats.total, stats.missing_geometry)
 
-    df = pd.DataFrame(records, columns=COLUMNS)
-    io.write_csv(df, output_path, compression="gzip")
-
     manifest = build_manifest(
         extract_date=extract_date,
         args=args,
-        record_count=len(df),
+        record_count=record_count,
         stats=stats,
         source_url=args.source_url,
         output_path=output_path,
     )
     io.write_manifest(_ensure_dir_target(date_dir), manifest)
-    LOGGER.info("Wrote %d tracts to %s", len(df), output_path)
+    LOGGER.info("Wrote %d tracts to %s", record_count, output_path)
     return 0
 
 
@@ -132,30 +158,34 @@ def fetch_features(
     timeout: int,
     field_map: FieldMapping,
     page_size: int = 2000,
-) -> list[dict[str, Any]]:
-    """Paginate over the ArcGIS feature service and return raw feature dicts."""
-    features: list[dict[str, Any]] = []
+    session: requests.Session | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Paginate over the ArcGIS feature service, yielding raw feature dicts page by page."""
     offset = 0
     where_clause = "1=1"
-    if field_map.state_field and field_map.county_field:
+    # Defensive filter when layer-level filtering isn't available.
+    filter_locally = not (field_map.state_field and field_map.county_field)
+    if not filter_locally:
         where_clause = (
             f"{field_map.state_field}='{state_fips}' AND {field_map.county_field}='{county_fips}'"
         )
 
     base_params = {
         "where": where_clause,
-        "outFields": "*",
+        # Only the mapped attributes are read, so skip the layer's other 20-odd fields.
+        "outFields": ",".join(name for name in asdict(field_map).values() if name),
         "returnGeometry": "true",
         "outSR": 4326,
+        "geometryPrecision": GEOMETRY_PRECISION,
         "f": "json",
     }
 
     while True:
         params = {**base_params, "resultOffset": offset, "resultRecordCount": page_size}
         response = io.http_get_with_retry(
-            f"{source_url}/query", params=params, timeout=timeout, logger=LOGGER
+            f"{source_url}/query", params=params, timeout=timeout, logger=LOGGER, session=session
         )
-        payload = response.json()
+        payload = orjson.loads(response.content)
         if "error" in payload:
             LOGGER.warning(
                 "Tract query error (code=%s): %s",
@@ -163,28 +193,28 @@ def fetch_features(
                 payload["error"].get("message"),
             )
             LOGGER.debug("Tract query details: %s", payload["error"].get("details"))
-            break
+            return
         batch = payload.get("features") or []
         if not batch:
-            break
-        features.extend(batch)
+            return
+        for feature in batch:
+            if filter_locally and not _matches_fips(feature, field_map, state_fips, county_fips):
+                continue
+            yield feature
         if not payload.get("exceededTransferLimit"):
-            break
+            return
         offset += len(batch)
 
-    # Defensive filter when layer-level filtering isn't available.
-    if field_map.state_field and field_map.county_field:
-        return features
 
-    filtered: list[dict[str, Any]] = []
-    for feature in features:
-        attrs = feature.get("attributes") or {}
-        if field_map.state_field and attrs.get(field_map.state_field) != state_fips:
-            continue
-        if field_map.county_field and attrs.get(field_map.county_field) != county_fips:
-            continue
-        filtered.append(feature)
-    return filtered
+def _matches_fips(
+    feature: dict[str, Any], field_map: FieldMapping, state_fips: str, county_fips: str
+) -> bool:
+    attrs = feature.get("attributes") or {}
+    if field_map.state_field and attrs.get(field_map.state_field) != state_fips:
+        return False
+    if field_map.county_field and attrs.get(field_map.county_field) != county_fips:
+        return False
+    return True
 
 
 @dataclass
@@ -213,52 +243,82 @@ _DEFAULT_FIELD_MAPPING = FieldMapping(
 class Stats:
     total: int
     missing_geometry: int
+    fetched: int = 0
 
 
 def normalize_records(
-    features: list[dict[str, Any]], field_map: FieldMapping
+    features: Iterable[dict[str, Any]], field_map: FieldMapping
 ) -> tuple[list[dict[str, Any]], Stats]:
     """Convert raw ArcGIS features into flat CSV records."""
-    records: list[dict[str, Any]] = []
-    missing_geom = 0
-
-    for feature in features:
-        attrs = feature.get("attributes") or {}
-        geoid = attrs.get(field_map.geoid_field)
-        if not geoid:
-            continue
-        geometry = feature.get("geometry") or {}
-        geometry_geojson = arcgis_geometry_to_geojson(geometry)
-        if geometry_geojson is None:
-            missing_geom += 1
-            continue
-        record = {
-            "geoid": geoid,
-            "name": attrs.get(field_map.name_field) or attrs.get(field_map.geoid_field),
-            "aland_m2": attrs.get(field_map.aland_field) if field_map.aland_field else None,
-            "awater_m2": attrs.get(field_map.awater_field) if field_map.awater_field else None,
-            "geometry_geojson": geometry_geojson,
-        }
-        records.append(record)
-
-    stats = Stats(total=len(records), missing_geometry=missing_geom)
+    stats = Stats(total=0, missing_geometry=0)
+    records = list(normalize_stream(features, field_map, stats))
     return records, stats
 
 
+def normalize_stream(
+    features: Iterable[dict[str, Any]],
+    field_map: FieldMapping,
+    stats: Stats,
+    *,
+    pool: Executor | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield flat CSV records as features arrive, tallying counts into ``stats``.
+
+    Features are taken a page-sized batch at a time; when a ``pool`` is supplied and a batch
+    is large enough to repay the pickling, geometry conversion is spread across it.
+    """
+    iterator = iter(features)
+    while batch := list(islice(iterator, NORMALIZE_BATCH_SIZE)):
+        stats.fetched += len(batch)
+        keyed = [
+            (attrs, feature.get("geometry") or {})
+            for feature in batch
+            if (attrs := feature.get("attributes") or {}).get(field_map.geoid_field)
+        ]
+        geometries = [geometry for _, geometry in keyed]
+        if pool is not None and len(geometries) >= PARALLEL_GEOMETRY_MIN_FEATURES:
+            converted = pool.map(arcgis_geometry_to_geojson, geometries, chunksize=100)
+        else:
+            converted = map(arcgis_geometry_to_geojson, geometries)
+        for (attrs, _), geometry_geojson in zip(keyed, converted, strict=True):
+            if geometry_geojson is None:
+                stats.missing_geometry += 1
+                continue
+            stats.total += 1
+            yield _flat_record(attrs, field_map, geometry_geojson)
+
+
+def _flat_record(
+    attrs: dict[str, Any], field_map: FieldMapping, geometry_geojson: str
+) -> dict[str, Any]:
+    return {
+        "geoid": attrs.get(field_map.geoid_field),
+        "name": attrs.get(field_map.name_field) or attrs.get(field_map.geoid_field),
+        "aland_m2": attrs.get(field_map.aland_field) if field_map.aland_field else None,
+        "awater_m2": attrs.get(field_map.awater_field) if field_map.awater_field else None,
+        "geometry_geojson": geometry_geojson,
+    }
+
+
 def arcgis_geometry_to_geojson(geometry: dict[str, Any]) -> str | None:
     """Convert an ArcGIS polygon geometry dict into a GeoJSON string."""
     rings = geometry.get("rings")
     if not rings:
         return None
 
-    polygons: list[list[list[list[float]]]] = []
-    current: list[list[list[float]]] | None = None
+    polygons: list[list[np.ndarray]] = []
+    current: list[np.ndarray] | None = None
     for ring in rings:
         if len(ring) < 4:
             continue
-        area = _ring_area(ring)
+        coords = np.asarray(ring, dtype=np.float64)
+        area = _ring_area(coords)
         is_outer = area <= 0 or current is None
-        oriented_ring = _orient_ring(ring, area, is_outer)
+        # Clamp precision before serializing so the GeoJSON text stays short even when the
+        # service ignores geometryPrecision. orjson only takes C-contiguous ndarrays.
+        oriented_ring = np.ascontiguousarray(
+            _orient_ring(coords, area, is_outer).round(GEOMETRY_PRECISION)
+        )
         if is_outer:
             current = [oriented_ring]
             polygons.append(current)
@@ -272,28 +332,25 @@ def arcgis_geometry_to_geojson(geometry: dict[str, Any]) -> str | None:
         geo = {"type": "Polygon", "coordinates": polygons[0]}
     else:
         geo = {"type": "MultiPolygon", "coordinates": polygons}
-    return json.dumps(geo, separators=(",", ":"))
+    return orjson.dumps(geo, option=orjson.OPT_SERIALIZE_NUMPY).decode("ascii")
 
 
-def _ring_area(ring: list[list[float]]) -> float:
-    """Compute planar area of a linear ring; sign indicates orientation."""
-    area = 0.0
-    for idx in range(len(ring) - 1):
-        x1, y1 = ring[idx]
-        x2, y2 = ring[idx + 1]
-        area += (x1 * y2) - (x2 * y1)
-    return area / 2.0
+def _ring_area(ring: np.ndarray) -> float:
+    """Compute planar area of a linear ring (shoelace); sign indicates orientation."""
+    x = ring[:, 0]
+    y = ring[:, 1]
+    return float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])) / 2.0
 
 
-def _orient_ring(ring: list[list[float]], area: float, is_outer: bool) -> list[list[float]]:
+def _orient_ring(ring: np.ndarray, area: float, is_outer: bool) -> np.ndarray:
     """Ensure outer rings are CCW and holes are CW."""
     if area == 0:
         return ring
     desired_sign = 1 if is_outer else -1
     if area * desired_sign < 0:
-        oriented = list(reversed(ring))
-        if oriented[0] != oriented[-1]:
-            oriented.append(oriented[0])
+        oriented = ring[::-1]
+        if not np.array_equal(oriented[0], oriented[-1]):
+            oriented = np.vstack([oriented, oriented[:1]])
         return oriented
     return ring
 
@@ -362,6 +419,18 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--timeout-sec", type=int, default=60, help="HTTP timeout when fetching data."
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes for geometry conversion on large pages (default: CPU count).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(OUTPUT_FILENAMES),
+        default="csv_gz",
+        help="Output file format (default csv_gz, which the BigQuery loader reads).",
+    )
     return parser
 
 
@@ -379,59 +448,63 @@ def _ensure_dir_target(path: str | Path) -> str | Path:
     return path
 
 
-def _output_has_records(path: str | Path) -> bool:
-    target = str(path)
-    if target.startswith("gs://"):
-        return True
-    path_obj = Path(target)
-    if not path_obj.exists() or path_obj.stat().st_size == 0:
-        return False
-    try:
-        with gzip.open(path_obj, "rt", encoding="utf-8") as handle:
-            handle.readline()
-            return bool(handle.readline())
-    except OSError:
-        return False
+def _manifest_has_records(date_dir: str | Path) -> bool:
+    manifest = io.read_manifest(_ensure_dir_target(date_dir)) or {}
+    return manifest.get("record_count", 0) > 0
 
 
-def detect_field_mapping(*, source_url: str, timeout: int) -> FieldMapping:
-    """Inspect the layer to determine attribute field names.
+def cached_field_mapping(
+    *, source_url: str, timeout: int, session: requests.Session | None = None
+) -> FieldMapping:
+    """Return the layer's field mapping from the on-disk cache, detecting it when stale."""
+    digest = hashlib.md5(
+        source_url.encode("utf-8"), usedforsecurity=False
+    ).hexdigest()  # noqa: S324
+    cache_path = FIELD_MAP_CACHE_DIR / f"tract_field_map_{digest}.json"
+    try:
+        if time.time() - cache_path.stat().st_mtime < FIELD_MAP_CACHE_TTL_SEC:
+            return FieldMapping(**orjson.loads(cache_path.read_bytes()))
+    except (OSError, ValueError, TypeError):
+        pass
+
+    field_map = detect_field_mapping(source_url=source_url, timeout=timeout, session=session)
+    # Never pin the outage fallback; the next run should ask the layer again.
+    if field_map is not _DEFAULT_FIELD_MAPPING:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_bytes(orjson.dumps(asdict(field_map)))
+        except OSError as exc:
+            LOGGER.debug("Unable to cache field mapping at %s: %s", cache_path, exc)
+    return field_map
+
+
+def detect_field_mapping(
+    *, source_url: str, timeout: int, session: requests.Session | None = None
+) -> FieldMapping:
+    """Read the layer's field list from its metadata to determine attribute field names.
 
     Falls back to _DEFAULT_FIELD_MAPPING when the metadata endpoint returns an
     empty or non-JSON response (e.g. transient TIGER API outage).
     """
-    params = {
-        "where": "1=1",
-        "outFields": "*",
-        "returnGeometry": "false",
-        "resultRecordCount": 1,
-        "f": "json",
-    }
     response = io.http_get_with_retry(
-        f"{source_url}/query", params=params, timeout=timeout, logger=LOGGER
+        source_url, params={"f": "json"}, timeout=timeout, logger=LOGGER, session=session
     )
     try:
-        payload = response.json()
+        payload = orjson.loads(response.content)
     except ValueError as exc:
         LOGGER.warning(
             "Metadata response was empty or non-JSON (%s); using default TIGER 2020 field mapping.",
             exc,
         )
         return _DEFAULT_FIELD_MAPPING
-    features = payload.get("features") or []
-    if not features:
-        LOGGER.warning(
-            "Layer returned no rows for metadata inspection; using default field mapping."
-        )
+    fields = {field.get("name") for field in payload.get("fields") or []}
+    if not fields:
+        LOGGER.warning("Layer metadata listed no fields; using default field mapping.")
         return _DEFAULT_FIELD_MAPPING
 
-    attrs: dict[str, Any] = features[0].get("attributes", {})
-    if not attrs:
-        raise RuntimeError("Layer feature missing attributes during inspection.")
-
     def pick(candidates: Sequence[str], *, required: bool) -> str | None:
         for candidate in candidates:
-            if candidate in attrs:
+            if candidate in fields:
                 return candidate
         if required:
             raise RuntimeError(f"Unable to resolve required field from candidates: {candidates}")
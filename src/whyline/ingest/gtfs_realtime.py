@@ -75,6 +75,8 @@ def run(args: argparse.Namespace) -> int:
         bucket = args.bucket[5:] if args.bucket.startswith("gs://") else args.bucket
         root = f"gs://{bucket.strip('/')}/raw"
 
+    # Both feeds live on one host; a shared session reuses its connection across snapshots.
+    session = io.http_session()
     captured = 0
     for index in range(args.snapshots):
         tick_start = time.time()
@@ -91,9 +93,11 @@ def run(args: argparse.Namespace) -> int:
             LOGGER.info("Skipping snapshot %s; manifest already present.", snapshot_label)
             continue
 
-        trip_updates_bytes, trip_updates_error = fetch_feed(args.trip_updates_url, args.timeout_sec)
+        trip_updates_bytes, trip_updates_error = fetch_feed(
+            args.trip_updates_url, args.timeout_sec, session=session
+        )
         vehicle_positions_bytes, vehicle_positions_error = fetch_feed(
-            args.vehicle_positions_url, args.timeout_sec
+            args.vehicle_positions_url, args.timeout_sec, session=session
         )
 
         trip_updates_df, trip_quality = parse_trip_updates(
@@ -229,9 +233,11 @@ def parse_route_filter(route_filter: str | None) -> set[str] | None:
     return routes or None
 
 
-def fetch_feed(url: str, timeout_sec: int) -> tuple[bytes | None, str | None]:
+def fetch_feed(
+    url: str, timeout_sec: int, *, session: requests.Session | None = None
+) -> tuple[bytes | None, str | None]:
     try:
-        response = io.http_get_with_retry(url, timeout=timeout_sec, logger=LOGGER)
+        response = io.http_get_with_retry(url, timeout=timeout_sec, logger=LOGGER, session=session)
     except requests.RequestException as exc:
         LOGGER.warning("Failed to fetch %s: %s", url, exc)
         return None, str(exc)
@@ -423,7 +429,7 @@ def build_manifest(
     }
 
     total_bytes = sum(meta["bytes"] for meta in files_meta.values())
-    combined_hash = io.hash_bytes_md5(trip_updates_payload + vehicle_positions_payload)
+    combined_hash = io.hash_bytes_md5(trip_updates_payload, vehicle_positions_payload)
 
     notes_parts: list[str] = []
     if trip_updates_error:
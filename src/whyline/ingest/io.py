@@ -2,19 +2,36 @@
 
 from __future__ import annotations
 
-import gzip
+import csv
 import hashlib
-import json
 import logging
 import os
+import tempfile
 import time
+from collections.abc import Iterable, Sequence
 from datetime import UTC, datetime
-from io import BytesIO
+from io import BytesIO, TextIOWrapper
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Union
+from typing import TYPE_CHECKING, Any, BinaryIO, Union
 
+import orjson
 import pandas as pd
+import pyarrow as pa
 import requests
+from pyarrow import csv as pa_csv
+from requests.adapters import HTTPAdapter
+
+try:
+    from isal import igzip as gzip  # type: ignore
+
+    GZIP_LEVEL = 2  # ISA-L levels run 0-3; 2 trades speed and ratio like zlib's 6.
+except ImportError:  # pragma: no cover - optional dependency at runtime
+    import gzip
+
+    GZIP_LEVEL = 6
+
+if os.getenv("WLD_FAST_GZIP") == "1":
+    GZIP_LEVEL = 1  # Raw extracts are reloaded, not archived; favour speed over ratio.
 
 try:
     from google.cloud import storage  # type: ignore
@@ -29,6 +46,10 @@ else:  # pragma: no cover
 PathLike = Union[str, Path]
 _GCS_CLIENT: Client | None = None
 
+# "arrow" serializes CSVs with pyarrow's C++ writer instead of pandas' Python row loop. It
+# quotes strings and writes booleans/timestamps in Arrow's spelling, so it is opt-in.
+CSV_WRITER = os.getenv("WLD_WRITER", "pandas").lower()
+
 _LOG_LEVEL_NAME = os.getenv("WLD_LOG_LEVEL", "INFO").upper()
 _LOG_LEVEL = getattr(logging, _LOG_LEVEL_NAME, logging.INFO)
 logging.basicConfig(
@@ -44,6 +65,15 @@ def get_logger(name: str) -> logging.Logger:
     return logger
 
 
+def http_session(pool_size: int = 4) -> requests.Session:
+    """Return a keep-alive session; retries stay with ``http_get_with_retry``."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 def http_get_with_retry(
     url: str,
     *,
@@ -53,15 +83,23 @@ def http_get_with_retry(
     retries: int = 3,
     backoff_factor: float = 1.5,
     logger: logging.Logger | None = None,
+    session: requests.Session | None = None,
 ) -> requests.Response:
-    """Perform an HTTP GET with exponential backoff for transient errors."""
+    """
+    Perform an HTTP GET with exponential backoff for transient errors.
+
+    Pass a ``session`` (see ``http_session``) when paging through one host so the
+    connection, including its TLS handshake, is reused across requests.
+    """
 
     logger = logger or logging.getLogger(__name__)
     attempt = 0
     delay = backoff_factor
     while True:
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=timeout)
+            response = (session or requests).get(
+                url, params=params, headers=headers, timeout=timeout
+            )
             if response.status_code >= 500:
                 response.raise_for_status()
             return response
@@ -105,13 +143,15 @@ def write_csv(df: pd.DataFrame, path: PathLike, *, compression: str = "gzip") ->
     if not isinstance(df, pd.DataFrame):
         raise TypeError("write_csv expects a pandas.DataFrame")
 
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
     if compression not in (None, "gzip"):
         raise ValueError("compression must be 'gzip' or None")
+    text_buffer = BytesIO()
+    _write_csv_to(df, text_buffer)
+    csv_bytes = text_buffer.getvalue()
 
     if compression == "gzip":
         buffer = BytesIO()
-        with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
+        with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=GZIP_LEVEL) as gz:
             gz.write(csv_bytes)
         payload = buffer.getvalue()
         content_type = "application/gzip"
@@ -130,11 +170,176 @@ def write_csv(df: pd.DataFrame, path: PathLike, *, compression: str = "gzip") ->
             f.write(payload)
 
 
+def write_csv_rows(rows: Iterable[Sequence[Any]], path: PathLike, *, header: Sequence[str]) -> int:
+    """
+    Stream rows into a gzip CSV without building a DataFrame, returning the data row count.
+
+    Rows are written to a temporary file and only published once complete; nothing is
+    written when ``rows`` is empty. GCS targets are uploaded from the finished file.
+    """
+    target = str(path)
+    tmp_path = _staging_path(target, suffix=".csv.gz")
+    count = 0
+    try:
+        with gzip.open(
+            tmp_path, "wt", encoding="utf-8", newline="", compresslevel=GZIP_LEVEL
+        ) as handle:
+            writer = csv.writer(handle, lineterminator="\n")
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        if count:
+            _publish_file(tmp_path, target, content_type="application/gzip")
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return count
+
+
+def write_csv_gzip(df: pd.DataFrame, path: PathLike) -> tuple[int, str]:
+    """
+    Stream a DataFrame through gzip into ``path``, returning (compressed bytes, MD5 hex).
+
+    The CSV text is compressed as pandas emits it and the compressed bytes are hashed
+    on their way to disk, so no copy of the payload is ever held in memory whole.
+    """
+    target = str(path)
+    tmp_path = _staging_path(target, suffix=".csv.gz")
+    try:
+        with tmp_path.open("wb") as raw:
+            sink = HashingWriter(raw)
+            with gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=GZIP_LEVEL) as gz:
+                _write_csv_to(df, gz)
+        _publish_file(tmp_path, target, content_type="application/gzip")
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return sink.bytes_written, sink.hexdigest()
+
+
+def _write_csv_to(df: pd.DataFrame, handle: BinaryIO) -> None:
+    """Write ``df`` as UTF-8 CSV into a binary handle using the configured CSV writer."""
+    if CSV_WRITER == "arrow":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pa_csv.write_csv(table, handle)
+        return
+    # Detach rather than close so the caller's gzip/hash stream stays open.
+    text = TextIOWrapper(handle, encoding="utf-8", newline="")
+    df.to_csv(text, index=False)
+    text.flush()
+    text.detach()
+
+
+class HashingWriter:
+    """Binary write-through wrapper that tracks the MD5 and size of everything written."""
+
+    def __init__(self, inner: BinaryIO) -> None:
+        self.inner = inner
+        self.bytes_written = 0
+        self._hash = hashlib.md5(usedforsecurity=False)  # noqa: S324
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        self.bytes_written += len(data)
+        return self.inner.write(data)
+
+    def flush(self) -> None:
+        self.inner.flush()
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def write_parquet(df: pd.DataFrame, path: PathLike) -> tuple[int, str]:
+    """Write a DataFrame as ZSTD-compressed Parquet, returning (file bytes, MD5 hex)."""
+    target = str(path)
+    tmp_path = _staging_path(target, suffix=".parquet")
+    try:
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+        size, digest = _file_size_and_md5(tmp_path)
+        _publish_file(tmp_path, target, content_type="application/vnd.apache.parquet")
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return size, digest
+
+
+def write_parquet_rows(
+    rows: Iterable[Sequence[Any]], path: PathLike, *, header: Sequence[str]
+) -> int:
+    """Write row tuples as Parquet, returning the row count; nothing is written when empty."""
+    df = pd.DataFrame.from_records(rows, columns=list(header))
+    if df.empty:
+        return 0
+    write_parquet(df, path)
+    return len(df)
+
+
+def _file_size_and_md5(path: Path) -> tuple[int, str]:
+    with path.open("rb") as handle:
+        digest = hashlib.file_digest(
+            handle, lambda: hashlib.md5(usedforsecurity=False)  # noqa: S324
+        ).hexdigest()
+    return path.stat().st_size, digest
+
+
+def _staging_path(target: str, *, suffix: str) -> Path:
+    tmp_dir = None
+    if not _is_gcs_path(target):
+        tmp_dir = Path(target).parent
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(suffix=suffix, dir=tmp_dir)
+    os.close(fd)
+    return Path(tmp_name)
+
+
+def _publish_file(tmp_path: Path, target: str, *, content_type: str) -> None:
+    if _is_gcs_path(target):
+        bucket_name, blob_path = _split_gcs_uri(target)
+        blob = _get_gcs_client().bucket(bucket_name).blob(blob_path)
+        blob.upload_from_filename(str(tmp_path), content_type=content_type)
+    else:
+        os.replace(tmp_path, target)
+
+
 def write_manifest(path: PathLike, meta: dict[str, Any]) -> None:
     """Write a manifest.json adjacent to the provided file or directory."""
-    manifest_payload = json.dumps(meta, indent=2, sort_keys=True).encode("utf-8")
-    target = str(path)
+    manifest_payload = orjson.dumps(
+        meta, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+    target = _manifest_target(path)
+
+    if _is_gcs_path(target):
+        bucket_name, blob_path = _split_gcs_uri(target)
+        upload_bytes_gcs(bucket_name, blob_path, manifest_payload, "application/json")
+    else:
+        manifest_path = Path(target)
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_bytes(manifest_payload)
+
+
+def read_manifest(path: PathLike) -> dict[str, Any] | None:
+    """Return the manifest.json adjacent to a file or directory, or None if absent/invalid."""
+    target = _manifest_target(path)
+    if _is_gcs_path(target):
+        bucket_name, blob_path = _split_gcs_uri(target)
+        client = _get_gcs_client()
+        blob = client.bucket(bucket_name).blob(blob_path)
+        if not blob.exists(client=client):
+            return None
+        payload = blob.download_as_bytes(client=client)
+    else:
+        try:
+            payload = Path(target).read_bytes()
+        except OSError:
+            return None
+    try:
+        meta = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        return None
+    return meta if isinstance(meta, dict) else None
 
+
+def _manifest_target(path: PathLike) -> str:
+    target = str(path)
     if _is_gcs_path(target):
         bucket_name, blob_path = _split_gcs_uri(target)
         prefix = (
@@ -142,16 +347,11 @@ def write_manifest(path: PathLike, meta: dict[str, Any]) -> None:
             if blob_path.endswith("/")
             else f"{blob_path.rsplit('/', 1)[0]}/" if "/" in blob_path else ""
         )
-        manifest_blob = f"{prefix}manifest.json"
-        upload_bytes_gcs(bucket_name, manifest_blob, manifest_payload, "application/json")
-    else:
-        path_obj = Path(target)
-        if path_obj.suffix:
-            manifest_path = path_obj.parent / "manifest.json"
-        else:
-            manifest_path = path_obj / "manifest.json"
-        manifest_path.parent.mkdir(parents=True, exist_ok=True)
-        manifest_path.write_bytes(manifest_payload)
+        return f"gs://{bucket_name}/{prefix}manifest.json"
+    path_obj = Path(target)
+    if path_obj.suffix:
+        return str(path_obj.parent / "manifest.json")
+    return str(path_obj / "manifest.json")
 
 
 def upload_bytes_gcs(bucket: str, path: str, data: bytes, content_type: str) -> None:
@@ -174,9 +374,12 @@ def exists(path: PathLike) -> bool:
     return Path(target).exists()
 
 
-def hash_bytes_md5(data: bytes) -> str:
-    """Return hex digest of the provided bytes using MD5."""
-    return hashlib.md5(data, usedforsecurity=False).hexdigest()  # noqa: S324
+def hash_bytes_md5(*chunks: bytes) -> str:
+    """Return the MD5 hex digest of the given bytes, hashed in order without concatenating."""
+    hasher = hashlib.md5(usedforsecurity=False)  # noqa: S324
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.hexdigest()
 
 
 def sizeof_bytes(data: bytes) -> int:
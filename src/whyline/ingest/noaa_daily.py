@@ -4,15 +4,17 @@ from __future__ import annotations
 
 import argparse
 import csv
-import gzip
 import os
-from collections import defaultdict
+import threading
+import time
 from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
-from io import BytesIO
 from pathlib import Path
 from typing import Any, Union
 
+import numpy as np
+import orjson
 import pandas as pd
 import requests
 from dotenv import load_dotenv
@@ -26,7 +28,9 @@ DEFAULT_STATION = "USW00023062"
 DEFAULT_DATASET = "GHCND"
 DATATYPES = ["SNOW", "PRCP", "TMIN", "TMAX", "TAVG"]
 DEFAULT_LOCAL_SOURCE = Path("data/external/noaa_raw.csv")
-OUTPUT_FILENAME = "weather.csv.gz"
+OUTPUT_FILENAMES = {"csv_gz": "weather.csv.gz", "parquet": "weather.parquet"}
+OUTPUT_FILENAME = OUTPUT_FILENAMES["csv_gz"]
+# (label, lower, upper) with upper bounds inclusive; drives the pd.cut in build_dataframe.
 PRECIP_BINS = [
     ("none", 0, 0),
     ("light", 0, 5),
@@ -34,6 +38,20 @@ PRECIP_BINS = [
     ("heavy", 20, float("inf")),
 ]
 
+# Output column -> NOAA datatype it is read from.
+VALUE_COLUMNS = {
+    "snow_mm": "SNOW",
+    "precip_mm": "PRCP",
+    "tmin_c": "TMIN",
+    "tmax_c": "TMAX",
+    "tavg_c": "TAVG",
+}
+
+# CDO caps pages at 1000 results and API tokens at 5 requests per second.
+CDO_PAGE_LIMIT = 1000
+CDO_MAX_WORKERS = 5
+CDO_MAX_REQUESTS_PER_SEC = 5.0
+
 PathLike = Union[str, Path]
 LOGGER = io.get_logger(__name__)
 
@@ -56,7 +74,8 @@ def run(args: argparse.Namespace) -> int:
         root = f"gs://{bucket.strip('/')}/raw"
 
     date_dir = _join_path(root, "noaa_daily", f"extract_date={extract_date}")
-    output_path = _join_path(date_dir, OUTPUT_FILENAME)
+    output_filename = OUTPUT_FILENAMES[args.format]
+    output_path = _join_path(date_dir, output_filename)
 
     if io.exists(output_path):
         LOGGER.info("Skipping ingest; %s already exists.", output_path)
@@ -92,17 +111,20 @@ def run(args: argparse.Namespace) -> int:
 
     df = build_dataframe(raw_records, args.start, args.end, args.station)
 
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    payload = gzip_compress(csv_bytes)
-    _write_bytes(output_path, payload, content_type="application/gzip")
+    if args.format == "parquet":
+        size, hash_md5 = io.write_parquet(df, output_path)
+    else:
+        size, hash_md5 = io.write_csv_gzip(df, output_path)
 
     manifest = build_manifest(
         extract_date=extract_date,
         start=args.start,
         end=args.end,
         source=source_descriptor,
-        payload=payload,
+        size=size,
+        hash_md5=hash_md5,
         df=df,
+        filename=output_filename,
     )
     io.write_manifest(_ensure_directory_target(date_dir), manifest)
 
@@ -154,6 +176,12 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--timeout-sec", type=int, default=30, help="HTTP timeout for API requests."
     )
+    parser.add_argument(
+        "--format",
+        choices=sorted(OUTPUT_FILENAMES),
+        default="csv_gz",
+        help="Output file format (default csv_gz, which the BigQuery loader reads).",
+    )
     return parser
 
 
@@ -164,47 +192,84 @@ def fetch_noaa_cdo(
     start: str,
     end: str,
     timeout: int,
-) -> list[dict[str, Any]]:
-    headers = {"token": token}
-    records: dict[str, dict[str, Any]] = defaultdict(dict)
-    limit = 1000
-    offset = 1
+    session: requests.Session | None = None,
+) -> pd.DataFrame:
+    """
+    Fetch daily observations from the CDO API as one row per day, one column per datatype.
+
+    The first page reports the total result count, so the remaining offsets are requested
+    concurrently (throttled to NOAA's per-second limit) over one keep-alive session.
+    """
+    session = session or requests.Session()
     station_id = station if station.startswith("GHCND:") else f"GHCND:{station}"
+    throttle = _Throttle(CDO_MAX_REQUESTS_PER_SEC)
+
+    def fetch_page(offset: int) -> dict[str, Any]:
+        throttle.wait()
+        response = session.get(
+            CDO_API_URL,
+            headers={"token": token},
+            params=_cdo_params(station_id, start, end, offset),
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
 
-    while True:
-        params = {
-            "datasetid": DEFAULT_DATASET,
-            "stationid": station_id,
-            "startdate": f"{start}T00:00:00",
-            "enddate": f"{end}T23:59:59",
-            "limit": limit,
-            "offset": offset,
-            "units": "metric",
-        }
-        for dt in DATATYPES:
-            params.setdefault("datatypeid", []).append(dt)
+    first = fetch_page(1)
+    pages = [first.get("results", [])]
+    total = ((first.get("metadata") or {}).get("resultset") or {}).get("count", 0)
+    offsets = range(1 + CDO_PAGE_LIMIT, int(total) + 1, CDO_PAGE_LIMIT)
+    if pages[0] and offsets:
+        with ThreadPoolExecutor(max_workers=CDO_MAX_WORKERS) as pool:
+            pages.extend(page.get("results", []) for page in pool.map(fetch_page, offsets))
+
+    return _pivot_observations(pages, station)
+
+
+def _pivot_observations(pages: list[list[dict[str, Any]]], station: str) -> pd.DataFrame:
+    """Turn CDO (date, datatype, value) observations into one row per day in a single pivot."""
+    observations = pd.DataFrame.from_records(
+        [item for results in pages for item in results],
+        columns=["date", "station", "datatype", "value"],
+    )
+    observations["date"] = observations["date"].fillna("").str[:10]
+    observations = observations[observations["date"] != ""]
+    # Later observations of the same day/datatype win, matching the API's page order.
+    wide = observations.drop_duplicates(["date", "datatype"], keep="last").pivot(
+        index="date", columns="datatype", values="value"
+    )
+    codes = observations.groupby("date")["station"].first().str.split(":").str[-1]
+    wide["station"] = codes.where(codes.notna() & (codes != ""), station)
+    return wide.rename_axis(index="date", columns=None).reset_index()
 
-        response = requests.get(CDO_API_URL, headers=headers, params=params, timeout=timeout)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("results", [])
-        if not results:
-            break
-
-        for item in results:
-            day = item.get("date", "")[:10]
-            if not day:
-                continue
-            entry = records.setdefault(
-                day, {"date": day, "station": _extract_station_code(item.get("station"), station)}
-            )
-            entry[item.get("datatype")] = item.get("value")
 
-        if len(results) < limit:
-            break
-        offset += limit
+def _cdo_params(station_id: str, start: str, end: str, offset: int) -> dict[str, Any]:
+    return {
+        "datasetid": DEFAULT_DATASET,
+        "stationid": station_id,
+        "startdate": f"{start}T00:00:00",
+        "enddate": f"{end}T23:59:59",
+        "limit": CDO_PAGE_LIMIT,
+        "offset": offset,
+        "units": "metric",
+        "datatypeid": list(DATATYPES),
+    }
 
-    return list(records.values())
+
+class _Throttle:
+    """Space out request starts so concurrent workers stay under a per-second cap."""
+
+    def __init__(self, per_second: float) -> None:
+        self._interval = 1.0 / per_second
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self._interval
+        time.sleep(start - now)
 
 
 def load_local_csv(
@@ -236,36 +301,38 @@ def load_local_csv(
 
 
 def build_dataframe(
-    records: list[dict[str, Any]],
+    records: pd.DataFrame | list[dict[str, Any]],
     start: str,
     end: str,
     station: str,
 ) -> pd.DataFrame:
-    date_index = pd.date_range(start=start, end=end, freq="D")
-    mapped = {record["date"]: record for record in records if "date" in record}
-
-    rows: list[dict[str, Any]] = []
-    for dt in date_index.strftime("%Y-%m-%d"):
-        base = mapped.get(dt, {"date": dt, "station": station})
-        row = {
-            "date": dt,
-            "station": base.get("station") or station,
-            "snow_mm": _to_float(base.get("SNOW")),
-            "precip_mm": _to_float(base.get("PRCP")),
-            "tmin_c": _to_float(base.get("TMIN")),
-            "tmax_c": _to_float(base.get("TMAX")),
-            "tavg_c": _to_float(base.get("TAVG")),
+    dates = pd.date_range(start=start, end=end, freq="D").strftime("%Y-%m-%d")
+    raw = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(records)
+    if "date" in raw:
+        raw = raw.dropna(subset=["date"]).drop_duplicates("date", keep="last").set_index("date")
+    raw = raw.reindex(index=dates, columns=["station", *VALUE_COLUMNS.values()])
+    stations = raw["station"]
+
+    # Column-wise construction; pd.to_numeric coerces blanks/"NA"/garbage to NaN in C.
+    df = pd.DataFrame(
+        {
+            "date": dates,
+            "station": stations.where(stations.notna() & (stations != ""), station).to_numpy(),
+            **{
+                column: pd.to_numeric(raw[datatype], errors="coerce").astype("float64").to_numpy()
+                for column, datatype in VALUE_COLUMNS.items()
+            },
         }
-        rows.append(row)
-
-    df = pd.DataFrame(rows)
+    )
     df = _normalize_units(df)
     df["tavg_c"] = df["tavg_c"].combine_first((df["tmin_c"] + df["tmax_c"]) / 2)
     # Use Int64 (nullable integer) to preserve integer format even with NULLs
-    df["snow_day"] = (
-        df["snow_mm"].apply(lambda x: None if pd.isna(x) else int(x >= 1.0)).astype("Int64")
-    )
-    df["precip_bin"] = df["precip_mm"].apply(_precip_category)
+    df["snow_day"] = (df["snow_mm"] >= 1.0).astype("Int64").mask(df["snow_mm"].isna())
+    df["precip_bin"] = pd.cut(
+        df["precip_mm"],
+        bins=[-np.inf, *(upper for _, _, upper in PRECIP_BINS)],
+        labels=[label for label, _, _ in PRECIP_BINS],
+    ).astype(object)
     for column in ["snow_mm", "precip_mm", "tmin_c", "tmax_c", "tavg_c"]:
         if column in df:
             df[column] = df[column].round(2)
@@ -279,8 +346,10 @@ def build_manifest(
     start: str,
     end: str,
     source: str,
-    payload: bytes,
+    size: int,
+    hash_md5: str,
     df: pd.DataFrame,
+    filename: str = OUTPUT_FILENAME,
 ) -> dict[str, Any]:
     missing_rates = {
         column: float(df[column].isna().mean())
@@ -300,8 +369,8 @@ def build_manifest(
         "written_at_utc": io.utc_now_iso(),
         "file_count": 1,
         "row_count": int(len(df)),
-        "bytes": io.sizeof_bytes(payload),
-        "hash_md5": io.hash_bytes_md5(payload),
+        "bytes": size,
+        "hash_md5": hash_md5,
         "schema_version": "v1",
         "notes": f"Coverage {start} to {end}",
         "date_range": {"start": start, "end": end},
@@ -309,22 +378,15 @@ def build_manifest(
             "missing_rates": missing_rates,
         },
         "files": {
-            OUTPUT_FILENAME: {
+            filename: {
                 "row_count": int(len(df)),
-                "bytes": io.sizeof_bytes(payload),
-                "hash_md5": io.hash_bytes_md5(payload),
+                "bytes": size,
+                "hash_md5": hash_md5,
             }
         },
     }
 
 
-def gzip_compress(data: bytes) -> bytes:
-    buffer = BytesIO()
-    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
-        gz.write(data)
-    return buffer.getvalue()
-
-
 def _normalize_units(df: pd.DataFrame) -> pd.DataFrame:
     # NOAA CDO metric units are millimeters for precip/snow and Celsius for temperatures.
     # Some local CSV drops may retain tenths; detect by looking for integer-only columns.
@@ -338,44 +400,12 @@ def _normalize_units(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def _maybe_scale(series: pd.Series, *, factor: float, threshold: float) -> pd.Series:
-    series = series.astype(float)
-    non_null = series.dropna()
-    if non_null.empty:
-        return series
-    max_abs = non_null.abs().max()
-    if max_abs >= threshold:
-        return series * factor
+    # max() skips NaN and yields NaN for an all-null column, which fails the comparison.
+    if series.abs().max() >= threshold:
+        return series.mul(factor)
     return series
 
 
-def _precip_category(value: float | None) -> str | None:
-    if value is None or pd.isna(value):
-        return None
-    mm = float(value)
-    if mm <= 0:
-        return "none"
-    if mm <= 5:
-        return "light"
-    if mm <= 20:
-        return "mod"
-    return "heavy"
-
-
-def _to_float(value: Any) -> float | None:
-    if value in (None, "", "NA"):
-        return None
-    try:
-        return float(value)
-    except (TypeError, ValueError):
-        return None
-
-
-def _extract_station_code(value: str | None, default: str) -> str:
-    if not value:
-        return default
-    return value.split(":")[-1]
-
-
 def _validate_iso_date(value: str, flag: str) -> None:
     try:
         datetime.strptime(value, "%Y-%m-%d")
@@ -398,26 +428,6 @@ def _ensure_directory_target(path: PathLike) -> PathLike:
     return path
 
 
-def _write_bytes(path: PathLike, data: bytes, *, content_type: str) -> None:
-    if isinstance(path, str) and path.startswith("gs://"):
-        bucket, blob_path = _split_gcs_uri(path)
-        io.upload_bytes_gcs(bucket, blob_path, data, content_type)
-    else:
-        path_obj = Path(path) if isinstance(path, str) else path
-        path_obj.parent.mkdir(parents=True, exist_ok=True)
-        path_obj.write_bytes(data)
-
-
-def _split_gcs_uri(uri: str) -> tuple[str, str]:
-    if not uri.startswith("gs://"):
-        raise ValueError(f"Not a GCS URI: {uri}")
-    bucket_and_key = uri[5:]
-    if "/" not in bucket_and_key:
-        raise ValueError(f"GCS URI missing object path: {uri}")
-    bucket, key = bucket_and_key.split("/", 1)
-    return bucket, key
-
-
 def COLUMNS_IN_ORDER() -> list[str]:
     return [
         "date",
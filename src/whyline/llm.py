@@ -4,7 +4,9 @@ import json
 import os
 import re
 from functools import lru_cache
-from typing import Any, Dict, Mapping
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Callable, Dict, Mapping, Sequence
 
 try:
     import google.generativeai as genai
@@ -12,57 +14,156 @@ except ImportError:  # pragma: no cover - optional dependency for stub mode
     genai = None
 
 from whyline.config import settings
+from whyline.llm_cache import llm_cache
 from whyline.semantics.dbt_artifacts import ModelInfo
 from whyline.sql_guardrails import CTE_PATTERN
 
+# Resolved once per process, like ``whyline.config.settings``; restart to switch providers.
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "stub").lower()
+
+# The whole opening fence line (including any language hint) or a trailing ``` fence.
+FENCE_RE = re.compile(r"\A\s*```[^\n]*\n?|```\s*\Z")
+
 
 def build_schema_brief(models: Mapping[str, ModelInfo], *, max_columns: int = 7) -> str:
     """Condense model metadata for prompt conditioning."""
 
-    lines: list[str] = []
-    for model in sorted(models.values(), key=lambda m: m.name):
-        description = (model.description or "")[:80]
-        column_names = ", ".join(list(model.columns.keys())[:max_columns])
-        line = f"{model.name}: {description} | cols: {column_names}"
-        lines.append(line.strip())
-    return "\n".join(lines)
+    # The brief only changes when the dbt artifacts do, so memoize on what it reads.
+    fingerprint = tuple(
+        (model.name, model.description, tuple(islice(model.columns, max_columns)))
+        for model in sorted(models.values(), key=attrgetter("name"))
+    )
+    return _schema_brief_from_fingerprint(fingerprint)
+
+
+@lru_cache(maxsize=8)
+def _schema_brief_from_fingerprint(
+    fingerprint: tuple[tuple[str, str | None, tuple[str, ...]], ...],
+) -> str:
+    return "\n".join(
+        f"{name}: {(description or '')[:80]} | cols: {', '.join(column_names)}".strip()
+        for name, description, column_names in fingerprint
+    )
+
+
+_PROMPT_INTRO = (
+    "You are a SQL generation assistant for the WhyLine Denver transit analytics platform.\n"
+    "You may query ONLY these models:\n"
+)
+_PROMPT_RULES = (
+    "- 'sql' must contain a single DuckDB/BigQuery compatible SELECT statement.\n"
+    "- Do not include semicolons or additional statements.\n"
+    "- 'explanation' must be 2-3 succinct sentences for non-technical transit stakeholders,\n"
+    "  describing what insights the query surfaces and why it matters.\n"
+    "- All FROM/JOIN sources must come from the allow-listed models; derive comparisons using CTEs or subqueries built on those tables.\n"
+    "- Keep results under 5,000 rows and honor recency cues by filtering service_date_mst within 30-90 days when appropriate.\n"
+    "- Treat the user filters below as scalar values only—never reference them as tables or views.\n"
+    "- Do not invent placeholder tables (e.g., filters, zero, baseline); name any CTEs you create based on the metrics being calculated.\n"
+    "- When analyzing crash trends described as 'this month', 'recent', or 'last few days', default to window_days = 30 on mart_crash_proximity_by_stop and anchor comparisons on the latest as_of_date values.\n"
+    "- Prefer analytic window functions such as LAG() and ROW_NUMBER() to calculate change over time instead of fabricating previous_* tables.\n"
+    "- Include severity metrics (fatal and severe crash counts) alongside total crashes when the question focuses on risk or hotspots.\n\n"
+)
+
+
+# Static text is assembled once at import; each request only formats the dynamic slots.
+_PROMPT_TMPL = (
+    _PROMPT_INTRO
+    + "{schema}\n\n"
+    + "Return a JSON object with keys 'sql' and 'explanation'.\n"
+    + _PROMPT_RULES
+    + "Question: {question}\n"
+    + "User filters (values only):\n"
+    + "{filters}\n"
+)
+_BATCH_PROMPT_TMPL = (
+    _PROMPT_INTRO
+    + "{schema}\n\n"
+    + "Return a JSON array with exactly one object per numbered question, in the same order.\n"
+    + "Each object must have keys 'sql' and 'explanation'.\n"
+    + _PROMPT_RULES
+    + "Questions:\n{questions}\n"
+)
 
 
 def build_prompt(question: str, filters: Mapping[str, Any] | None, schema_brief: str) -> str:
-    filters = filters or {}
     filters_serialized = json.dumps(filters, indent=2, sort_keys=True) if filters else "{}"
-    return (
-        "You are a SQL generation assistant for the WhyLine Denver transit analytics platform.\n"
-        "You may query ONLY these models:\n"
-        f"{schema_brief}\n\n"
-        "Return a JSON object with keys 'sql' and 'explanation'.\n"
-        "- 'sql' must contain a single DuckDB/BigQuery compatible SELECT statement.\n"
-        "- Do not include semicolons or additional statements.\n"
-        "- 'explanation' must be 2-3 succinct sentences for non-technical transit stakeholders,\n"
-        "  describing what insights the query surfaces and why it matters.\n"
-        "- All FROM/JOIN sources must come from the allow-listed models; derive comparisons using CTEs or subqueries built on those tables.\n"
-        "- Keep results under 5,000 rows and honor recency cues by filtering service_date_mst within 30-90 days when appropriate.\n"
-        "- Treat the user filters below as scalar values only—never reference them as tables or views.\n"
-        "- Do not invent placeholder tables (e.g., filters, zero, baseline); name any CTEs you create based on the metrics being calculated.\n"
-        "- When analyzing crash trends described as 'this month', 'recent', or 'last few days', default to window_days = 30 on mart_crash_proximity_by_stop and anchor comparisons on the latest as_of_date values.\n"
-        "- Prefer analytic window functions such as LAG() and ROW_NUMBER() to calculate change over time instead of fabricating previous_* tables.\n"
-        "- Include severity metrics (fatal and severe crash counts) alongside total crashes when the question focuses on risk or hotspots.\n\n"
-        f"Question: {question}\n"
-        "User filters (values only):\n"
-        f"{filters_serialized}\n"
+    return _PROMPT_TMPL.format(schema=schema_brief, question=question, filters=filters_serialized)
+
+
+def build_batch_prompt(
+    questions: Sequence[str],
+    filters_list: Sequence[Mapping[str, Any] | None],
+    schema_brief: str,
+) -> str:
+    """Pack several questions under one copy of the schema brief and instructions."""
+    numbered = "\n".join(
+        f"{index}. {question}\n   User filters (values only): "
+        f"{json.dumps(filters or {}, sort_keys=True)}"
+        for index, (question, filters) in enumerate(zip(questions, filters_list, strict=True), 1)
     )
+    return _BATCH_PROMPT_TMPL.format(schema=schema_brief, questions=numbered)
 
 
-def call_provider(prompt: str) -> Dict[str, str]:
-    provider = os.getenv("LLM_PROVIDER", "stub").lower()
+def call_provider_batch(
+    questions: Sequence[str],
+    filters_list: Sequence[Mapping[str, Any] | None],
+    schema_brief: str,
+) -> list[Dict[str, str]]:
+    """Answer several questions with a single provider call, in question order."""
+    if LLM_PROVIDER == "gemini":
+        prompt = build_batch_prompt(questions, filters_list, schema_brief)
+        items = _parse_batch_payload(_strip_code_fence(_gemini_text(prompt)))
+        if len(items) != len(questions):
+            raise RuntimeError(
+                f"Gemini returned {len(items)} answers for {len(questions)} questions."
+            )
+        return [_normalize_response(item) for item in items]
+
+    if LLM_PROVIDER in {"stub", "default"}:
+        return [
+            _stubbed_response(build_prompt(question, filters, schema_brief))
+            for question, filters in zip(questions, filters_list, strict=True)
+        ]
+
+    raise NotImplementedError(f"LLM provider '{LLM_PROVIDER}' is not implemented yet.")
 
-    if provider == "gemini":
-        return _gemini_response(prompt)
 
-    if provider in {"stub", "default"}:
+def call_provider(prompt: str) -> Dict[str, str]:
+    handler = _PROVIDERS.get(LLM_PROVIDER)
+    if handler is None:
+        raise NotImplementedError(f"LLM provider '{LLM_PROVIDER}' is not implemented yet.")
+    return handler(prompt)
+
+
+def _cached_gemini_response(prompt: str) -> Dict[str, str]:
+    key, cached = _gemini_cache_lookup(prompt)
+    if cached is not None:
+        return cached
+    response = _gemini_response(prompt)
+    llm_cache.set(key, response)
+    return response
+
+
+async def call_provider_async(prompt: str) -> Dict[str, str]:
+    """Like :func:`call_provider`, but awaits Gemini so the event loop stays free."""
+    if LLM_PROVIDER == "gemini":
+        key, cached = _gemini_cache_lookup(prompt)
+        if cached is not None:
+            return cached
+        response = await _gemini_response_async(prompt)
+        llm_cache.set(key, response)
+        return response
+
+    if LLM_PROVIDER in {"stub", "default"}:
         return _stubbed_response(prompt)
 
-    raise NotImplementedError(f"LLM provider '{provider}' is not implemented yet.")
+    raise NotImplementedError(f"LLM provider '{LLM_PROVIDER}' is not implemented yet.")
+
+
+def _gemini_cache_lookup(prompt: str) -> tuple[str, Dict[str, str] | None]:
+    """Return the cache key for a Gemini prompt and any cached response for it."""
+    key = llm_cache.make_key("gemini", os.getenv("GEMINI_MODEL", "gemini-2.5-flash"), prompt)
+    return key, llm_cache.get(key)
 
 
 @lru_cache(maxsize=1)
@@ -82,9 +183,70 @@ def _init_gemini_model():
 
 
 def _gemini_response(prompt: str) -> Dict[str, str]:
+    """Stream the answer, stopping as soon as the collected text parses (see _StreamedAnswer)."""
+    model = _init_gemini_model()
+    answer = _StreamedAnswer()
+    for event in model.generate_content(prompt, stream=True):
+        response = answer.add(event)
+        if response is not None:
+            return response
+    return answer.finish()
+
+
+async def _gemini_response_async(prompt: str) -> Dict[str, str]:
     model = _init_gemini_model()
-    response = model.generate_content(prompt)
+    answer = _StreamedAnswer()
+    async for event in await model.generate_content_async(prompt, stream=True):
+        response = answer.add(event)
+        if response is not None:
+            return response
+    return answer.finish()
+
+
+class _StreamedAnswer:
+    """Collect streamed chunks in a list and join them only when a parse is attempted.
+
+    A parse is only attempted when a chunk ends like a complete JSON document (or
+    closing fence), so the stream can be abandoned as soon as the payload is whole
+    instead of waiting on trailing chunks.
+    """
+
+    def __init__(self) -> None:
+        self.chunks: list[str] = []
+
+    def add(self, event: Any) -> Dict[str, str] | None:
+        chunk = _stream_chunk_text(event)
+        if not chunk:
+            return None
+        self.chunks.append(chunk)
+        if not chunk.rstrip().endswith(("}", "]", "```")):
+            return None
+        try:
+            data = json.loads(_strip_code_fence("".join(self.chunks)))
+        except json.JSONDecodeError:
+            return None
+        return _normalize_response(data)
+
+    def finish(self) -> Dict[str, str]:
+        text = "".join(self.chunks)
+        if not text:
+            raise RuntimeError("Gemini returned an empty response.")
+        return _parse_response_payload(_strip_code_fence(text))
+
+
+def _stream_chunk_text(event: Any) -> str:
+    try:
+        return event.text or ""
+    except ValueError:  # chunk without text parts, e.g. a bare finish_reason
+        return ""
+
 
+def _gemini_text(prompt: str) -> str:
+    model = _init_gemini_model()
+    return _response_text(model.generate_content(prompt))
+
+
+def _response_text(response: Any) -> str:
     text = getattr(response, "text", None)
     if not text and hasattr(response, "candidates"):
         parts = []
@@ -100,25 +262,13 @@ def _gemini_response(prompt: str) -> Dict[str, str]:
 
     if not text:
         raise RuntimeError("Gemini returned an empty response.")
-
-    payload = _strip_code_fence(text)
-    data = _parse_response_payload(payload)
-    return data
+    return text
 
 
 def _strip_code_fence(text: str) -> str:
     """Remove markdown code fences and language hints from model output."""
 
-    cleaned = text.strip()
-    if cleaned.startswith("```"):
-        cleaned = cleaned[3:]
-        if "\n" in cleaned:
-            _language, cleaned = cleaned.split("\n", 1)
-        else:
-            cleaned = ""
-    if cleaned.endswith("```"):
-        cleaned = cleaned[:-3]
-    return cleaned.strip().strip("`")
+    return FENCE_RE.sub("", text).strip().strip("`")
 
 
 def _parse_response_payload(payload: str) -> Dict[str, str]:
@@ -126,7 +276,20 @@ def _parse_response_payload(payload: str) -> Dict[str, str]:
         data = json.loads(payload)
     except json.JSONDecodeError as exc:  # pragma: no cover - defensive branch
         raise RuntimeError(f"Gemini response was not valid JSON: {exc}") from exc
+    return _normalize_response(data)
 
+
+def _parse_batch_payload(payload: str) -> list[Dict[str, Any]]:
+    try:
+        data = json.loads(payload)
+    except json.JSONDecodeError as exc:  # pragma: no cover - defensive branch
+        raise RuntimeError(f"Gemini response was not valid JSON: {exc}") from exc
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        raise RuntimeError("Gemini batch response was not a JSON array of objects.")
+    return data
+
+
+def _normalize_response(data: Mapping[str, Any]) -> Dict[str, str]:
     sql = _strip_code_fence(data.get("sql") or "").strip()
     explanation = (data.get("explanation") or "").strip()
     if not sql:
@@ -176,10 +339,13 @@ def adapt_sql_for_engine(
     sql: str, engine: str, models: Mapping[str, ModelInfo] | None = None
 ) -> str:
     transformed = sql
-    if engine == "duckdb":
+    # Substring checks skip the regex walk when there is nothing for it to rewrite.
+    if engine == "duckdb" and "DATE_SUB" in sql.upper():
         transformed = DATE_SUB_PATTERN.sub(_duckdb_date_sub_replacer, transformed)
     if engine == "bigquery" and models:
-        transformed = _qualify_bigquery_tables(transformed, models)
+        upper_sql = sql.upper()
+        if "FROM" in upper_sql or "JOIN" in upper_sql:
+            transformed = _qualify_bigquery_tables(transformed, models)
     return transformed
 
 
@@ -191,26 +357,40 @@ def _duckdb_date_sub_replacer(match: re.Match[str]) -> str:
 
 def _qualify_bigquery_tables(sql: str, models: Mapping[str, ModelInfo]) -> str:
     cte_names = {name.strip("`").lower() for name in CTE_PATTERN.findall(sql)}
-
-    def replacer(match: re.Match[str]) -> str:
-        table_token = match.group("table")
-        alias = match.group("alias") or ""
-        raw_table = table_token.strip("`")
-        if raw_table.lower() in cte_names:
-            return match.group(0)
-        if "." in raw_table:
-            return match.group(0)
+    prefix = f"{settings.GCP_PROJECT_ID}.{settings.BQ_DATASET_MART}."
+    pieces: list[str] = []
+    position = 0
+    for match in TABLE_PATTERN.finditer(sql):
+        raw_table = match.group("table").strip("`")
+        if "." in raw_table or raw_table.lower() in cte_names:
+            continue
         model = models.get(raw_table)
         table_name = model.name if model else raw_table
-        qualified = f"`{settings.GCP_PROJECT_ID}.{settings.BQ_DATASET_MART}.{table_name}`"
-        return f"{match.group('clause')} {qualified}{alias}"
+        # Only the clause and table are rewritten; any alias after them is kept verbatim.
+        pieces.extend(
+            (sql[position : match.start()], f"{match.group('clause')} `{prefix}{table_name}`")
+        )
+        position = match.end("table")
+    if not pieces:
+        return sql
+    pieces.append(sql[position:])
+    return "".join(pieces)
+
 
-    return TABLE_PATTERN.sub(replacer, sql)
+_PROVIDERS: Dict[str, Callable[[str], Dict[str, str]]] = {
+    "gemini": _cached_gemini_response,
+    "stub": _stubbed_response,
+    "default": _stubbed_response,
+}
 
 
 __all__ = [
+    "LLM_PROVIDER",
     "adapt_sql_for_engine",
     "build_prompt",
+    "build_batch_prompt",
     "build_schema_brief",
     "call_provider",
+    "call_provider_async",
+    "call_provider_batch",
 ]
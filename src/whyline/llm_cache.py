@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Protocol
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Any | None: ...
+
+    def set(self, key: str, value: Any, ttl_seconds: int) -> None: ...
+
+
+class MemoryBackend:
+    """Thread-safe in-process TTL cache that evicts the least recently used entry when full."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._store: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < now:
+                del self._store[key]
+                return None
+            self._store.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: int) -> None:
+        with self._lock:
+            self._store[key] = (time.monotonic() + ttl_seconds, value)
+            self._store.move_to_end(key)
+            while len(self._store) > self.max_entries:
+                self._store.popitem(last=False)
+
+
+class FileBackend:
+    """JSON-file-per-key cache that survives restarts and is shared between workers."""
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+
+    def get(self, key: str) -> Any | None:
+        path = self.root / f"{key}.json"
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) < time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return entry.get("value")
+
+    def set(self, key: str, value: Any, ttl_seconds: int) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps({"expires_at": time.time() + ttl_seconds, "value": value})
+        # Write then rename so concurrent readers never see a partial entry.
+        tmp_path = self.root / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, self.root / f"{key}.json")
+
+
+class LLMCache:
+    """Memoize provider responses keyed on the model and the exact prompt text."""
+
+    def __init__(
+        self, backend: CacheBackend | None = None, ttl_seconds: int = DEFAULT_TTL_SECONDS
+    ) -> None:
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl_seconds
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(provider: str, model: str | None, prompt: str) -> str:
+        payload = json.dumps(
+            {"provider": provider, "model": model, "prompt": prompt}, sort_keys=True
+        )
+        return sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Any | None:
+        value = self.backend.get(key)
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.backend.set(key, value, self.ttl)
+
+
+def _default_cache() -> LLMCache:
+    ttl = int(os.getenv("WLD_LLM_CACHE_TTL_SECONDS", str(DEFAULT_TTL_SECONDS)))
+    cache_dir = os.getenv("WLD_LLM_CACHE_DIR")
+    backend: CacheBackend = FileBackend(cache_dir) if cache_dir else MemoryBackend()
+    return LLMCache(backend, ttl_seconds=ttl)
+
+
+llm_cache = _default_cache()
+
+
+__all__ = ["CacheBackend", "FileBackend", "LLMCache", "MemoryBackend", "llm_cache"]
@@ -4,19 +4,35 @@ from __future__ import annotations
 
 import argparse
 import base64
+import csv
 import fnmatch
+import gzip
 import hashlib
-import json
 import logging
+import os
+import re
+import stat
 import sys
+import tempfile
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import UTC, date, datetime, timedelta
+from functools import lru_cache, partial
 from pathlib import Path
 from typing import Iterable, Iterator, Sequence
 
+import orjson
+import pyarrow as pa
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery, storage
+from pyarrow import csv as pa_csv
+from pyarrow import parquet as pq
+
+try:
+    import xxhash  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency at runtime
+    xxhash = None  # type: ignore[assignment]
 
 from whyline.config import settings
 from whyline.load.registry import JOBS, META_COLUMNS, JobSpec
@@ -27,6 +43,21 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s [%(levelnam
 RAW_ROOT_LOCAL = Path("data/raw")
 RAW_ROOT_GCS = "raw"
 INGESTION_LOG_TABLE = "__ingestion_log"
+HASH_WORKERS = os.cpu_count() or 1
+# Fingerprint for files that have no manifest or object-store hash. Switching an
+# existing deployment away from md5 makes such files look new once, so they reload.
+HASH_ALGO = os.getenv("WLD_HASH_ALGO", "md5")
+HASH_STREAM_CHUNK = 8 * 1024 * 1024
+CRC32C_PREFIX = "crc32c:"
+# Each batch becomes one load script over a single external table listing every URI;
+# keep the URI list and parameter payload well inside BigQuery's per-query limits.
+LOAD_BATCH_SIZE = 250
+# BigQuery's recommended maximum rows per streaming insert request.
+INGESTION_LOG_INSERT_BATCH = 500
+GCS_LIST_PAGE_SIZE = 1000
+GCS_LIST_WORKERS = 16
+# Discovery and hashing read only these fields; trimming them keeps listing pages small.
+GCS_LIST_FIELDS = "items(name,size,md5Hash,crc32c),nextPageToken"
 
 
 @dataclass
@@ -51,6 +82,33 @@ class PlanItem:
     hash_md5: str | None
     already_loaded: bool = False
     skip_reason: str | None = None
+    # CRC32C key of an object logged under its downloaded MD5; recorded once so later
+    # runs match it on object metadata alone.
+    crc32c_alias: str | None = None
+
+
+@dataclass
+class StagedFile:
+    """A plan item loaded by a batch, with the number of rows it appended."""
+
+    item: PlanItem
+    rows: int = 0
+
+
+class IngestionLogError(RuntimeError):
+    """Raised when ingestion log rows could not be streamed in."""
+
+
+class BatchLoadError(RuntimeError):
+    """Raised when part of a batch failed after other files in it were already appended.
+
+    ``log_rows`` holds the ingestion log rows for the files that did load, so the
+    caller can record them before the failure propagates.
+    """
+
+    def __init__(self, message: str, log_rows: list[dict]) -> None:
+        super().__init__(message)
+        self.log_rows = log_rows
 
 
 def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
@@ -58,9 +116,7 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     parser.add_argument(
         "--src", choices=("local", "gcs"), default="gcs", help="Input source location."
     )
-    parser.add_argument(
-        "--bucket", help="GCS bucket name (required for --src gcs, used for temp uploads)."
-    )
+    parser.add_argument("--bucket", help="GCS bucket name (required for --src gcs).")
     parser.add_argument(
         "--from",
         dest="start_date",
@@ -91,8 +147,9 @@ def main(argv: Sequence[str] | None = None) -> int:
     bucket = resolve_bucket(args)
     validate_max_files(args.max_files)
 
-    storage_client = storage.Client() if args.src in ("local", "gcs") else None
-    bq_client = bigquery.Client(project=settings.GCP_PROJECT_ID)
+    storage_client = _storage() if args.src == "gcs" else None
+    bq_client = _bq()
+    warm_clients(bq_client, storage_client, bucket)
 
     if not args.dry_run:
         ensure_ingestion_log_table(bq_client)
@@ -104,6 +161,7 @@ def main(argv: Sequence[str] | None = None) -> int:
         source=args.src,
         start_date=start_date,
         end_date=end_date,
+        max_files=args.max_files,
     )
     print_plan(plan, start=start_date, until=end_date, max_files=args.max_files)
 
@@ -111,18 +169,44 @@ def main(argv: Sequence[str] | None = None) -> int:
         LOGGER.info("Dry-run complete. No load jobs executed.")
         return 0
 
+    record_crc32c_aliases(bq_client, plan)
+
     files_to_load = select_load_candidates(plan, max_files=args.max_files)
-    loaded_count = execute_plan(
-        files_to_load,
-        bq_client=bq_client,
-        storage_client=storage_client,
-        bucket=bucket,
-    )
+    loaded_count = execute_plan(files_to_load, bq_client=bq_client)
 
     LOGGER.info("Completed load run: %d file(s) ingested.", loaded_count)
     return 0
 
 
+@lru_cache(maxsize=1)
+def _bq() -> bigquery.Client:
+    return bigquery.Client(project=settings.GCP_PROJECT_ID)
+
+
+@lru_cache(maxsize=1)
+def _storage() -> storage.Client:
+    return storage.Client()
+
+
+def warm_clients(
+    bq_client: bigquery.Client, storage_client: storage.Client | None, bucket: str | None
+) -> None:
+    """Open both clients' connections concurrently so their TLS handshakes overlap.
+
+    Uses calls the loader is already authorised for; failures are left for the real
+    requests to report.
+    """
+    calls = [lambda: bq_client.get_dataset(f"{settings.GCP_PROJECT_ID}.{settings.BQ_DATASET_RAW}")]
+    if storage_client is not None and bucket:
+        calls.append(lambda: list(storage_client.list_blobs(bucket, max_results=1)))
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        for future in [pool.submit(call) for call in calls]:
+            try:
+                future.result()
+            except Exception as exc:
+                LOGGER.debug("Client warm-up call failed: %s", exc)
+
+
 def parse_date_range(args: argparse.Namespace) -> tuple[date | None, date | None]:
     try:
         start_date = date.fromisoformat(args.start_date) if args.start_date else None
@@ -138,16 +222,9 @@ def parse_date_range(args: argparse.Namespace) -> tuple[date | None, date | None
 
 
 def resolve_bucket(args: argparse.Namespace) -> str | None:
-    bucket = args.bucket
-    if args.src == "gcs" and not bucket:
+    if args.src == "gcs" and not args.bucket:
         raise SystemExit("--bucket is required when --src gcs")
-    if args.src == "local" and not bucket:
-        bucket = settings.GCS_BUCKET
-    if args.src == "local" and not bucket:
-        raise SystemExit(
-            "--bucket must be provided (or GCS_BUCKET env set) when loading local files."
-        )
-    return bucket
+    return args.bucket
 
 
 def validate_max_files(max_files: int | None) -> None:
@@ -166,21 +243,51 @@ def execute_plan(
     files_to_load: Iterable[PlanItem],
     *,
     bq_client: bigquery.Client,
-    storage_client: storage.Client | None,
-    bucket: str | None,
 ) -> int:
     loaded_count = 0
-    for item in files_to_load:
-        load_file(
-            bq_client=bq_client,
-            storage_client=storage_client,
-            bucket=bucket,
-            item=item,
-        )
-        loaded_count += 1
+    # Log rows for the whole run are buffered and streamed in as few requests as possible.
+    # If a load fails, batches that loaded before it are still recorded; if a flush
+    # fails, it is not retried, so rows it already inserted are never written twice.
+    pending_log_rows: list[dict] = []
+    try:
+        for job, items in group_by_job(files_to_load):
+            for start in range(0, len(items), LOAD_BATCH_SIZE):
+                try:
+                    log_rows = load_batch(
+                        bq_client=bq_client,
+                        job=job,
+                        items=items[start : start + LOAD_BATCH_SIZE],
+                    )
+                except BatchLoadError as exc:
+                    # Files appended before the failure are recorded by the handler below.
+                    loaded_count += len(exc.log_rows)
+                    pending_log_rows += exc.log_rows
+                    raise
+                loaded_count += len(log_rows)
+                pending_log_rows += log_rows
+                if len(pending_log_rows) >= INGESTION_LOG_INSERT_BATCH:
+                    flush_ingestion_log(bq_client, pending_log_rows)
+    except IngestionLogError:
+        raise
+    except BaseException:
+        try:
+            flush_ingestion_log(bq_client, pending_log_rows)
+        except Exception as exc:
+            # Keep the load failure as the error the caller sees.
+            LOGGER.error("Failed to record ingestion log after a load failure: %s", exc)
+        raise
+    flush_ingestion_log(bq_client, pending_log_rows)
     return loaded_count
 
 
+def group_by_job(items: Iterable[PlanItem]) -> list[tuple[JobSpec, list[PlanItem]]]:
+    """Group plan items by destination job, preserving plan order."""
+    groups: dict[str, tuple[JobSpec, list[PlanItem]]] = {}
+    for item in items:
+        groups.setdefault(item.job.name, (item.job, []))[1].append(item)
+    return list(groups.values())
+
+
 def build_plan(
     *,
     bq_client: bigquery.Client,
@@ -189,13 +296,28 @@ def build_plan(
     source: str,
     start_date: date | None,
     end_date: date | None,
+    max_files: int | None = None,
 ) -> list[PlanItem]:
+    """Discover candidate files, hash them, and flag ones already in the ingestion log.
+
+    With ``max_files`` set, discovery stops as soon as that many files are confirmed
+    new, so the remaining listing pages are never requested.
+    """
     # Load ingestion log cache once for all deduplication checks
-    ingestion_cache = load_ingestion_log_cache(bq_client)
+    ingestion_cache = load_ingestion_log_cache(
+        bq_client,
+        prefixes=ingestion_log_prefixes(
+            source=source, bucket=bucket, start_date=start_date, end_date=end_date
+        ),
+    )
     LOGGER.info("Beginning file discovery and deduplication checks")
 
     plan: list[PlanItem] = []
+    pending: list[PlanItem] = []
+    confirmed_new = 0
     for job in JOBS:
+        if max_files is not None and confirmed_new >= max_files:
+            break
         files = discover_files(
             job=job,
             source=source,
@@ -205,43 +327,142 @@ def build_plan(
             end_date=end_date,
         )
         for file_ref in files:
-            if start_date and file_ref.extract_date and file_ref.extract_date < start_date:
+            skip_reason = date_skip_reason(file_ref, start_date=start_date, end_date=end_date)
+            if skip_reason:
                 plan.append(
-                    PlanItem(
-                        job=job,
-                        file=file_ref,
-                        hash_md5=None,
-                        skip_reason=f"extract_date {file_ref.extract_date} < {start_date}",
-                    )
+                    PlanItem(job=job, file=file_ref, hash_md5=None, skip_reason=skip_reason)
                 )
                 continue
-            if end_date and file_ref.extract_date and file_ref.extract_date > end_date:
-                plan.append(
-                    PlanItem(
-                        job=job,
-                        file=file_ref,
-                        hash_md5=None,
-                        skip_reason=f"extract_date {file_ref.extract_date} > {end_date}",
-                    )
-                )
+            item = PlanItem(
+                job=job,
+                file=file_ref,
+                hash_md5=hash_from_metadata(file_ref, storage_client),
+            )
+            defer_legacy_md5(item, ingestion_cache)
+            plan.append(item)
+            if item.hash_md5 is None:
+                # Unknown until hashed; it may turn out to be loaded, so it does not
+                # count towards max_files.
+                pending.append(item)
                 continue
-            hash_md5 = compute_file_hash(file_ref, storage_client)
-            already = already_loaded(
+            item.already_loaded = already_loaded(
                 ingestion_cache=ingestion_cache,
                 source_path=file_ref.source_path,
-                hash_md5=hash_md5,
+                hash_md5=item.hash_md5,
             )
-            plan.append(
-                PlanItem(
-                    job=job,
-                    file=file_ref,
-                    hash_md5=hash_md5,
-                    already_loaded=already,
-                )
+            if not item.already_loaded:
+                confirmed_new += 1
+                if max_files is not None and confirmed_new >= max_files:
+                    LOGGER.info("Found %d new file(s); stopping discovery early", max_files)
+                    break
+
+    # Manifest/object-metadata hashes are free; only the remainder needs file reads.
+    resolve_pending_hashes(pending, storage_client)
+
+    for item in pending:
+        if item.hash_md5:
+            item.already_loaded = already_loaded(
+                ingestion_cache=ingestion_cache,
+                source_path=item.file.source_path,
+                hash_md5=item.hash_md5,
             )
+    settle_crc32c_aliases(pending)
     return plan
 
 
+def date_skip_reason(
+    file_ref: FileRef, *, start_date: date | None, end_date: date | None
+) -> str | None:
+    extract = file_ref.extract_date
+    if start_date and extract and extract < start_date:
+        return f"extract_date {extract} < {start_date}"
+    if end_date and extract and extract > end_date:
+        return f"extract_date {extract} > {end_date}"
+    return None
+
+
+def defer_legacy_md5(item: PlanItem, ingestion_cache: set[bytes]) -> None:
+    """Send a CRC32C-keyed object back to content hashing if it was logged by MD5.
+
+    Objects without an MD5 used to be fingerprinted by downloading them. If the path is
+    in the log under such a hash but not under its CRC32C key, it is hashed once more
+    in resolve_pending_hashes, outside discovery, and the CRC32C key is kept as an
+    alias for settle_crc32c_aliases.
+    """
+    hashed = item.hash_md5
+    source_path = item.file.source_path
+    if (
+        hashed is not None
+        and hashed.startswith(CRC32C_PREFIX)
+        and item.file.blob is not None
+        and ingestion_log_path_key(source_path) in ingestion_cache
+        and ingestion_log_key(source_path, hashed) not in ingestion_cache
+    ):
+        item.crc32c_alias = hashed
+        item.hash_md5 = None
+
+
+def settle_crc32c_aliases(items: Sequence[PlanItem]) -> None:
+    """Key legacy objects that changed by CRC32C; unchanged ones keep the alias to record."""
+    for item in items:
+        if item.crc32c_alias and not item.already_loaded:
+            item.hash_md5, item.crc32c_alias = item.crc32c_alias, None
+
+
+def record_crc32c_aliases(bq_client: bigquery.Client, plan: Iterable[PlanItem]) -> None:
+    """Log the CRC32C key of already-loaded legacy objects so they are never downloaded again.
+
+    Alias rows carry ``rows = 0``: they record a second key for a load that is already
+    in the log, not a new load.
+    """
+    loaded_at = datetime.now(UTC).isoformat()
+    rows = [
+        {
+            "_source_path": item.file.source_path,
+            "_hash_md5": item.crc32c_alias,
+            "_loaded_at": loaded_at,
+            "table": item.job.table,
+            "rows": 0,
+        }
+        for item in plan
+        if item.crc32c_alias and item.already_loaded
+    ]
+    if rows:
+        LOGGER.info("Recording CRC32C keys for %d object(s) logged by MD5", len(rows))
+        flush_ingestion_log(bq_client, rows)
+
+
+def resolve_pending_hashes(
+    items: Sequence[PlanItem], storage_client: storage.Client | None
+) -> None:
+    """Fill in hashes that require reading file contents, fanning local files out to processes."""
+    local_items = [item for item in items if not item.file.is_gcs and item.file.local_path]
+    other_items = [item for item in items if item.file.is_gcs or not item.file.local_path]
+
+    workers = min(HASH_WORKERS, len(local_items))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = [str(item.file.local_path) for item in local_items]
+            digests = pool.map(partial(_hash_one, algo=HASH_ALGO), paths)
+            for item, digest in zip(local_items, digests, strict=True):
+                item.hash_md5 = digest
+    else:
+        for item in local_items:
+            item.hash_md5 = compute_file_hash(item.file, storage_client)
+
+    # Blobs carry a client connection and cannot be pickled; keep them in-process.
+    for item in other_items:
+        if item.crc32c_alias and item.file.blob is not None:
+            item.hash_md5 = md5_blob(item.file.blob)
+        else:
+            item.hash_md5 = compute_file_hash(item.file, storage_client)
+
+
+def _hash_one(path: str, algo: str) -> str:
+    """Process-pool entry point; must stay top-level so it can be pickled."""
+    return fingerprint_file(Path(path), algo=algo)
+
+
 def discover_files(
     *,
     job: JobSpec,
@@ -273,16 +494,20 @@ def discover_local_files(job: JobSpec) -> Iterator[FileRef]:
     root = RAW_ROOT_LOCAL
     for pattern in job.patterns:
         for path in root.glob(pattern):
-            if not path.is_file():
+            # One stat covers both the regular-file check and the size.
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
                 continue
             relative = path.relative_to(root).as_posix()
             extract = infer_extract_date(relative)
-            size = path.stat().st_size if path.exists() else None
             yield FileRef(
                 source_path=str(path),
                 relative_path=relative,
                 extract_date=extract,
-                size=size,
+                size=st.st_size,
                 is_gcs=False,
                 local_path=path,
             )
@@ -295,31 +520,77 @@ def discover_gcs_files(
     start_date: date | None,
     end_date: date | None,
 ) -> Iterator[FileRef]:
+    """Yield matching blobs lazily; pages are only fetched as the caller keeps iterating."""
+    root_prefix = f"{RAW_ROOT_GCS}/"
     for pattern in job.patterns:
+        matches = pattern_regex(pattern).match
+        literal_prefix = _base_gcs_prefix(pattern)
         prefixes = build_gcs_prefixes(pattern, start_date=start_date, end_date=end_date)
-        for full_prefix in prefixes:
-            for blob in storage_client.list_blobs(bucket, prefix=full_prefix):
-                if blob.name.endswith("/"):
+        for blobs in iter_gcs_listings(storage_client, bucket, prefixes):
+            for blob in blobs:
+                name = blob.name
+                if name.endswith("/"):
                     continue
-                relative = (
-                    blob.name[len(f"{RAW_ROOT_GCS}/") :]
-                    if blob.name.startswith(f"{RAW_ROOT_GCS}/")
-                    else blob.name
-                )
-                if not fnmatch.fnmatch(relative, pattern):
+                relative = name[len(root_prefix) :] if name.startswith(root_prefix) else name
+                # Cheap literal check first; the glob regex only sees plausible names.
+                if not relative.startswith(literal_prefix) or not matches(relative):
                     continue
-                extract = infer_extract_date(relative)
-                size = blob.size
                 yield FileRef(
-                    source_path=f"gs://{bucket}/{blob.name}",
+                    source_path=f"gs://{bucket}/{name}",
                     relative_path=relative,
-                    extract_date=extract,
-                    size=size,
+                    extract_date=infer_extract_date(relative),
+                    size=blob.size,
                     is_gcs=True,
                     blob=blob,
                 )
 
 
+_PATTERN_RE: dict[str, re.Pattern[str]] = {}
+
+
+def pattern_regex(pattern: str) -> re.Pattern[str]:
+    """Compiled regex for a job glob, translated once per process."""
+    regex = _PATTERN_RE.get(pattern)
+    if regex is None:
+        regex = _PATTERN_RE.setdefault(pattern, re.compile(fnmatch.translate(pattern)))
+    return regex
+
+
+def iter_gcs_listings(
+    storage_client: storage.Client, bucket: str, prefixes: Sequence[str]
+) -> Iterator[Iterable[storage.Blob]]:
+    """Yield each prefix's blobs in prefix order.
+
+    A single prefix is listed lazily so the caller can stop mid-listing. Date-range
+    prefixes are listed concurrently; each listing is bound by request latency, and
+    listings not yet started are cancelled if the caller stops early.
+    """
+    if len(prefixes) <= 1:
+        for prefix in prefixes:
+            yield storage_client.list_blobs(
+                bucket, prefix=prefix, page_size=GCS_LIST_PAGE_SIZE, fields=GCS_LIST_FIELDS
+            )
+        return
+
+    pool = ThreadPoolExecutor(max_workers=min(len(prefixes), GCS_LIST_WORKERS))
+    try:
+        futures = [
+            pool.submit(_list_gcs_prefix, storage_client, bucket, prefix) for prefix in prefixes
+        ]
+        for future in futures:
+            yield future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _list_gcs_prefix(storage_client: storage.Client, bucket: str, prefix: str) -> list:
+    return list(
+        storage_client.list_blobs(
+            bucket, prefix=prefix, page_size=GCS_LIST_PAGE_SIZE, fields=GCS_LIST_FIELDS
+        )
+    )
+
+
 def build_gcs_prefixes(
     pattern: str, *, start_date: date | None, end_date: date | None
 ) -> list[str]:
@@ -389,21 +660,31 @@ def infer_extract_date(path: str) -> date | None:
     return None
 
 
-def compute_file_hash(file_ref: FileRef, storage_client: storage.Client | None) -> str:
+def hash_from_metadata(file_ref: FileRef, storage_client: storage.Client | None) -> str | None:
+    """Return a hash available without reading file contents (manifest or object metadata)."""
     if not file_ref.is_gcs and file_ref.local_path:
-        hashed = hash_from_local_manifest(file_ref.local_path)
-        if hashed:
-            return hashed
-        return md5_file(file_ref.local_path)
+        return hash_from_local_manifest(file_ref.local_path)
     if file_ref.is_gcs and file_ref.blob:
         hashed = hash_from_gcs_manifest(file_ref.blob, storage_client)
         if hashed:
             return hashed
         if file_ref.blob.md5_hash:
             return base64.b64decode(file_ref.blob.md5_hash).hex()
-        if storage_client:
-            data = file_ref.blob.download_as_bytes()
-            return md5_bytes(data)
+        # Composite and some resumable uploads carry no MD5, but GCS always stores a
+        # CRC32C. Prefix it so it can never collide with an MD5 fingerprint.
+        if file_ref.blob.crc32c:
+            return f"{CRC32C_PREFIX}{base64.b64decode(file_ref.blob.crc32c).hex()}"
+    return None
+
+
+def compute_file_hash(file_ref: FileRef, storage_client: storage.Client | None) -> str:
+    hashed = hash_from_metadata(file_ref, storage_client)
+    if hashed:
+        return hashed
+    if not file_ref.is_gcs and file_ref.local_path:
+        return fingerprint_file(file_ref.local_path, algo=HASH_ALGO)
+    if file_ref.is_gcs and file_ref.blob and storage_client:
+        return md5_blob(file_ref.blob)
     raise RuntimeError(f"Unable to compute hash for {file_ref.source_path}")
 
 
@@ -426,13 +707,9 @@ def hash_from_local_manifest(path: Path) -> str | None:
 def load_local_manifest(directory: Path) -> dict | None:
     if directory in _MANIFEST_CACHE_LOCAL:
         return _MANIFEST_CACHE_LOCAL[directory]
-    manifest_path = directory / "manifest.json"
-    if not manifest_path.exists():
-        _MANIFEST_CACHE_LOCAL[directory] = {}
-        return {}
     try:
-        manifest = json.loads(manifest_path.read_text())
-    except json.JSONDecodeError:
+        manifest = orjson.loads((directory / "manifest.json").read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
         manifest = {}
     _MANIFEST_CACHE_LOCAL[directory] = manifest
     return manifest
@@ -447,11 +724,11 @@ def hash_from_gcs_manifest(blob: storage.Blob, storage_client: storage.Client |
         manifest = {}
         if storage_client:
             manifest_blob = blob.bucket.blob(f"{directory}/manifest.json")
-            if manifest_blob.exists(storage_client):
-                try:
-                    manifest = json.loads(manifest_blob.download_as_text())
-                except json.JSONDecodeError:
-                    manifest = {}
+            # One GET; a missing manifest surfaces as NotFound rather than a HEAD probe first.
+            try:
+                manifest = orjson.loads(manifest_blob.download_as_bytes(client=storage_client))
+            except (NotFound, orjson.JSONDecodeError):
+                manifest = {}
         _MANIFEST_CACHE_GCS[manifest_key] = manifest
     files = manifest.get("files") or {}
     entry = files.get(blob.name.rsplit("/", 1)[-1])
@@ -460,6 +737,21 @@ def hash_from_gcs_manifest(blob: storage.Blob, storage_client: storage.Client |
     return None
 
 
+def fingerprint_file(path: Path, *, algo: str) -> str:
+    """Hash a local file for dedup: MD5 hex, or ``xxh3_128:<hex>`` when configured."""
+    if algo == "md5":
+        return md5_file(path)
+    if algo != "xxh3_128":
+        raise ValueError(f"Unsupported WLD_HASH_ALGO {algo!r}; expected md5 or xxh3_128.")
+    if xxhash is None:
+        raise ImportError("xxhash is required for WLD_HASH_ALGO=xxh3_128 but is not installed.")
+    hasher = xxhash.xxh3_128(seed=0)
+    with path.open("rb") as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return f"xxh3_128:{hasher.hexdigest()}"
+
+
 def md5_file(path: Path) -> str:
     hasher = hashlib.md5(usedforsecurity=False)
     with path.open("rb") as fp:
@@ -470,19 +762,41 @@ def md5_file(path: Path) -> str:
     return hasher.hexdigest()
 
 
+def md5_blob(blob: storage.Blob) -> str:
+    """Stream an object through MD5 so memory stays at one chunk regardless of size."""
+    hasher = hashlib.md5(usedforsecurity=False)
+    with blob.open("rb", chunk_size=HASH_STREAM_CHUNK) as fp:
+        for chunk in iter(lambda: fp.read(HASH_STREAM_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
 def md5_bytes(data: bytes) -> str:
     return hashlib.md5(data, usedforsecurity=False).hexdigest()
 
 
+# Tables confirmed to exist in this process; every batch of a job shares one destination.
+_ENSURED_TABLES: set[str] = set()
+
+
 def ensure_ingestion_log_table(bq_client: bigquery.Client) -> None:
     dataset = settings.BQ_DATASET_RAW
     project = settings.GCP_PROJECT_ID
     table_id = f"{project}.{dataset}.{INGESTION_LOG_TABLE}"
-    try:
-        bq_client.get_table(table_id)
+    if table_id in _ENSURED_TABLES:
         return
+    try:
+        existing = bq_client.get_table(table_id)
     except NotFound:
-        pass
+        existing = None
+    if existing is not None:
+        if not existing.clustering_fields:
+            # Older log tables predate clustering; new rows pick it up from here on.
+            existing.clustering_fields = ["_source_path"]
+            bq_client.update_table(existing, ["clustering_fields"])
+            LOGGER.info("Clustered ingestion log table %s on _source_path", table_id)
+        _ENSURED_TABLES.add(table_id)
+        return
     schema = [
         bigquery.SchemaField("_source_path", "STRING", mode="REQUIRED"),
         bigquery.SchemaField("_hash_md5", "STRING", mode="REQUIRED"),
@@ -491,28 +805,51 @@ def ensure_ingestion_log_table(bq_client: bigquery.Client) -> None:
         bigquery.SchemaField("rows", "INT64", mode="REQUIRED"),
     ]
     table = bigquery.Table(table_id, schema=schema)
+    table.clustering_fields = ["_source_path"]
     bq_client.create_table(table)
+    _ENSURED_TABLES.add(table_id)
     LOGGER.info("Created ingestion log table %s", table_id)
 
 
-def load_ingestion_log_cache(bq_client: bigquery.Client) -> set[tuple[str, str]]:
+def load_ingestion_log_cache(
+    bq_client: bigquery.Client, *, prefixes: Sequence[str] | None = None
+) -> set[bytes]:
     """
-    Load entire ingestion log into memory for fast deduplication checks.
+    Load the ingestion log into memory for fast deduplication checks.
+
+    Each (_source_path, _hash_md5) pair is stored as a fixed 16-byte digest
+    (see ingestion_log_key) rather than a tuple of two strings, which keeps the
+    set roughly 4x smaller as the log grows while staying exact. Paths logged
+    under a content hash other than CRC32C also get a path-only key (see
+    ingestion_log_path_key) so defer_legacy_md5 can find them.
 
-    This function loads all (_source_path, _hash_md5) tuples into a set,
-    eliminating the need for individual BigQuery queries for each file check.
-    The table is small (~450KB, 3000 rows), making this approach efficient.
+    When ``prefixes`` is given, only log rows whose source path starts with one of
+    them are read; the log is clustered on ``_source_path`` so the scan stays
+    proportional to the run rather than the whole history.
 
     Returns:
-        Set of (source_path, hash_md5) tuples representing already-loaded files.
+        Set of ingestion log keys representing already-loaded files.
     """
     table_id = f"{settings.GCP_PROJECT_ID}.{settings.BQ_DATASET_RAW}.{INGESTION_LOG_TABLE}"
     query = f"SELECT _source_path, _hash_md5 FROM `{table_id}`"
+    params: list[bigquery.ArrayQueryParameter] = []
+    if prefixes:
+        query += (
+            "\nWHERE EXISTS (SELECT 1 FROM UNNEST(@prefixes) AS prefix"
+            " WHERE STARTS_WITH(_source_path, prefix))"
+        )
+        params.append(bigquery.ArrayQueryParameter("prefixes", "STRING", list(prefixes)))
 
     try:
         LOGGER.info("Loading ingestion log cache from %s", table_id)
-        result = bq_client.query(query).result()
-        cache = {(row._source_path, row._hash_md5) for row in result}
+        result = bq_client.query(
+            query, job_config=bigquery.QueryJobConfig(query_parameters=params)
+        ).result()
+        cache: set[bytes] = set()
+        for row in result:
+            cache.add(ingestion_log_key(row._source_path, row._hash_md5))
+            if not row._hash_md5.startswith(CRC32C_PREFIX):
+                cache.add(ingestion_log_path_key(row._source_path))
         LOGGER.info("Loaded %d entries into ingestion log cache", len(cache))
         return cache
     except NotFound:
@@ -523,10 +860,56 @@ def load_ingestion_log_cache(bq_client: bigquery.Client) -> set[tuple[str, str]]
         return set()
 
 
+def ingestion_log_prefixes(
+    *,
+    source: str,
+    bucket: str | None,
+    start_date: date | None,
+    end_date: date | None,
+) -> list[str]:
+    """Source-path prefixes this run can discover, used to scope the ingestion log read.
+
+    GCS discovery lists exactly the date prefixes from ``build_gcs_prefixes``, so the
+    log read can use the same ones. Local discovery globs every file and leaves the
+    date filter to ``date_skip_reason``, whose bounds differ (an ``--until``-only run
+    keeps every earlier file), so local runs are scoped by each pattern's base prefix.
+    """
+    prefixes: list[str] = []
+    for job in JOBS:
+        for pattern in job.patterns:
+            if source == "gcs":
+                candidates = [
+                    f"gs://{bucket}/{full_prefix}"
+                    for full_prefix in build_gcs_prefixes(
+                        pattern, start_date=start_date, end_date=end_date
+                    )
+                ]
+            else:
+                candidates = [f"{RAW_ROOT_LOCAL.as_posix()}/{_base_gcs_prefix(pattern)}"]
+            for prefix in candidates:
+                if prefix not in prefixes:
+                    prefixes.append(prefix)
+    return prefixes
+
+
+def ingestion_log_key(source_path: str, hash_md5: str) -> bytes:
+    """Compact membership key for a (source_path, hash) pair in the ingestion log."""
+    payload = f"{source_path}\0{hash_md5}".encode()
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def ingestion_log_path_key(source_path: str) -> bytes:
+    """Path-only key; the distinct ``person`` keeps it apart from ingestion_log_key digests."""
+    return hashlib.blake2b(source_path.encode(), digest_size=16, person=b"path").digest()
+
+
 def ensure_destination_table(bq_client: bigquery.Client, job: JobSpec) -> None:
     table_id = job.fq_table()
+    if table_id in _ENSURED_TABLES:
+        return
     try:
         bq_client.get_table(table_id)
+        _ENSURED_TABLES.add(table_id)
         return
     except NotFound:
         pass
@@ -539,15 +922,25 @@ def ensure_destination_table(bq_client: bigquery.Client, job: JobSpec) -> None:
     if job.clustering:
         table.clustering_fields = list(job.clustering.fields)
     bq_client.create_table(table)
+    _ENSURED_TABLES.add(table_id)
     LOGGER.info("Created table %s", table_id)
 
 
-def build_load_config(job: JobSpec) -> bigquery.LoadJobConfig:
+def build_load_config(job: JobSpec, *, parquet: bool = False) -> bigquery.LoadJobConfig:
+    """Load config for appending pre-stamped rows (CSV or Parquet) to the destination table."""
+    if parquet:
+        # Columns bind to the destination by name; the explicit schema keeps the
+        # destination's REQUIRED modes rather than letting the load infer them.
+        return bigquery.LoadJobConfig(
+            schema=job.table_schema(),
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
     csv_opts = job.csv_options
     return bigquery.LoadJobConfig(
-        schema=job.source_schema(),
+        schema=job.table_schema(),
         source_format=bigquery.SourceFormat.CSV,
-        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
         skip_leading_rows=csv_opts.skip_leading_rows,
         field_delimiter=csv_opts.field_delimiter,
         quote_character=csv_opts.quote_character,
@@ -559,7 +952,7 @@ def build_load_config(job: JobSpec) -> bigquery.LoadJobConfig:
 
 def already_loaded(
     *,
-    ingestion_cache: set[tuple[str, str]],
+    ingestion_cache: set[bytes],
     source_path: str,
     hash_md5: str,
 ) -> bool:
@@ -567,14 +960,14 @@ def already_loaded(
     Check if a file has already been loaded using in-memory cache.
 
     Args:
-        ingestion_cache: Set of (source_path, hash_md5) tuples from ingestion log
+        ingestion_cache: Set of ingestion log keys from load_ingestion_log_cache
         source_path: GCS URI or local path of the file
         hash_md5: MD5 hash of the file content
 
     Returns:
         True if file has already been loaded, False otherwise
     """
-    return (source_path, hash_md5) in ingestion_cache
+    return ingestion_log_key(source_path, hash_md5) in ingestion_cache
 
 
 def print_plan(
@@ -612,150 +1005,394 @@ def print_plan(
     )
 
 
-def load_file(
+def load_batch(
     *,
     bq_client: bigquery.Client,
-    storage_client: storage.Client | None,
-    bucket: str | None,
-    item: PlanItem,
-) -> None:
-    if item.hash_md5 is None:
+    job: JobSpec,
+    items: Sequence[PlanItem],
+) -> list[dict]:
+    """Load one batch of a job's files and return their ingestion log rows."""
+    if any(item.hash_md5 is None for item in items):
         raise RuntimeError("Cannot load file without hash.")
-    ensure_destination_table(bq_client, item.job)
-    load_config = build_load_config(item.job)
-    timestamp = datetime.now(UTC).strftime("%Y%m%d%H%M%S")
-    temp_table_name = f"__tmp_{item.job.name}_{timestamp}_{uuid.uuid4().hex[:8]}"
-    temp_table_id = f"{settings.GCP_PROJECT_ID}.{settings.BQ_DATASET_RAW}.{temp_table_name}"
-    temp_table = bigquery.Table(temp_table_id, schema=item.job.source_schema())
-    bq_client.create_table(temp_table)
-    LOGGER.info("Created temp table %s", temp_table_id)
-
-    remove_temp_blob: storage.Blob | None = None
-    source_uri: str
-    if item.file.is_gcs:
-        source_uri = item.file.source_path
-    else:
-        if storage_client is None or not bucket:
-            raise RuntimeError("Local loads require storage client and bucket.")
-        remove_temp_blob, source_uri = upload_local_to_tmp(
-            storage_client, bucket, item.file.local_path
+    ensure_destination_table(bq_client, job)
+    ingested_at = datetime.now(UTC)
+
+    loaded: list[StagedFile] = []
+    remote_items = [item for item in items if item.file.is_gcs]
+    local_items = [item for item in items if not item.file.is_gcs]
+    if remote_items:
+        loaded += stage_remote_files(
+            bq_client=bq_client, job=job, items=remote_items, ingested_at=ingested_at
+        )
+    if local_items:
+        try:
+            loaded += load_local_files(
+                bq_client=bq_client, job=job, items=local_items, ingested_at=ingested_at
+            )
+        except BatchLoadError as exc:
+            # The GCS files of this batch are already appended as well.
+            exc.log_rows = (
+                build_log_rows(job=job, staged=loaded, loaded_at=ingested_at) + exc.log_rows
+            )
+            raise
+    return build_log_rows(job=job, staged=loaded, loaded_at=ingested_at)
+
+
+def stage_remote_files(
+    *,
+    bq_client: bigquery.Client,
+    job: JobSpec,
+    items: Sequence[PlanItem],
+    ingested_at: datetime,
+) -> list[StagedFile]:
+    """Append a batch of GCS files with one scan and return their per-file row counts.
+
+    Everything runs as a single multi-statement query. One external table covers every
+    URI in the batch (one per compression type), and a script-scoped temp table
+    materialises it once with each row's ``_FILE_NAME``. The INSERT joins that name to
+    the per-file metadata, and a final SELECT reports row counts per file. The external
+    table is dropped by the script after it is read, or here if the script fails.
+    """
+    staged = [StagedFile(item=item) for item in items]
+    external_ids: list[str] = []
+    statements: list[str] = []
+    for compression, uris in group_uris_by_compression(items).items():
+        external_id = (
+            f"{settings.GCP_PROJECT_ID}.{settings.BQ_DATASET_RAW}._staging_{uuid.uuid4().hex}"
         )
+        external_ids.append(external_id)
+        statements.append(build_external_table_statement(job, external_id, uris, compression))
+    statements.append(
+        "CREATE TEMP TABLE staged AS\n"
+        + "\nUNION ALL\n".join(
+            f"SELECT *, _FILE_NAME AS _file FROM `{external_id}`" for external_id in external_ids
+        )
+    )
+    # Drop the external tables once materialised; the row counts must be the last
+    # statement, since a script's result is the result of its final statement.
+    statements += [f"DROP EXTERNAL TABLE `{external_id}`" for external_id in external_ids]
+    insert_sql, params = build_insert_statement(
+        job=job, staged=staged, dest_table_id=job.fq_table(), ingested_at=ingested_at
+    )
+    statements.append(insert_sql)
+    statements.append(
+        "SELECT _file AS source_path, COUNT(*) AS row_count FROM staged GROUP BY _file"
+    )
+    script = ";\n".join(statements)
+    LOGGER.debug("Executing load script:\n%s", script)
     try:
-        job = bq_client.load_table_from_uri(source_uri, temp_table_id, job_config=load_config)
-        result = job.result()
-        output_rows = result.output_rows or 0
+        result = bq_client.query(
+            script, job_config=bigquery.QueryJobConfig(query_parameters=params)
+        ).result()
+    except Exception:
+        for external_id in external_ids:
+            bq_client.delete_table(external_id, not_found_ok=True)
+        raise
+
+    row_counts = {row.source_path: row.row_count for row in result}
+    for staged_file in staged:
+        staged_file.rows = row_counts.get(staged_file.item.file.source_path, 0)
         LOGGER.info(
-            "Loaded %s rows from %s into temp table %s",
-            output_rows,
-            item.file.source_path,
-            temp_table_id,
+            "Loaded %s rows from %s into %s",
+            staged_file.rows,
+            staged_file.item.file.source_path,
+            job.fq_table(),
         )
-        ingested_at = datetime.now(UTC)
-        insert_rows_into_destination(
-            bq_client=bq_client,
-            job=item.job,
-            temp_table_id=temp_table_id,
-            dest_table_id=item.job.fq_table(),
-            ingested_at=ingested_at,
-            source_path=item.file.source_path,
-            extract_date=item.file.extract_date or ingested_at.date(),
-            hash_md5=item.hash_md5,
+    return staged
+
+
+def group_uris_by_compression(items: Sequence[PlanItem]) -> dict[str, list[str]]:
+    """Split URIs by external-table compression; unlike load jobs, it is not inferred."""
+    groups: dict[str, list[str]] = {}
+    for item in items:
+        uri = item.file.source_path
+        groups.setdefault("GZIP" if uri.endswith(".gz") else "NONE", []).append(uri)
+    return groups
+
+
+def build_external_table_statement(
+    job: JobSpec, external_id: str, uris: Sequence[str], compression: str
+) -> str:
+    csv_opts = job.csv_options
+    columns = ", ".join(f"`{col.name}` {col.field_type}" for col in job.columns)
+    options = [
+        "format = 'CSV'",
+        f"uris = [{', '.join(_sql_string(uri) for uri in uris)}]",
+        f"skip_leading_rows = {int(csv_opts.skip_leading_rows)}",
+        f"field_delimiter = {_sql_string(csv_opts.field_delimiter)}",
+        f"quote = {_sql_string(csv_opts.quote_character)}",
+        f"allow_quoted_newlines = {str(csv_opts.allow_quoted_newlines).lower()}",
+        f"encoding = {_sql_string(csv_opts.encoding)}",
+        f"null_marker = {_sql_string(csv_opts.null_marker)}",
+    ]
+    if compression != "NONE":
+        options.append(f"compression = {_sql_string(compression)}")
+    return f"CREATE EXTERNAL TABLE `{external_id}` ({columns}) OPTIONS ({', '.join(options)})"
+
+
+def _sql_string(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+def load_local_files(
+    *,
+    bq_client: bigquery.Client,
+    job: JobSpec,
+    items: Sequence[PlanItem],
+    ingested_at: datetime,
+) -> list[StagedFile]:
+    """Stage local files with their metadata columns and append them straight to the destination.
+
+    The files are read locally anyway, so writing the four metadata values onto each
+    row here avoids a temp table and an INSERT ... SELECT that rescans every row.
+    Files are staged as typed Parquet where possible, falling back to a stamped CSV,
+    and uploaded directly with the load job rather than via a temporary GCS object.
+    Each job appends independently, so a failure raises BatchLoadError carrying the
+    log rows of the files that did append.
+    """
+    submitted: list[tuple[StagedFile, bigquery.LoadJob]] = []
+    errors: list[BaseException] = []
+    with tempfile.TemporaryDirectory(prefix="whyline-load-") as workdir:
+        try:
+            for item in items:
+                staged_path, load_config = stage_local_file(
+                    item, job=job, workdir=Path(workdir), ingested_at=ingested_at
+                )
+                with staged_path.open("rb") as handle:
+                    load_job = bq_client.load_table_from_file(
+                        handle, job.fq_table(), rewind=True, job_config=load_config
+                    )
+                submitted.append((StagedFile(item=item), load_job))
+        except Exception as exc:
+            # Stop submitting, but still wait on the jobs already running below.
+            errors.append(exc)
+
+    # Each job appends on its own, so every submitted job is waited on even after a
+    # failure; the ones that succeeded must be logged or the next run loads them again.
+    loaded: list[StagedFile] = []
+    for staged_file, load_job in submitted:
+        try:
+            staged_file.rows = load_job.result().output_rows or 0
+        except Exception as exc:
+            errors.append(exc)
+            continue
+        loaded.append(staged_file)
+        LOGGER.info(
+            "Appended %s rows from %s into %s",
+            staged_file.rows,
+            staged_file.item.file.source_path,
+            job.fq_table(),
         )
-        record_loaded(
-            bq_client=bq_client,
-            job=item.job,
-            source_path=item.file.source_path,
-            hash_md5=item.hash_md5,
-            rows=output_rows,
-            loaded_at=ingested_at,
+    if errors:
+        raise BatchLoadError(
+            f"{len(errors)} local load(s) into {job.fq_table()} failed; "
+            f"{len(loaded)} file(s) were appended and will be logged",
+            build_log_rows(job=job, staged=loaded, loaded_at=ingested_at),
+        ) from errors[0]
+    return loaded
+
+
+def stage_local_file(
+    item: PlanItem, *, job: JobSpec, workdir: Path, ingested_at: datetime
+) -> tuple[Path, bigquery.LoadJobConfig]:
+    """Write a load-ready copy of a local file and return it with its load config."""
+    source = item.file.local_path
+    if source is None:
+        raise RuntimeError("Local path is required to upload.")
+    extract_date = item.file.extract_date or ingested_at.date()
+    target = workdir / uuid.uuid4().hex
+    try:
+        write_parquet_with_metadata(
+            source,
+            target.with_suffix(".parquet"),
+            job=job,
+            meta_values=(ingested_at, item.file.source_path, extract_date, item.hash_md5 or ""),
         )
-    finally:
-        bq_client.delete_table(temp_table_id, not_found_ok=True)
-        LOGGER.info("Dropped temp table %s", temp_table_id)
-        if remove_temp_blob:
-            remove_temp_blob.delete()
-            LOGGER.info(
-                "Deleted temp object gs://%s/%s",
-                remove_temp_blob.bucket.name,
-                remove_temp_blob.name,
-            )
+        return target.with_suffix(".parquet"), build_load_config(job, parquet=True)
+    # ValueError covers ArrowInvalid, undecodable text and nulls in REQUIRED columns.
+    except (ValueError, pa.ArrowNotImplementedError) as exc:
+        LOGGER.warning("Parquet staging failed for %s (%s); using CSV", source, exc)
+    stamp_metadata_columns(
+        source,
+        target.with_suffix(".csv.gz"),
+        job=job,
+        meta_values=(
+            ingested_at.isoformat(),
+            item.file.source_path,
+            extract_date.isoformat(),
+            item.hash_md5 or "",
+        ),
+    )
+    return target.with_suffix(".csv.gz"), build_load_config(job)
 
 
-def upload_local_to_tmp(
-    storage_client: storage.Client,
-    bucket_name: str,
-    path: Path | None,
-) -> tuple[storage.Blob, str]:
-    if path is None:
-        raise RuntimeError("Local path is required to upload.")
-    bucket = storage_client.bucket(bucket_name)
-    blob_name = f"tmp/{uuid.uuid4().hex}/{path.name}"
-    blob = bucket.blob(blob_name)
-    blob.upload_from_filename(str(path))
-    return blob, f"gs://{bucket_name}/{blob_name}"
+# Arrow types whose Parquet encoding BigQuery maps back onto each column type.
+_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "INT64": pa.int64(),
+    "FLOAT64": pa.float64(),
+    "NUMERIC": pa.decimal128(38, 9),
+    "DATE": pa.date32(),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+}
+PARQUET_BLOCK_SIZE = 64 << 20
 
 
-def insert_rows_into_destination(
+def write_parquet_with_metadata(
+    source: Path, target: Path, *, job: JobSpec, meta_values: Sequence[object]
+) -> int:
+    """Parse a CSV with the job's types and write it as zstd Parquet plus META_COLUMNS."""
+    csv_opts = job.csv_options
+    names = [col.name for col in job.columns]
+    table = pa_csv.read_csv(
+        source,
+        read_options=pa_csv.ReadOptions(
+            column_names=names,
+            skip_rows=csv_opts.skip_leading_rows,
+            encoding=csv_opts.encoding,
+            block_size=PARQUET_BLOCK_SIZE,
+        ),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=csv_opts.field_delimiter,
+            quote_char=csv_opts.quote_character,
+            newlines_in_values=csv_opts.allow_quoted_newlines,
+            ignore_empty_lines=True,
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={col.name: _ARROW_TYPES[col.field_type] for col in job.columns},
+            null_values=[csv_opts.null_marker],
+            strings_can_be_null=True,
+        ),
+    )
+    for meta, value in zip(META_COLUMNS, meta_values, strict=True):
+        scalar = pa.scalar(value, type=_ARROW_TYPES[meta.field_type])
+        table = table.append_column(meta.name, pa.repeat(scalar, table.num_rows))
+    # BigQuery rejects an append whose field modes relax the table's REQUIRED columns,
+    # so the file must carry the same nullability. A null in a REQUIRED column raises
+    # ValueError here, which sends the file down the CSV path.
+    table = table.cast(parquet_schema(job))
+    pq.write_table(table, target, compression="zstd", row_group_size=1_000_000)
+    return table.num_rows
+
+
+def parquet_schema(job: JobSpec) -> pa.Schema:
+    """Arrow schema matching ``job.table_schema()``, including REQUIRED columns' nullability."""
+    return pa.schema(
+        pa.field(col.name, _ARROW_TYPES[col.field_type], nullable=col.mode != "REQUIRED")
+        for col in (*job.columns, *META_COLUMNS)
+    )
+
+
+def stamp_metadata_columns(
+    source: Path, target: Path, *, job: JobSpec, meta_values: Sequence[str]
+) -> int:
+    """Copy a CSV to gzip ``target`` with META_COLUMNS values appended to every row."""
+    csv_opts = job.csv_options
+    dialect = {
+        "delimiter": csv_opts.field_delimiter,
+        "quotechar": csv_opts.quote_character,
+    }
+    opener = gzip.open if source.suffix == ".gz" else open
+    rows = 0
+    with (
+        opener(source, "rt", encoding=csv_opts.encoding, newline="") as src,
+        gzip.open(target, "wt", encoding="utf-8", newline="") as dst,
+    ):
+        reader = csv.reader(src, **dialect)
+        writer = csv.writer(dst, lineterminator="\n", **dialect)
+        for idx, row in enumerate(reader):
+            if not row:
+                continue
+            if idx < csv_opts.skip_leading_rows:
+                writer.writerow([*row, *(meta.name for meta in META_COLUMNS)])
+                continue
+            writer.writerow([*row, *meta_values])
+            rows += 1
+    return rows
+
+
+def build_insert_statement(
     *,
-    bq_client: bigquery.Client,
     job: JobSpec,
-    temp_table_id: str,
+    staged: Sequence[StagedFile],
     dest_table_id: str,
     ingested_at: datetime,
-    source_path: str,
-    extract_date: date,
-    hash_md5: str,
-) -> None:
+) -> tuple[str, list[bigquery.ScalarQueryParameter | bigquery.ArrayQueryParameter]]:
+    """Return one INSERT appending the ``staged`` temp table with its per-file metadata."""
+
     def safe_column(name: str) -> str:
         if not name.replace("_", "").isalnum():
             raise ValueError(f"Unsafe column name: {name}")
         return f"`{name}`"
 
-    select_columns = ", ".join(safe_column(col.name) for col in job.columns)
+    select_columns = ", ".join(f"s.{safe_column(col.name)}" for col in job.columns)
     column_list = ", ".join(
         [safe_column(col.name) for col in job.columns]
         + [safe_column(meta.name) for meta in META_COLUMNS]
     )
+    files = [
+        bigquery.StructQueryParameter(
+            None,
+            bigquery.ScalarQueryParameter(
+                "source_path", "STRING", staged_file.item.file.source_path
+            ),
+            bigquery.ScalarQueryParameter(
+                "extract_date", "DATE", staged_file.item.file.extract_date or ingested_at.date()
+            ),
+            bigquery.ScalarQueryParameter("hash_md5", "STRING", staged_file.item.hash_md5),
+        )
+        for staged_file in staged
+    ]
+    params = [
+        bigquery.ScalarQueryParameter("ingested_at", "TIMESTAMP", ingested_at),
+        bigquery.ArrayQueryParameter("files", "STRUCT", files),
+    ]
     query = (
-        f"INSERT INTO `{dest_table_id}` ({column_list}) "
-        f"SELECT {select_columns}, @ingested_at, @source_path, @extract_date, @hash_md5 "
-        f"FROM `{temp_table_id}`"
+        f"INSERT INTO `{dest_table_id}` ({column_list})\n"
+        f"SELECT {select_columns}, @ingested_at, f.source_path, f.extract_date, f.hash_md5\n"
+        "FROM staged AS s JOIN UNNEST(@files) AS f ON s._file = f.source_path"
     )
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("ingested_at", "TIMESTAMP", ingested_at),
-            bigquery.ScalarQueryParameter("source_path", "STRING", source_path),
-            bigquery.ScalarQueryParameter("extract_date", "DATE", extract_date),
-            bigquery.ScalarQueryParameter("hash_md5", "STRING", hash_md5),
-        ]
-    )
-    bq_client.query(query, job_config=job_config).result()
-    LOGGER.info("Inserted rows into %s with source_path=%s", dest_table_id, source_path)
+    return query, params
 
 
-def record_loaded(
+def build_log_rows(
     *,
-    bq_client: bigquery.Client,
     job: JobSpec,
-    source_path: str,
-    hash_md5: str,
-    rows: int,
+    staged: Sequence[StagedFile],
     loaded_at: datetime,
-) -> None:
-    table_id = f"{settings.GCP_PROJECT_ID}.{settings.BQ_DATASET_RAW}.{INGESTION_LOG_TABLE}"
-    payload = [
+) -> list[dict]:
+    return [
         {
-            "_source_path": source_path,
-            "_hash_md5": hash_md5,
+            "_source_path": staged_file.item.file.source_path,
+            "_hash_md5": staged_file.item.hash_md5,
             "_loaded_at": loaded_at.isoformat(),
             "table": job.table,
-            "rows": rows,
+            "rows": staged_file.rows,
         }
+        for staged_file in staged
     ]
-    errors = bq_client.insert_rows_json(table_id, payload)
-    if errors:
-        raise RuntimeError(f"Failed to append ingestion log for {source_path}: {errors}")
-    LOGGER.info("Recorded ingestion log entry for %s", source_path)
+
+
+def flush_ingestion_log(bq_client: bigquery.Client, rows: list[dict]) -> None:
+    """Stream buffered log rows in chunks of INGESTION_LOG_INSERT_BATCH and clear the buffer.
+
+    On failure the buffer is trimmed to the rows that were not inserted (the rejected
+    rows of the failing chunk plus any later chunks) before raising.
+    """
+    table_id = f"{settings.GCP_PROJECT_ID}.{settings.BQ_DATASET_RAW}.{INGESTION_LOG_TABLE}"
+    while rows:
+        chunk = rows[:INGESTION_LOG_INSERT_BATCH]
+        try:
+            errors = bq_client.insert_rows_json(table_id, chunk)
+        except Exception as exc:
+            raise IngestionLogError(f"Failed to append ingestion log: {exc}") from exc
+        if errors:
+            failed = sorted({error["index"] for error in errors})
+            rows[: len(chunk)] = [chunk[index] for index in failed]
+            raise IngestionLogError(f"Failed to append ingestion log: {errors}")
+        del rows[: len(chunk)]
+        LOGGER.info("Recorded %d ingestion log entries", len(chunk))
 
 
 if __name__ == "__main__":
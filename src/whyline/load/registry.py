@@ -72,7 +72,10 @@ META_COLUMNS: tuple[Column, ...] = (
         description="Logical extract date derived from the source.",
     ),
     Column(
-        "_hash_md5", "STRING", mode="REQUIRED", description="MD5 hash of the source file contents."
+        "_hash_md5",
+        "STRING",
+        mode="REQUIRED",
+        description="MD5 hash of the source file contents (crc32c:<hex> when GCS has no MD5, xxh3_128:<hex> when WLD_HASH_ALGO=xxh3_128).",
     ),
 )
 
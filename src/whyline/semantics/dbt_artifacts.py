@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, Iterator, Mapping
 
-from whyline.config import Settings
+import orjson
+
+from whyline.config import Settings, get_settings
 from whyline.sync import ALLOWLISTED_MARTS
 
 
@@ -20,7 +23,61 @@ class ModelInfo:
     name: str
     fq_name: str
     description: str | None
-    columns: Dict[str, ColumnInfo] = field(default_factory=dict)
+    columns: Mapping[str, ColumnInfo] = field(default_factory=dict)
+
+
+class LazyColumns(Mapping[str, ColumnInfo]):
+    """Column mapping that builds each ColumnInfo from the raw artifacts on first access.
+
+    Iterating yields names only, so prompt building over wide marts never
+    materializes column metadata it does not read.
+    """
+
+    __slots__ = ("_names", "_manifest_columns", "_catalog_columns", "_built")
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        manifest_columns: dict[str, Any],
+        catalog_columns: dict[str, Any],
+    ) -> None:
+        self._names = tuple(names)
+        self._manifest_columns = manifest_columns
+        self._catalog_columns = catalog_columns
+        self._built: dict[str, ColumnInfo] = {}
+
+    def __getitem__(self, name: str) -> ColumnInfo:
+        info = self._built.get(name)
+        if info is None:
+            if name not in self:
+                raise KeyError(name)
+            manifest_col = self._manifest_columns.get(name, {})
+            catalog_col = self._catalog_columns.get(name, {})
+            info = self._built[name] = ColumnInfo(
+                type=catalog_col.get("type") or manifest_col.get("data_type"),
+                description=manifest_col.get("description") or catalog_col.get("description"),
+            )
+        return info
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._manifest_columns or name in self._catalog_columns
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+def _load_json_cached(path: Path) -> dict[str, Any]:
+    stat = path.stat()
+    return _load_json(str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=4)
+def _load_json(path: str, mtime_ns: int, size: int) -> dict[str, Any]:
+    """Parse an artifact once per on-disk version; callers share the (read-only) result."""
+    return orjson.loads(Path(path).read_bytes())
 
 
 class DbtArtifacts:
@@ -30,15 +87,15 @@ class DbtArtifacts:
         self, target_path: Path | str = "dbt/target", settings: Settings | None = None
     ) -> None:
         self.target_path = Path(target_path)
-        self.settings = settings or Settings()
+        self.settings = settings or get_settings()
         self._manifest: dict[str, Any] | None = None
         self._catalog: dict[str, Any] | None = None
 
     def load_artifacts(self) -> None:
         manifest_path = self.target_path / "manifest.json"
         catalog_path = self.target_path / "catalog.json"
-        self._manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
-        self._catalog = json.loads(catalog_path.read_text(encoding="utf-8"))
+        self._manifest = _load_json_cached(manifest_path)
+        self._catalog = _load_json_cached(catalog_path)
 
     @property
     def manifest(self) -> dict[str, Any]:
@@ -88,31 +145,16 @@ class DbtArtifacts:
         self,
         manifest_node: dict[str, Any],
         catalog_entry: dict[str, Any] | None,
-    ) -> Dict[str, ColumnInfo]:
+    ) -> LazyColumns:
         manifest_columns = manifest_node.get("columns", {}) or {}
         catalog_columns = catalog_entry.get("columns", {}) if catalog_entry else {}
-
         column_names = self._merge_column_names(manifest_columns, catalog_columns)
-        columns: Dict[str, ColumnInfo] = {}
-        for col_name in column_names:
-            manifest_col = manifest_columns.get(col_name, {})
-            catalog_col = catalog_columns.get(col_name, {})
-            columns[col_name] = ColumnInfo(
-                type=catalog_col.get("type") or manifest_col.get("data_type"),
-                description=manifest_col.get("description") or catalog_col.get("description"),
-            )
-        return columns
+        return LazyColumns(column_names, manifest_columns, catalog_columns)
 
     @staticmethod
     def _merge_column_names(*column_dicts: Iterable[dict[str, Any]]) -> list[str]:
-        names: list[str] = []
-        seen: set[str] = set()
-        for columns in column_dicts:
-            for name in columns:
-                if name not in seen:
-                    seen.add(name)
-                    names.append(name)
-        return names
+        # dict keys keep first-seen order, so this dedupes in a single C-level pass.
+        return list(dict.fromkeys(chain.from_iterable(column_dicts)))
 
 
-__all__ = ["DbtArtifacts", "ModelInfo", "ColumnInfo"]
+__all__ = ["DbtArtifacts", "ModelInfo", "ColumnInfo", "LazyColumns"]
@@ -1,26 +1,31 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Iterable, Sequence
 
 SAFE_LIMIT = 5000
-DENYLIST_KEYWORDS = {
-    "INSERT",
-    "UPDATE",
-    "DELETE",
-    "CREATE",
-    "DROP",
-    "ALTER",
-    "MERGE",
-    "TRUNCATE",
-    "GRANT",
-    "REVOKE",
-    "CALL",
-    "LOAD",
-    "EXPORT",
-    "COPY",
-}
+DENYLIST_KEYWORDS = frozenset(
+    {
+        "INSERT",
+        "UPDATE",
+        "DELETE",
+        "CREATE",
+        "DROP",
+        "ALTER",
+        "MERGE",
+        "TRUNCATE",
+        "GRANT",
+        "REVOKE",
+        "CALL",
+        "LOAD",
+        "EXPORT",
+        "COPY",
+    }
+)
+
+# Word tokens share \b semantics with the keywords, so LOAD_DATE or LOAD2 never match LOAD.
+_WORD_FINDITER = re.compile(r"\w+").finditer
 
 
 def _split_identifier(identifier: str) -> tuple[str | None, str | None, str | None]:
@@ -44,10 +49,41 @@ TABLE_PATTERN = re.compile(
 )
 
 LIMIT_PATTERN = re.compile(r"\bLIMIT\s+(\d+)", re.IGNORECASE)
+_LIMIT_SEARCH = LIMIT_PATTERN.search
+# Row caps are nearly always SAFE_LIMIT, so the appended clause is built once per value.
+_LIMIT_SUFFIXES: dict[int, str] = {}
 CTE_PATTERN = re.compile(
     r"(?:\bWITH\b|,)\s+(`[^`]+`|[a-zA-Z_][\w-]*)\s+AS\s*\(",
     re.IGNORECASE,
 )
+# CTE names and FROM/JOIN references in one scan; dispatch on ``match.lastgroup``.
+REFERENCE_PATTERN = re.compile(
+    r"(?:\bWITH\b|,)\s+(?P<cte>`[^`]+`|[a-zA-Z_][\w-]*)\s+AS\s*\("
+    r"|\b(?:FROM|JOIN)\s+(?P<table>(?:`[^`]+`|[\w-]+)(?:\.(?:`[^`]+`|[\w-]+)){0,2})",
+    re.IGNORECASE,
+)
+
+# String literals are masked with each engine's own lexical rules. Quoted identifiers and
+# line comments are matched first so a quote inside them never opens a literal; only the
+# ``literal`` group is blanked. DuckDB escapes quotes by doubling them and treats
+# backslashes as plain text outside E'' strings; BigQuery uses backslash escapes.
+STRING_LITERAL_PATTERNS = {
+    "duckdb": re.compile(
+        r"(?P<skip>\"(?:[^\"]|\"\")*\"|--[^\n]*)"
+        r"|(?P<literal>(?<![\w$])[eE]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*')",
+        re.DOTALL,
+    ),
+    "bigquery": re.compile(
+        r"(?P<skip>`(?:[^`\\]|\\.)*`"
+        r"|\"\"\"(?:[^\\]|\\.)*?\"\"\"|\"(?:[^\"\\]|\\.)*\""
+        r"|(?:--|#)[^\n]*)"
+        r"|(?P<literal>'''(?:[^\\]|\\.)*?'''|'(?:[^'\\]|\\.)*')",
+        re.DOTALL,
+    ),
+}
+# Constructs the patterns above cannot lex (DuckDB nests block comments and dollar quotes
+# take arbitrary tags); queries containing them are scanned unmasked.
+_UNMASKABLE_MARKERS = {"duckdb": ("/*", "$"), "bigquery": ("/*",)}
 
 
 class SqlValidationError(ValueError):
@@ -62,21 +98,40 @@ class GuardrailConfig:
     enforce_limit: int = SAFE_LIMIT
     allowed_datasets: Sequence[str] | None = None
     allowed_projects: Sequence[str] | None = None
+    _allowed_sets: tuple[frozenset[str], frozenset[str], frozenset[str]] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def allowed_sets(self) -> tuple[frozenset[str], frozenset[str], frozenset[str]]:
+        """Return (tables, projects, datasets) normalized once per config instance."""
+        if self._allowed_sets is None:
+            self._allowed_sets = _compile_allowed_sets(
+                self.allowed_models, self.allowed_projects, self.allowed_datasets
+            )
+        return self._allowed_sets
 
 
 def sanitize_sql(sql: str, config: GuardrailConfig) -> str:
     parsed = _normalize(sql)
+    # Semicolons are checked on the raw text, so a misread literal can never smuggle in
+    # a second statement.
     _ensure_single_statement(parsed)
-    _ensure_read_only(parsed)
+    # Keywords inside string literals ('FROM x', 'DELETE') are not SQL; scan a copy with
+    # literal contents blanked out. Lengths match, so offsets apply to `parsed`.
+    scannable = _mask_string_literals(parsed, config.engine)
+    _ensure_read_only(scannable)
+    # CTE names and FROM/JOIN references are scanned once and shared by validation and
+    # quoting; the LIMIT suffix is appended at the end, so the match offsets stay valid.
+    table_matches, ctes = _scan_references(scannable)
     _validate_tables(
         parsed,
         config.allowed_models,
-        allowed_projects=config.allowed_projects,
-        allowed_datasets=config.allowed_datasets,
+        scan=(table_matches, ctes),
+        allowed_sets=config.allowed_sets(),
     )
     sanitized = _ensure_limit(parsed, config.enforce_limit)
     if config.engine == "bigquery":
-        sanitized = _quote_hyphenated_tables(sanitized)
+        sanitized = _quote_hyphenated_tables(sanitized, table_matches)
         _suggest_partition_filter(sanitized, config.partition_columns)
     return sanitized
 
@@ -90,6 +145,22 @@ def _normalize(sql: str) -> str:
     return trimmed
 
 
+def _mask_string_literals(sql: str, engine: str) -> str:
+    pattern = STRING_LITERAL_PATTERNS.get(engine)
+    if pattern is None or "'" not in sql:
+        return sql
+    if any(marker in sql for marker in _UNMASKABLE_MARKERS[engine]):
+        return sql
+    return pattern.sub(_mask_literal_match, sql)
+
+
+def _mask_literal_match(match: re.Match[str]) -> str:
+    token = match[0]
+    if match.lastgroup != "literal":
+        return token
+    return "'" + " " * (len(token) - 2) + "'"
+
+
 def _ensure_single_statement(sql: str) -> None:
     if ";" in sql:
         raise SqlValidationError(
@@ -99,16 +170,24 @@ def _ensure_single_statement(sql: str) -> None:
 
 def _ensure_read_only(sql: str) -> None:
     stripped = sql.lstrip()
-    upper_sql = stripped.upper()
-    if upper_sql.startswith("WITH"):
-        if "SELECT" not in upper_sql:
-            raise SqlValidationError("CTE detected without a SELECT statement.")
-    elif not upper_sql.startswith("SELECT"):
+    head = stripped[:6].upper()
+    is_cte = head.startswith("WITH")
+    if not is_cte and head != "SELECT":
         raise SqlValidationError("Only SELECT statements are allowed.")
-    for keyword in DENYLIST_KEYWORDS:
-        pattern = rf"\b{keyword}\b"
-        if re.search(pattern, upper_sql):
-            raise SqlValidationError(f"Disallowed keyword detected: {keyword}.")
+    # One pass over the words, upper-casing tokens rather than copying the whole query.
+    saw_select = False
+    disallowed: str | None = None
+    for match in _WORD_FINDITER(stripped):
+        word = match.group(0).upper()
+        if word == "SELECT":
+            saw_select = True
+        elif word in DENYLIST_KEYWORDS:
+            disallowed = word
+            break
+    if is_cte and not saw_select and disallowed is None:
+        raise SqlValidationError("CTE detected without a SELECT statement.")
+    if disallowed:
+        raise SqlValidationError(f"Disallowed keyword detected: {disallowed}.")
 
 
 def _validate_tables(
@@ -116,11 +195,13 @@ def _validate_tables(
     allowed_models: Iterable[str],
     allowed_projects: Iterable[str] | None = None,
     allowed_datasets: Iterable[str] | None = None,
+    scan: tuple[list[re.Match[str]], set[str]] | None = None,
+    allowed_sets: tuple[frozenset[str], frozenset[str], frozenset[str]] | None = None,
 ) -> None:
-    allowed_base, allowed_project_set, allowed_dataset_set = _compile_allowed_sets(
-        allowed_models, allowed_projects, allowed_datasets
+    allowed_base, allowed_project_set, allowed_dataset_set = allowed_sets or (
+        _compile_allowed_sets(allowed_models, allowed_projects, allowed_datasets)
     )
-    references = _extract_referenced_identifiers(sql)
+    references = _extract_referenced_identifiers(sql, scan)
     _ensure_tables_are_allowlisted(references, allowed_base)
     _ensure_authorized_namespaces(references, allowed_project_set, allowed_dataset_set)
 
@@ -129,7 +210,7 @@ def _compile_allowed_sets(
     allowed_models: Iterable[str],
     explicit_projects: Iterable[str] | None,
     explicit_datasets: Iterable[str] | None,
-) -> tuple[set[str], set[str], set[str]]:
+) -> tuple[frozenset[str], frozenset[str], frozenset[str]]:
     allowed_base: set[str] = set()
     derived_projects: set[str] = set()
     derived_datasets: set[str] = set()
@@ -150,18 +231,31 @@ def _compile_allowed_sets(
     }
 
     return (
-        allowed_base,
-        allowed_projects or derived_projects,
-        allowed_datasets or derived_datasets,
+        frozenset(allowed_base),
+        frozenset(allowed_projects or derived_projects),
+        frozenset(allowed_datasets or derived_datasets),
     )
 
 
+def _scan_references(sql: str) -> tuple[list[re.Match[str]], set[str]]:
+    """Return FROM/JOIN matches and lower-cased CTE names from a single regex pass."""
+    table_matches: list[re.Match[str]] = []
+    ctes: set[str] = set()
+    for match in REFERENCE_PATTERN.finditer(sql):
+        if match.lastgroup == "cte":
+            ctes.add(match.group("cte").strip("`").lower())
+        else:
+            table_matches.append(match)
+    return table_matches, ctes
+
+
 def _extract_referenced_identifiers(
-    sql: str,
+    sql: str, scan: tuple[list[re.Match[str]], set[str]] | None = None
 ) -> list[tuple[str | None, str | None, str, str]]:
     identifiers: list[tuple[str | None, str | None, str, str]] = []
-    for match in TABLE_PATTERN.finditer(sql):
-        token = match.group(1).strip()
+    table_matches, ctes = scan or _scan_references(sql)
+    for match in table_matches:
+        token = match.group("table").strip()
         if not token:
             continue
         project, dataset, table = _split_identifier(token)
@@ -169,13 +263,12 @@ def _extract_referenced_identifiers(
             continue
         identifiers.append((project, dataset, table, token))
 
-    ctes = {name.strip("`").lower() for name in CTE_PATTERN.findall(sql)}
     return [ref for ref in identifiers if ref[2] not in ctes]
 
 
 def _ensure_tables_are_allowlisted(
     references: Sequence[tuple[str | None, str | None, str, str]],
-    allowed_tables: set[str],
+    allowed_tables: frozenset[str],
 ) -> None:
     unauthorized = {table for _, _, table, _ in references if table not in allowed_tables}
     if unauthorized:
@@ -187,8 +280,8 @@ def _ensure_tables_are_allowlisted(
 
 def _ensure_authorized_namespaces(
     references: Sequence[tuple[str | None, str | None, str, str]],
-    allowed_projects: set[str],
-    allowed_datasets: set[str],
+    allowed_projects: frozenset[str],
+    allowed_datasets: frozenset[str],
 ) -> None:
     if not allowed_projects and not allowed_datasets:
         return
@@ -214,22 +307,30 @@ def _ensure_authorized_namespaces(
 
 
 def _ensure_limit(sql: str, max_rows: int) -> str:
-    if LIMIT_PATTERN.search(sql):
+    if _LIMIT_SEARCH(sql):
         return sql
-    return f"{sql}\nLIMIT {max_rows}"
-
-
-def _quote_hyphenated_tables(sql: str) -> str:
-    def replacer(match: re.Match[str]) -> str:
-        token = match.group(1)
-        if token.startswith("`") and token.endswith("`"):
-            return match.group(0)
-        if "-" not in token:
-            return match.group(0)
-        quoted = f"`{token}`"
-        return match.group(0).replace(token, quoted, 1)
-
-    return TABLE_PATTERN.sub(replacer, sql)
+    suffix = _LIMIT_SUFFIXES.get(max_rows)
+    if suffix is None:
+        suffix = _LIMIT_SUFFIXES.setdefault(max_rows, f"\nLIMIT {max_rows}")
+    return sql + suffix
+
+
+def _quote_hyphenated_tables(sql: str, table_matches: Sequence[re.Match[str]] | None = None) -> str:
+    if table_matches is None:
+        table_matches, _ = _scan_references(sql)
+    pieces: list[str] = []
+    position = 0
+    for match in table_matches:
+        token = match.group("table")
+        if "-" not in token or (token.startswith("`") and token.endswith("`")):
+            continue
+        start, end = match.span("table")
+        pieces.extend((sql[position:start], f"`{token}`"))
+        position = end
+    if not pieces:
+        return sql
+    pieces.append(sql[position:])
+    return "".join(pieces)
 
 
 def _suggest_partition_filter(sql: str, partition_columns: Sequence[str]) -> None:
@@ -2,14 +2,16 @@ from __future__ import annotations
 
 import argparse
 import logging
+from collections import deque
 from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import UTC, date, datetime, timedelta
 from typing import Optional
 
 from google.cloud import bigquery, storage
 
-from whyline.config import Settings
+from whyline.config import Settings, get_settings
 from whyline.sync.constants import ALLOWLISTED_MARTS
 from whyline.sync.state import (
     BQStateStore,
@@ -23,6 +25,11 @@ LOGGER = logging.getLogger(__name__)
 PARTITIONED_MARTS: frozenset[str] = frozenset(
     {"mart_reliability_by_route_day", "mart_reliability_by_stop_hour"}
 )
+# Each mart export is an independent, network-bound BigQuery job; cap the fan-out so a full
+# run does not flood the project's concurrent-job quota.
+DEFAULT_MAX_WORKERS = 8
+# Partition EXPORT DATA jobs kept in flight per mart; state still advances in date order.
+PARTITION_EXPORT_WINDOW = 8
 
 
 @dataclass(slots=True, frozen=True)
@@ -44,12 +51,15 @@ class MartExporter:
         storage_client: Optional[storage.Client] = None,
         allowlisted_marts: Sequence[str] = ALLOWLISTED_MARTS,
         state_store: Optional[CompositeStateStore] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
     ) -> None:
         self.settings = settings
+        self.max_workers = max(1, max_workers)
         self.project = settings.GCP_PROJECT_ID
         self.dataset = settings.BQ_DATASET_MART
         self.bucket = settings.GCS_BUCKET
         self.allowlisted_marts = tuple(allowlisted_marts)
+        self._allowlisted_set = frozenset(self.allowlisted_marts)
 
         self._bq_client = bq_client or bigquery.Client(project=self.project)
         self._storage_client = storage_client or storage.Client(project=self.project)
@@ -67,30 +77,36 @@ class MartExporter:
             ", ".join(marts_to_process),
             since.isoformat() if since else "all available partitions",
         )
-        results: list[ExportResult] = []
-        for mart_name in marts_to_process:
-            if mart_name in PARTITIONED_MARTS:
-                result = self._export_partitioned_mart(mart_name, since)
-            else:
-                result = self._export_snapshot_mart(mart_name)
-            if result:
-                results.append(result)
-        return results
+        workers = min(self.max_workers, len(marts_to_process)) or 1
+        # Marts run concurrently; partitions within a mart stay serial so state checkpoints
+        # remain monotonic. Results keep the requested mart order.
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mart-export") as pool:
+            outcomes = list(pool.map(lambda mart: self._export_one(mart, since), marts_to_process))
+        return [result for result in outcomes if result]
+
+    def _export_one(self, mart_name: str, since: Optional[date]) -> Optional[ExportResult]:
+        if mart_name in PARTITIONED_MARTS:
+            return self._export_partitioned_mart(mart_name, since)
+        return self._export_snapshot_mart(mart_name)
 
     def _validate_marts(self, marts: Optional[Iterable[str]]) -> Iterable[str]:
         if marts is None:
             return self.allowlisted_marts
-        invalid = sorted(set(marts) - set(self.allowlisted_marts))
-        if invalid:
-            raise ValueError(f"Unsupported mart(s): {', '.join(invalid)}")
-        # Preserve the caller's order while de-duplicating.
+        # Single pass: preserve the caller's order while de-duplicating and collecting
+        # anything outside the allow-list.
         seen: set[str] = set()
-        ordered = []
+        ordered: list[str] = []
+        invalid: set[str] = set()
         for mart in marts:
             if mart in seen:
                 continue
             seen.add(mart)
-            ordered.append(mart)
+            if mart in self._allowlisted_set:
+                ordered.append(mart)
+            else:
+                invalid.add(mart)
+        if invalid:
+            raise ValueError(f"Unsupported mart(s): {', '.join(sorted(invalid))}")
         return ordered
 
     def _export_partitioned_mart(
@@ -105,15 +121,23 @@ class MartExporter:
 
         destination_template = f"gs://{self.bucket}/marts/{mart_name}/run_date={{date}}/*"
         last_exported: Optional[date] = None
+        # Jobs are submitted ahead in a sliding window but awaited oldest-first, so the
+        # checkpoint only ever moves to a date whose predecessors have all finished.
+        in_flight: deque[tuple[date, bigquery.QueryJob]] = deque()
+        # The table reference and OPTIONS clause are the same for every partition.
+        sql_template = self._partition_export_sql_template(mart_name)
         for partition_date in partitions:
-            destination_uri = destination_template.format(date=partition_date.isoformat())
-            sql = self._build_partition_export_sql(mart_name, partition_date, destination_uri)
+            run_date = partition_date.isoformat()
+            destination_uri = destination_template.format(date=run_date)
+            sql = sql_template.format(destination_uri=destination_uri, run_date=run_date)
             LOGGER.info(
                 "Exporting %s partition %s to %s", mart_name, partition_date, destination_uri
             )
-            self._execute_export(sql)
-            last_exported = partition_date
-            self._persist_state(mart_name, last_exported)
+            in_flight.append((partition_date, self._submit_export(sql)))
+            if len(in_flight) >= PARTITION_EXPORT_WINDOW:
+                last_exported = self._await_partition(mart_name, *in_flight.popleft())
+        while in_flight:
+            last_exported = self._await_partition(mart_name, *in_flight.popleft())
 
         final_state = self._persist_state(mart_name, last_exported, finalize=True)
         return ExportResult(
@@ -156,14 +180,17 @@ class MartExporter:
             last_service_date=last_service_date,
             last_run_ts=timestamp,
         )
+        if not finalize:
+            # Intermediate progress only touches the GCS marker; see write_checkpoint.
+            self._state_store.write_checkpoint(state)
+            return state
         self._state_store.write(state)
-        if finalize:
-            LOGGER.info(
-                "Updated state for %s: last_service_date=%s last_run_ts=%s",
-                mart_name,
-                last_service_date.isoformat() if last_service_date else "N/A",
-                timestamp.isoformat(),
-            )
+        LOGGER.info(
+            "Updated state for %s: last_service_date=%s last_run_ts=%s",
+            mart_name,
+            last_service_date.isoformat() if last_service_date else "N/A",
+            timestamp.isoformat(),
+        )
         return state
 
     def _list_partitions_to_export(
@@ -178,30 +205,51 @@ class MartExporter:
             mart_name,
             cutoff.isoformat() if cutoff else "start",
         )
-        params = []
-        predicate = ""
+        partitions = self._partition_dates(mart_name)
+        if partitions is None:
+            LOGGER.info("%s is not date-partitioned; scanning service_date_mst", mart_name)
+            partitions = self._distinct_service_dates(mart_name)
         if cutoff:
-            predicate = "WHERE service_date_mst >= @cutoff"
-            params.append(bigquery.ScalarQueryParameter("cutoff", "DATE", cutoff))
+            partitions = [partition for partition in partitions if partition >= cutoff]
+        LOGGER.info("Found %d partitions for %s", len(partitions), mart_name)
+        return partitions
+
+    def _partition_dates(self, mart_name: str) -> Optional[list[date]]:
+        """Read non-empty partition dates from table metadata; no table data is scanned.
+
+        Returns None when the mart is not partitioned by day, so the caller can fall back
+        to a DISTINCT scan.
+        """
         query = f"""
-            SELECT DISTINCT service_date_mst
-            FROM `{self.project}.{self.dataset}.{mart_name}`
-            WHERE service_date_mst IS NOT NULL
+            SELECT partition_id
+            FROM `{self.project}.{self.dataset}.INFORMATION_SCHEMA.PARTITIONS`
+            WHERE table_name = @mart_name
+              AND total_rows > 0
         """
-        if predicate:
-            query = f"""
-                SELECT DISTINCT service_date_mst
-                FROM `{self.project}.{self.dataset}.{mart_name}`
-                WHERE service_date_mst IS NOT NULL
-                  AND service_date_mst >= @cutoff
-            """
         job = self._bq_client.query(
             query,
-            job_config=bigquery.QueryJobConfig(query_parameters=params),
+            job_config=bigquery.QueryJobConfig(
+                query_parameters=[bigquery.ScalarQueryParameter("mart_name", "STRING", mart_name)]
+            ),
         )
-        partitions = sorted(row[0] for row in job)
-        LOGGER.info("Found %d partitions for %s", len(partitions), mart_name)
-        return partitions
+        partitions: list[date] = []
+        for row in job:
+            partition_id = row[0]
+            if partition_id == "__NULL__":  # rows with a NULL service_date_mst
+                continue
+            try:
+                partitions.append(datetime.strptime(partition_id, "%Y%m%d").date())
+            except (TypeError, ValueError):
+                return None
+        return sorted(partitions)
+
+    def _distinct_service_dates(self, mart_name: str) -> list[date]:
+        query = f"""
+            SELECT DISTINCT service_date_mst
+            FROM `{self.project}.{self.dataset}.{mart_name}`
+            WHERE service_date_mst IS NOT NULL
+        """
+        return sorted(row[0] for row in self._bq_client.query(query))
 
     @staticmethod
     def _determine_cutoff(state: Optional[ExportState], since: Optional[date]) -> Optional[date]:
@@ -215,15 +263,21 @@ class MartExporter:
     def _build_partition_export_sql(
         self, mart_name: str, run_date: date, destination_uri: str
     ) -> str:
+        return self._partition_export_sql_template(mart_name).format(
+            destination_uri=destination_uri, run_date=run_date.isoformat()
+        )
+
+    def _partition_export_sql_template(self, mart_name: str) -> str:
+        """EXPORT DATA statement for a mart with only the URI and date left to fill in."""
         table_ref = f"`{self.project}.{self.dataset}.{mart_name}`"
         return f"""
             EXPORT DATA OPTIONS(
-              uri='{destination_uri}',
+              uri='{{destination_uri}}',
               format='PARQUET',
               overwrite=true
             ) AS
             SELECT * FROM {table_ref}
-            WHERE service_date_mst = DATE('{run_date.isoformat()}')
+            WHERE service_date_mst = DATE('{{run_date}}')
         """
 
     def _build_snapshot_export_sql(self, mart_name: str, destination_uri: str) -> str:
@@ -238,9 +292,18 @@ class MartExporter:
         """
 
     def _execute_export(self, sql: str) -> None:
+        self._submit_export(sql).result()
+
+    def _submit_export(self, sql: str) -> bigquery.QueryJob:
         LOGGER.debug("Executing export SQL:\n%s", sql)
-        job = self._bq_client.query(sql)
+        return self._bq_client.query(sql)
+
+    def _await_partition(
+        self, mart_name: str, partition_date: date, job: bigquery.QueryJob
+    ) -> date:
         job.result()
+        self._persist_state(mart_name, partition_date)
+        return partition_date
 
     @staticmethod
     def _now() -> datetime:
@@ -260,6 +323,12 @@ def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         dest="marts",
         help="Limit export to specific mart(s). Can be specified multiple times.",
     )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"Marts exported concurrently (default: {DEFAULT_MAX_WORKERS}).",
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
@@ -282,8 +351,8 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         level=getattr(logging, args.log_level.upper()),
         format="%(asctime)s %(levelname)s %(name)s %(message)s",
     )
-    settings = Settings()
-    exporter = MartExporter(settings)
+    settings = get_settings()
+    exporter = MartExporter(settings, max_workers=args.max_workers)
     try:
         exporter.run(since=args.since, marts=args.marts)
     except Exception:  # pragma: no cover - CLI top-level guard
@@ -15,7 +15,7 @@ from google.api_core.exceptions import GoogleAPIError, NotFound
 from google.auth.exceptions import DefaultCredentialsError
 from google.cloud import storage
 
-from whyline.config import Settings
+from whyline.config import Settings, get_settings
 from whyline.sync.constants import ALLOWLISTED_MARTS
 from whyline.sync.state_store import SyncStateUploadError, load_sync_state, write_sync_state
 
@@ -560,7 +560,7 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         level=getattr(logging, args.log_level.upper()),
         format="%(asctime)s %(levelname)s %(name)s %(message)s",
     )
-    settings = Settings()
+    settings = get_settings()
     local_root = Path(args.local_parquet_root).resolve() if args.local_parquet_root else None
     cache_root = Path(args.cache_root).resolve()
 
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import json
 import logging
+import threading
 from dataclasses import dataclass
 from datetime import UTC, date, datetime
 from typing import Optional
 
-from google.api_core.exceptions import NotFound
+import orjson
+from google.api_core.exceptions import NotFound, PreconditionFailed
 from google.cloud import bigquery, storage
 
 LOGGER = logging.getLogger(__name__)
@@ -21,20 +22,19 @@ class ExportState:
     last_run_ts: Optional[datetime] = None
 
     def to_json(self) -> str:
-        return json.dumps(
+        return orjson.dumps(
             {
                 "mart_name": self.mart_name,
                 "last_service_date": (
                     self.last_service_date.isoformat() if self.last_service_date else None
                 ),
                 "last_run_ts": self._format_timestamp(self.last_run_ts),
-            },
-            separators=(",", ":"),
-        )
+            }
+        ).decode("utf-8")
 
     @classmethod
     def from_json(cls, payload: str) -> ExportState:
-        raw = json.loads(payload)
+        raw = orjson.loads(payload)
         last_service_date = cls._parse_date(raw.get("last_service_date"))
         last_run_ts = cls._parse_timestamp(raw.get("last_run_ts"))
         return cls(
@@ -77,9 +77,21 @@ class BQStateStore:
         self._dataset_id = dataset_id
         self._project = client.project
         self._table_ref = f"{self._project}.{self._dataset_id}.{self._TABLE_NAME}"
+        # The table is never dropped mid-run, so one successful check covers every
+        # subsequent load/write (shared across the exporter's worker threads).
+        self._table_ready = False
+        self._table_lock = threading.Lock()
 
     def ensure_table(self) -> None:
         """Ensure the control table exists."""
+        if self._table_ready:
+            return
+        with self._table_lock:
+            if not self._table_ready:
+                self._create_table_if_missing()
+                self._table_ready = True
+
+    def _create_table_if_missing(self) -> None:
         try:
             self._client.get_table(self._table_ref)
         except NotFound:
@@ -91,7 +103,7 @@ class BQStateStore:
             ]
             table = bigquery.Table(self._table_ref, schema=schema)
             table.clustering_fields = ["mart_name"]
-            self._client.create_table(table)
+            self._client.create_table(table, exists_ok=True)
 
     def load(self, mart_name: str) -> Optional[ExportState]:
         self.ensure_table()
@@ -153,6 +165,11 @@ class GCSStateStore:
     def __init__(self, client: storage.Client, bucket: str) -> None:
         self._client = client
         self._bucket_name = bucket
+        # Per-mart object generation (0 = known missing) and last payload this store saw.
+        # Uploads are conditional on the generation so a concurrent exporter's newer
+        # marker is never silently overwritten.
+        self._generations: dict[str, int] = {}
+        self._payloads: dict[str, str] = {}
 
     def _blob_path(self, mart_name: str) -> str:
         return f"marts/{mart_name}/last_export.json"
@@ -163,7 +180,9 @@ class GCSStateStore:
         try:
             payload = blob.download_as_text()
         except NotFound:
+            self._generations[mart_name] = 0
             return None
+        self._remember(mart_name, blob, payload)
         try:
             state = ExportState.from_json(payload)
         except (ValueError, KeyError) as exc:
@@ -174,9 +193,37 @@ class GCSStateStore:
         return state
 
     def write(self, state: ExportState) -> None:
+        payload = state.to_json()
+        if self._payloads.get(state.mart_name) == payload:
+            return
         bucket = self._client.bucket(self._bucket_name)
         blob = bucket.blob(self._blob_path(state.mart_name))
-        blob.upload_from_string(state.to_json(), content_type="application/json")
+        try:
+            self._upload(blob, state.mart_name, payload)
+        except PreconditionFailed:
+            current = self.load(state.mart_name)
+            if current and CompositeStateStore._is_newer(current, state):
+                LOGGER.warning(
+                    "State marker for %s was advanced concurrently; keeping the newer one",
+                    state.mart_name,
+                )
+                return
+            self._upload(blob, state.mart_name, payload)
+        self._remember(state.mart_name, blob, payload)
+
+    def _upload(self, blob: storage.Blob, mart_name: str, payload: str) -> None:
+        blob.upload_from_string(
+            payload,
+            content_type="application/json",
+            if_generation_match=self._generations.get(mart_name),
+        )
+
+    def _remember(self, mart_name: str, blob: storage.Blob, payload: str) -> None:
+        self._payloads[mart_name] = payload
+        if isinstance(blob.generation, int):
+            self._generations[mart_name] = blob.generation
+        else:
+            self._generations.pop(mart_name, None)
 
 
 class CompositeStateStore:
@@ -185,15 +232,40 @@ class CompositeStateStore:
     def __init__(self, bq_store: BQStateStore, gcs_store: GCSStateStore) -> None:
         self._bq_store = bq_store
         self._gcs_store = gcs_store
+        # Each backend read costs a BigQuery job plus a GCS GET; this process is the only
+        # writer during a run, so remember what was last loaded or written per mart.
+        self._load_cache: dict[str, Optional[ExportState]] = {}
 
     def load(self, mart_name: str) -> Optional[ExportState]:
+        if mart_name in self._load_cache:
+            return self._load_cache[mart_name]
         bq_state = self._safe_load(self._bq_store, mart_name)
         gcs_state = self._safe_load(self._gcs_store, mart_name)
-        return self._select_freshest(bq_state, gcs_state)
+        state = self._select_freshest(bq_state, gcs_state)
+        self._load_cache[mart_name] = state
+        return state
+
+    def invalidate(self, mart_name: Optional[str] = None) -> None:
+        """Forget cached state for one mart (or all) so the next load re-reads both stores."""
+        if mart_name is None:
+            self._load_cache.clear()
+        else:
+            self._load_cache.pop(mart_name, None)
 
     def write(self, state: ExportState) -> None:
         self._bq_store.write(state)
         self._gcs_store.write(state)
+        self._load_cache[state.mart_name] = state
+
+    def write_checkpoint(self, state: ExportState) -> None:
+        """Record intermediate progress in GCS only.
+
+        Each BigQuery write is a MERGE job, so per-partition progress goes to the cheap
+        GCS marker; ``load`` picks whichever store is freshest, so a crashed run still
+        resumes from the last checkpoint. The final ``write`` brings BigQuery up to date.
+        """
+        self._gcs_store.write(state)
+        self._load_cache[state.mart_name] = state
 
     def _safe_load(self, store, mart_name: str) -> Optional[ExportState]:
         try:
@@ -2,18 +2,23 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
 from pathlib import Path
 from typing import Any, Mapping, Optional
 
+import orjson
+
 LOGGER = logging.getLogger(__name__)
 
 # Default local location of sync_state.json; callers can override via arguments.
 DEFAULT_SYNC_STATE_PATH = Path("data/sync_state.json")
 SYNC_STATE_GCS_REQUIRED_ENV = "SYNC_STATE_GCS_REQUIRED"
 
+# (bucket, blob) -> (generation, raw bytes) of the last remote copy seen by this process,
+# so repeat loads can ask GCS for the object only if it changed.
+_REMOTE_STATE_CACHE: dict[tuple[str, str], tuple[int, bytes]] = {}
+
 
 class SyncStateUploadError(RuntimeError):
     """Raised when sync state cannot be uploaded to the configured GCS bucket."""
@@ -62,13 +67,16 @@ def download_sync_state(
 
     bucket_name, blob_name = target
     try:
+        from google.api_core.exceptions import NotFound
+
         client = _ensure_storage_client()
         bucket = client.bucket(bucket_name)
         blob = bucket.blob(blob_name)
-        if not blob.exists():
+        try:
+            contents = blob.download_as_bytes()
+        except NotFound:
             LOGGER.info("sync_state.json not found in gs://%s/%s", bucket_name, blob_name)
             return False
-        contents = blob.download_as_bytes()
         path.parent.mkdir(parents=True, exist_ok=True)
         path.write_bytes(contents)
         LOGGER.debug(
@@ -88,7 +96,10 @@ def write_sync_state(
     path: Path = DEFAULT_SYNC_STATE_PATH,
 ) -> None:
     """Write sync_state locally and optionally mirror it to GCS."""
-    serialized = json.dumps(payload, indent=2, sort_keys=True) + "\n"
+    serialized = (
+        orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS).decode("utf-8")
+        + "\n"
+    )
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(serialized, encoding="utf-8")
     LOGGER.debug("Wrote sync state to %s", path)
@@ -104,6 +115,7 @@ def write_sync_state(
         bucket = client.bucket(bucket_name)
         blob = bucket.blob(blob_name)
         blob.upload_from_string(serialized, content_type="application/json")
+        _remember_remote_state(target, blob, serialized.encode("utf-8"))
         LOGGER.info("Uploaded sync state to gs://%s/%s", bucket_name, blob_name)
     except Exception as exc:  # pragma: no cover - network/credential errors
         message = f"Failed to upload sync_state.json to gs://{bucket_name}/{blob_name}: {exc}"
@@ -122,12 +134,9 @@ def load_sync_state(
     if target:
         bucket_name, blob_name = target
         try:
-            client = _ensure_storage_client()
-            bucket = client.bucket(bucket_name)
-            blob = bucket.blob(blob_name)
-            contents = blob.download_as_text(encoding="utf-8")
+            contents = _download_if_changed(target)
             LOGGER.debug("Loaded sync state from gs://%s/%s", bucket_name, blob_name)
-            return json.loads(contents)
+            return orjson.loads(contents)
         except Exception as exc:  # pragma: no cover - network/credential errors
             LOGGER.warning(
                 "Unable to load sync state from gs://%s/%s (%s); falling back to local file.",
@@ -141,9 +150,35 @@ def load_sync_state(
         return None
 
     try:
-        contents = path.read_text(encoding="utf-8")
+        contents = path.read_bytes()
         LOGGER.debug("Loaded sync state from %s", path)
-        return json.loads(contents)
-    except json.JSONDecodeError as exc:
+        return orjson.loads(contents)
+    except orjson.JSONDecodeError as exc:
         LOGGER.warning("Local sync_state.json is malformed (%s): %s", path, exc)
         return None
+
+
+def _download_if_changed(target: tuple[str, str]) -> bytes:
+    """Return the remote sync_state bytes, skipping the transfer if the generation is unchanged."""
+    from google.api_core.exceptions import NotModified
+
+    bucket_name, blob_name = target
+    blob = _ensure_storage_client().bucket(bucket_name).blob(blob_name)
+    cached = _REMOTE_STATE_CACHE.get(target)
+    if cached is None:
+        contents = blob.download_as_bytes()
+    else:
+        try:
+            contents = blob.download_as_bytes(if_generation_not_match=cached[0])
+        except NotModified:
+            return cached[1]
+    _remember_remote_state(target, blob, contents)
+    return contents
+
+
+def _remember_remote_state(target: tuple[str, str], blob: Any, contents: bytes) -> None:
+    generation = getattr(blob, "generation", None)
+    if isinstance(generation, int):
+        _REMOTE_STATE_CACHE[target] = (generation, contents)
+    else:
+        _REMOTE_STATE_CACHE.pop(target, None)
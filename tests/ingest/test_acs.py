@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import hashlib
+import json
+
+from whyline.ingest import acs
+
+HEADER = [
+    "NAME",
+    "B08201_002E",
+    "B08201_001E",
+    "B08301_010E",
+    "B08301_001E",
+    "B17001_002E",
+    "B01003_001E",
+    "state",
+    "county",
+    "tract",
+]
+ROWS = [
+    ["Tract 1", "10", "100", "5", "50", "20", "200", "08", "031", "000100"],
+    ["Tract 2", "0", "0", "-", "40", "10", "100", "08", "031", "000200"],
+]
+
+
+def test_run_streams_gzip_csv_and_manifest_hash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(acs, "fetch_acs_data", lambda **_kwargs: [HEADER, *ROWS])
+    args = acs.build_parser().parse_args(["--extract-date", "2025-01-01"])
+
+    assert acs.run(args) == 0
+
+    out_dir = tmp_path / "data/raw/acs/extract_date=2025-01-01"
+    payload = (out_dir / "acs_tract.csv.gz").read_bytes()
+    with gzip.open(out_dir / "acs_tract.csv.gz", "rt", encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["geoid"] for row in rows] == ["14000US08031000100", "14000US08031000200"]
+    assert rows[0]["pct_hh_no_vehicle"] == "0.1"
+    assert rows[1]["pct_hh_no_vehicle"] == ""
+    manifest = json.loads((out_dir / "manifest.json").read_text())
+    assert manifest["bytes"] == len(payload)
+    assert manifest["hash_md5"] == hashlib.md5(payload, usedforsecurity=False).hexdigest()
+    assert manifest["files"]["acs_tract.csv.gz"]["hash_md5"] == manifest["hash_md5"]
+
+
+def test_build_dataframe_emits_contract_columns_for_block_groups():
+    variables = acs.load_variables(acs.DEFAULT_VARIABLES_PATH, 2023)["vars"]
+    rows = [row + ["2"] for row in ROWS]
+
+    df = acs.build_dataframe([HEADER + ["block group"], *rows], "bg", 2023, variables)
+
+    assert list(df.columns) == acs.COLUMNS_OUT
+    assert df["geoid"].tolist() == ["15000US080310001002", "15000US080310002002"]
+    assert df["workers_transit"].isna().tolist() == [False, True]
+    assert df["pct_poverty"].tolist() == [0.1, 0.1]
+    assert df["year"].tolist() == [2023, 2023]
+
+
+def test_fetch_acs_data_goes_through_retrying_get(monkeypatch):
+    calls = []
+
+    class _Response:
+        def raise_for_status(self):
+            return None
+
+        def json(self):
+            return [HEADER, *ROWS]
+
+    def fake_get(url, *, params, timeout, logger):
+        calls.append((url, params))
+        return _Response()
+
+    monkeypatch.setattr(acs.io, "http_get_with_retry", fake_get)
+
+    data = acs.fetch_acs_data(
+        year=2023,
+        geo="tract",
+        state_fips="08",
+        county_fips="031",
+        variables={"total_population": "B01003_001E"},
+        api_key=None,
+        timeout=5,
+    )
+
+    assert data[0] == HEADER
+    assert calls == [
+        (
+            "https://api.census.gov/data/2023/acs/acs5",
+            {"get": "NAME,B01003_001E", "for": "tract:*", "in": "state:08 county:031"},
+        )
+    ]
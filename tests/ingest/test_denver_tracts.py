@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from whyline.ingest import denver_tracts
+
+# Clockwise square with a counter-clockwise hole, as ArcGIS returns them.
+OUTER_CW = [[0.0, 0.0], [0.0, 4.0], [4.0, 4.0], [4.0, 0.0], [0.0, 0.0]]
+HOLE_CCW = [[1.0, 1.0], [2.0, 1.0], [2.0, 2.0], [1.0, 2.0], [1.0, 1.0]]
+
+
+def test_arcgis_rings_are_reoriented_for_geojson():
+    geo = json.loads(denver_tracts.arcgis_geometry_to_geojson({"rings": [OUTER_CW, HOLE_CCW]}))
+
+    assert geo["type"] == "Polygon"
+    outer, hole = geo["coordinates"]
+    assert outer == list(reversed(OUTER_CW))
+    assert hole == list(reversed(HOLE_CCW))
+
+
+def test_coordinates_are_clamped_to_geometry_precision():
+    ring = [[x - 104.123456789012, y + 39.987654321098] for x, y in OUTER_CW]
+
+    geo = json.loads(denver_tracts.arcgis_geometry_to_geojson({"rings": [ring]}))
+
+    assert geo["coordinates"][0][0] == [-104.123457, 39.987654]
+
+
+def test_separate_outer_rings_become_a_multipolygon():
+    shifted = [[x + 10.0, y] for x, y in OUTER_CW]
+
+    geo = json.loads(denver_tracts.arcgis_geometry_to_geojson({"rings": [OUTER_CW, shifted]}))
+
+    assert geo["type"] == "MultiPolygon"
+    assert len(geo["coordinates"]) == 2
+
+
+def test_degenerate_rings_yield_no_geometry():
+    assert denver_tracts.arcgis_geometry_to_geojson({"rings": [[[0, 0], [1, 1], [0, 0]]]}) is None
+    assert denver_tracts.arcgis_geometry_to_geojson({}) is None
+
+
+class _Response:
+    def __init__(self, payload: dict) -> None:
+        self.content = json.dumps(payload).encode()
+
+
+def _feature(geoid: str, rings: list) -> dict:
+    attrs = {"GEOID20": geoid, "NAMELSAD20": f"Tract {geoid}", "ALAND20": 10, "AWATER20": 0}
+    attrs |= {"STATEFP20": "08", "COUNTYFP20": "031"}
+    return {"attributes": attrs, "geometry": {"rings": rings}}
+
+
+def test_run_streams_pages_into_gzip_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(denver_tracts, "FIELD_MAP_CACHE_DIR", tmp_path / "cache")
+    pages = [
+        {"features": [_feature("1", [OUTER_CW])], "exceededTransferLimit": True},
+        {"features": [_feature("2", [OUTER_CW]), _feature("3", [])]},
+    ]
+
+    def fake_get(url, *, params, timeout, logger, session):
+        if params == {"f": "json"}:
+            fields = _feature("0", [])["attributes"]
+            return _Response({"fields": [{"name": name} for name in fields]})
+        assert params["geometryPrecision"] == 6
+        assert params["outFields"] == "GEOID20,NAMELSAD20,ALAND20,AWATER20,STATEFP20,COUNTYFP20"
+        return _Response(pages[0] if params["resultOffset"] == 0 else pages[1])
+
+    monkeypatch.setattr(denver_tracts.io, "http_get_with_retry", fake_get)
+    args = denver_tracts.build_parser().parse_args(["--extract-date", "2025-01-01"])
+
+    assert denver_tracts.run(args) == 0
+
+    out_dir = tmp_path / "data/raw/denver_tracts/extract_date=2025-01-01"
+    with gzip.open(out_dir / "tracts.csv.gz", "rt", encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["geoid"] for row in rows] == ["1", "2"]
+    assert rows[0]["aland_m2"] == "10"
+    manifest = json.loads((out_dir / "manifest.json").read_text())
+    assert manifest["record_count"] == 2
+    assert manifest["missing_geometry"] == 1
+
+    def fail_get(*_args, **_kwargs):
+        raise AssertionError("populated extract should be skipped via its manifest")
+
+    monkeypatch.setattr(denver_tracts.io, "http_get_with_retry", fail_get)
+    assert denver_tracts.run(args) == 0
+
+
+def test_field_mapping_is_read_from_layer_metadata(monkeypatch):
+    calls = []
+
+    def fake_get(url, *, params, timeout, logger, session):
+        calls.append((url, params))
+        names = ["OBJECTID", "GEOID", "NAME", "ALAND", "STATE", "COUNTY"]
+        return _Response(
+            {"fields": [{"name": name, "type": "esriFieldTypeString"} for name in names]}
+        )
+
+    monkeypatch.setattr(denver_tracts.io, "http_get_with_retry", fake_get)
+
+    mapping = denver_tracts.detect_field_mapping(source_url="https://layer/0", timeout=5)
+
+    assert calls == [("https://layer/0", {"f": "json"})]
+    assert (mapping.geoid_field, mapping.name_field, mapping.aland_field) == (
+        "GEOID",
+        "NAME",
+        "ALAND",
+    )
+    assert mapping.awater_field is None
+    assert (mapping.state_field, mapping.county_field) == ("STATE", "COUNTY")
+
+
+def test_empty_metadata_response_falls_back_to_default_mapping(monkeypatch):
+    monkeypatch.setattr(
+        denver_tracts.io,
+        "http_get_with_retry",
+        lambda url, **_kwargs: type("Empty", (), {"content": b""})(),
+    )
+
+    mapping = denver_tracts.detect_field_mapping(source_url="https://layer/0", timeout=5)
+
+    assert mapping == denver_tracts._DEFAULT_FIELD_MAPPING
+
+
+def test_field_mapping_is_cached_per_layer(tmp_path, monkeypatch):
+    monkeypatch.setattr(denver_tracts, "FIELD_MAP_CACHE_DIR", tmp_path)
+    calls = []
+
+    def fake_detect(*, source_url, timeout, session):
+        calls.append(source_url)
+        return denver_tracts.FieldMapping("GEOID", "NAME", None, None, "STATE", "COUNTY")
+
+    monkeypatch.setattr(denver_tracts, "detect_field_mapping", fake_detect)
+
+    first = denver_tracts.cached_field_mapping(source_url="https://layer/0", timeout=5)
+    second = denver_tracts.cached_field_mapping(source_url="https://layer/0", timeout=5)
+
+    assert first == second
+    assert calls == ["https://layer/0"]
+    assert len(list(tmp_path.glob("tract_field_map_*.json"))) == 1
+
+
+def test_large_batches_convert_geometry_on_the_pool(monkeypatch):
+    monkeypatch.setattr(denver_tracts, "PARALLEL_GEOMETRY_MIN_FEATURES", 2)
+    features = [_feature(str(i), [OUTER_CW]) for i in range(3)] + [_feature("9", [])]
+    field_map = denver_tracts._DEFAULT_FIELD_MAPPING
+    stats = denver_tracts.Stats(total=0, missing_geometry=0)
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        records = list(denver_tracts.normalize_stream(features, field_map, stats, pool=pool))
+
+    serial, _ = denver_tracts.normalize_records(features, field_map)
+    assert records == serial
+    assert (stats.fetched, stats.total, stats.missing_geometry) == (4, 3, 1)
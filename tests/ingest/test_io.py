@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import hashlib
+
+import pandas as pd
+import pytest
+
+from whyline.ingest import io
+
+
+@pytest.mark.parametrize("writer", ["pandas", "arrow"])
+def test_write_csv_gzip_round_trips_with_either_writer(tmp_path, monkeypatch, writer):
+    monkeypatch.setattr(io, "CSV_WRITER", writer)
+    df = pd.DataFrame({"geoid": ["08031", "08001"], "name": ['A, "B"', None], "pct": [0.25, None]})
+    target = tmp_path / "out" / "data.csv.gz"
+
+    size, digest = io.write_csv_gzip(df, target)
+
+    payload = target.read_bytes()
+    assert size == len(payload)
+    assert digest == hashlib.md5(payload, usedforsecurity=False).hexdigest()
+    round_trip = pd.read_csv(target, dtype={"geoid": str})
+    pd.testing.assert_frame_equal(round_trip, df, check_dtype=False)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import hashlib
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+
+from whyline.ingest import noaa_daily
+
+
+def test_build_dataframe_bins_precip_and_flags_snow_days():
+    records = [
+        {"date": "2025-01-01", "station": "S", "SNOW": "0", "PRCP": "0", "TMIN": "-5", "TMAX": "5"},
+        {"date": "2025-01-02", "station": "S", "SNOW": "2.5", "PRCP": "5"},
+        {"date": "2025-01-03", "station": "S", "SNOW": "0.5", "PRCP": "12.3"},
+        {"date": "2025-01-04", "station": "S", "SNOW": "NA", "PRCP": "40"},
+    ]
+
+    df = noaa_daily.build_dataframe(records, "2025-01-01", "2025-01-05", "S")
+
+    assert list(df.columns) == noaa_daily.COLUMNS_IN_ORDER()
+    assert df["precip_bin"].tolist()[:4] == ["none", "light", "mod", "heavy"]
+    assert pd.isna(df["precip_bin"].iloc[4])
+    assert df["snow_day"].tolist() == [0, 1, 0, pd.NA, pd.NA]
+    assert str(df["snow_day"].dtype) == "Int64"
+    assert df["tavg_c"].iloc[0] == 0.0
+    assert df["station"].tolist() == ["S"] * 5
+
+
+def test_run_streams_gzip_csv_and_manifest_hash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / "noaa.csv"
+    source.write_text("DATE,STATION,SNOW,PRCP,TMIN,TMAX\n2025-01-01,S,0,3,-2,4\n")
+    args = noaa_daily.build_parser().parse_args(
+        ["--extract-date", "2025-01-10", "--start", "2025-01-01", "--end", "2025-01-02"]
+        + ["--source-path", str(source)]
+    )
+
+    assert noaa_daily.run(args) == 0
+
+    out_dir = tmp_path / "data/raw/noaa_daily/extract_date=2025-01-10"
+    payload = (out_dir / noaa_daily.OUTPUT_FILENAME).read_bytes()
+    with gzip.open(out_dir / noaa_daily.OUTPUT_FILENAME, "rt", encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["date"] for row in rows] == ["2025-01-01", "2025-01-02"]
+    manifest = json.loads((out_dir / "manifest.json").read_text())
+    assert manifest["bytes"] == len(payload)
+    assert manifest["hash_md5"] == hashlib.md5(payload, usedforsecurity=False).hexdigest()
+    assert sorted(path.name for path in out_dir.iterdir()) == [
+        "manifest.json",
+        noaa_daily.OUTPUT_FILENAME,
+    ]
+
+
+def test_run_can_write_parquet(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / "noaa.csv"
+    source.write_text("DATE,STATION,SNOW,PRCP,TMIN,TMAX\n2025-01-01,S,0,3,-2,4\n")
+    args = noaa_daily.build_parser().parse_args(
+        ["--extract-date", "2025-01-10", "--start", "2025-01-01", "--end", "2025-01-02"]
+        + ["--source-path", str(source), "--format", "parquet"]
+    )
+
+    assert noaa_daily.run(args) == 0
+
+    out_dir = tmp_path / "data/raw/noaa_daily/extract_date=2025-01-10"
+    df = pd.read_parquet(out_dir / "weather.parquet")
+    assert df["precip_bin"].tolist()[0] == "light"
+    manifest = json.loads((out_dir / "manifest.json").read_text())
+    assert list(manifest["files"]) == ["weather.parquet"]
+
+
+class _FakeSession:
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.offsets: list[int] = []
+
+    def get(self, url, *, headers, params, timeout):
+        offset = params["offset"]
+        self.offsets.append(offset)
+        day = f"2025-01-{(offset - 1) // params['limit'] + 1:02d}"
+        payload = {
+            "metadata": {"resultset": {"count": self.total}},
+            "results": [
+                {"date": f"{day}T00:00:00", "station": "GHCND:S", "datatype": "PRCP", "value": 1},
+                {"date": f"{day}T00:00:00", "station": "GHCND:S", "datatype": "SNOW", "value": 0},
+            ],
+        }
+        return SimpleNamespace(raise_for_status=lambda: None, content=json.dumps(payload).encode())
+
+
+def test_fetch_noaa_cdo_requests_remaining_pages_concurrently(monkeypatch):
+    monkeypatch.setattr(noaa_daily, "CDO_MAX_REQUESTS_PER_SEC", 1000.0)
+    session = _FakeSession(total=2500)
+
+    records = noaa_daily.fetch_noaa_cdo(
+        token="test-token",  # noqa: S106
+        station="S",
+        start="2025-01-01",
+        end="2025-01-03",
+        timeout=5,
+        session=session,
+    )
+
+    assert sorted(session.offsets) == [1, 1001, 2001]
+    assert records["date"].tolist() == ["2025-01-01", "2025-01-02", "2025-01-03"]
+    assert records.iloc[0].to_dict() == {"date": "2025-01-01", "PRCP": 1, "SNOW": 0, "station": "S"}
+    df = noaa_daily.build_dataframe(records, "2025-01-01", "2025-01-04", "S")
+    assert df["precip_mm"].tolist()[:3] == [1.0, 1.0, 1.0]
+    assert pd.isna(df["precip_mm"].iloc[3])
+
+
+def test_tenths_units_are_scaled_per_column():
+    records = [
+        {"date": "2025-01-01", "station": "S", "PRCP": "250", "TMIN": "-5", "TMAX": "120"},
+        {"date": "2025-01-02", "station": "S", "PRCP": "NA"},
+    ]
+
+    df = noaa_daily.build_dataframe(records, "2025-01-01", "2025-01-02", "S")
+
+    assert df["precip_mm"].iloc[0] == 25.0
+    assert df["tmax_c"].iloc[0] == 12.0
+    assert df["tmin_c"].iloc[0] == -5.0
+    assert df["snow_mm"].isna().all()
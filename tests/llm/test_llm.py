@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import pytest
+
 from whyline.llm import adapt_sql_for_engine
-from whyline.semantics.dbt_artifacts import ModelInfo
+from whyline.semantics.dbt_artifacts import ColumnInfo, ModelInfo
 
 
 def test_adapt_sql_for_duckdb_date_sub() -> None:
@@ -39,3 +41,82 @@ def test_adapt_sql_bigquery_leaves_already_qualified_tables_alone() -> None:
     }
     result = adapt_sql_for_engine(sql, "bigquery", models)
     assert result == sql
+
+
+def test_adapt_sql_bigquery_skips_ctes_and_keeps_aliases() -> None:
+    sql = (
+        "WITH recent AS (SELECT * FROM mart_a)\n"
+        "SELECT * FROM recent r JOIN mart_b AS b ON r.id = b.id"
+    )
+    models = {
+        name: ModelInfo(name=name, fq_name=name, description=None) for name in ("mart_a", "mart_b")
+    }
+
+    result = adapt_sql_for_engine(sql, "bigquery", models)
+
+    assert result == (
+        "WITH recent AS (SELECT * FROM `whyline-denver.mart_denver.mart_a`)\n"
+        "SELECT * FROM recent r JOIN `whyline-denver.mart_denver.mart_b` AS b ON r.id = b.id"
+    )
+
+
+def test_schema_brief_is_memoized_on_model_metadata() -> None:
+    from whyline.llm import _schema_brief_from_fingerprint, build_schema_brief
+
+    models = {
+        "mart_b": ModelInfo(name="mart_b", fq_name="p.d.mart_b", description="B mart"),
+        "mart_a": ModelInfo(
+            name="mart_a",
+            fq_name="p.d.mart_a",
+            description=None,
+            columns={name: ColumnInfo(type=None, description=None) for name in "xyz"},
+        ),
+    }
+    _schema_brief_from_fingerprint.cache_clear()
+
+    first = build_schema_brief(models, max_columns=2)
+    second = build_schema_brief(dict(models), max_columns=2)
+
+    assert first == "mart_a:  | cols: x, y\nmart_b: B mart | cols:"
+    assert second is first
+    assert _schema_brief_from_fingerprint.cache_info().hits == 1
+
+
+def test_batch_call_packs_questions_and_splits_answers(monkeypatch) -> None:
+    from whyline import llm
+
+    prompts: list[str] = []
+
+    def fake_text(prompt: str) -> str:
+        prompts.append(prompt)
+        return '```json\n[{"sql": "SELECT 1", "explanation": "a"}, {"sql": "SELECT 2"}]\n```'
+
+    monkeypatch.setattr(llm, "LLM_PROVIDER", "gemini")
+    monkeypatch.setattr(llm, "_gemini_text", fake_text)
+
+    answers = llm.call_provider_batch(["first?", "second?"], [None, {"route": "15"}], "brief")
+
+    assert answers == [
+        {"sql": "SELECT 1", "explanation": "a"},
+        {"sql": "SELECT 2", "explanation": "Generated by Gemini."},
+    ]
+    assert len(prompts) == 1
+    assert prompts[0].count("brief") == 1
+    assert "1. first?" in prompts[0] and '"route": "15"' in prompts[0]
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ('```json\n{"sql": "SELECT 1"}\n```', '{"sql": "SELECT 1"}'),
+        ("```\nSELECT 1\n```", "SELECT 1"),
+        ("  ```sql  \nSELECT 1```  ", "SELECT 1"),
+        ("``` sql\nSELECT 1\n```", "SELECT 1"),
+        ("`SELECT 1`", "SELECT 1"),
+        ("SELECT 1", "SELECT 1"),
+    ],
+)
+def test_strip_code_fence(text: str, expected: str) -> None:
+    from whyline.llm import _strip_code_fence
+
+    assert _strip_code_fence(text) == expected
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from whyline import llm
+from whyline.llm_cache import FileBackend, LLMCache, MemoryBackend
+
+
+def test_gemini_responses_are_served_from_cache(monkeypatch):
+    calls: list[str] = []
+
+    def fake_gemini(prompt: str) -> dict[str, str]:
+        calls.append(prompt)
+        return {"sql": "SELECT 1", "explanation": "one"}
+
+    cache = LLMCache(MemoryBackend())
+    monkeypatch.setattr(llm, "LLM_PROVIDER", "gemini")
+    monkeypatch.setattr(llm, "_gemini_response", fake_gemini)
+    monkeypatch.setattr(llm, "llm_cache", cache)
+
+    first = llm.call_provider("prompt")
+    second = llm.call_provider("prompt")
+
+    assert first == second == {"sql": "SELECT 1", "explanation": "one"}
+    assert calls == ["prompt"]
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+
+def test_memory_backend_expires_and_evicts():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, ttl_seconds=60)
+    backend.set("b", 2, ttl_seconds=60)
+    backend.get("a")
+    backend.set("c", 3, ttl_seconds=60)
+
+    assert backend.get("a") == 1
+    assert backend.get("b") is None
+    backend.set("stale", 4, ttl_seconds=-1)
+    assert backend.get("stale") is None
+
+
+def test_file_backend_round_trips_between_instances(tmp_path):
+    FileBackend(tmp_path).set("k", {"sql": "SELECT 1"}, ttl_seconds=60)
+    FileBackend(tmp_path).set("old", {"sql": "SELECT 2"}, ttl_seconds=-1)
+
+    assert FileBackend(tmp_path).get("k") == {"sql": "SELECT 1"}
+    assert FileBackend(tmp_path).get("old") is None
+    assert FileBackend(tmp_path).get("missing") is None
+
+
+def test_async_provider_awaits_gemini_and_shares_cache(monkeypatch):
+    calls: list[str] = []
+
+    async def chunks():
+        yield SimpleNamespace(text='```json\n{"sql": "SELECT 2", ')
+        yield SimpleNamespace(text='"explanation": "two"}\n```')
+        raise AssertionError("stream should be abandoned once the payload parses")
+
+    class FakeModel:
+        async def generate_content_async(self, prompt: str, *, stream: bool):
+            assert stream
+            calls.append(prompt)
+            return chunks()
+
+    cache = LLMCache(MemoryBackend())
+    monkeypatch.setattr(llm, "LLM_PROVIDER", "gemini")
+    monkeypatch.setattr(llm, "_init_gemini_model", FakeModel)
+    monkeypatch.setattr(llm, "llm_cache", cache)
+
+    first = asyncio.run(llm.call_provider_async("prompt"))
+    second = asyncio.run(llm.call_provider_async("prompt"))
+
+    assert first == second == {"sql": "SELECT 2", "explanation": "two"}
+    assert calls == ["prompt"]
+
+
+def test_streamed_gemini_answer_stops_once_json_is_complete(monkeypatch):
+    def stream():
+        yield SimpleNamespace(text='```json\n{"sql": "SELECT 3", "meta": {}')
+        yield SimpleNamespace(text=', "explanation": "three"}\n```')
+        raise AssertionError("stream should be abandoned once the payload parses")
+
+    class FakeModel:
+        def generate_content(self, prompt: str, *, stream: bool):
+            assert stream
+            return events
+
+    events = stream()
+    monkeypatch.setattr(llm, "_init_gemini_model", FakeModel)
+
+    assert llm._gemini_response("prompt") == {"sql": "SELECT 3", "explanation": "three"}
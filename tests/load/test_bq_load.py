@@ -0,0 +1,655 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+from datetime import UTC, date, datetime
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pyarrow.parquet as pq
+import pytest
+from google.api_core.exceptions import NotFound
+
+from whyline.load import bq_load
+from whyline.load.registry import META_COLUMNS, JobSpec, _cols
+
+JOB = JobSpec(
+    name="sample",
+    patterns=("sample/extract_date=*/data.csv.gz",),
+    table="raw_sample",
+    columns=_cols(("id", "STRING")),
+)
+
+
+@pytest.fixture
+def raw_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(bq_load, "RAW_ROOT_LOCAL", tmp_path)
+    monkeypatch.setattr(bq_load, "JOBS", (JOB,))
+    bq_load._MANIFEST_CACHE_LOCAL.clear()
+    return tmp_path
+
+
+def _write_extract(root: Path, extract_date: str, payload: bytes, *, manifest: bool) -> Path:
+    directory = root / "sample" / f"extract_date={extract_date}"
+    directory.mkdir(parents=True)
+    path = directory / "data.csv.gz"
+    path.write_bytes(payload)
+    if manifest:
+        digest = hashlib.md5(payload, usedforsecurity=False).hexdigest()
+        (directory / "manifest.json").write_text(
+            json.dumps({"files": {"data.csv.gz": {"hash_md5": digest}}})
+        )
+    return path
+
+
+def test_build_plan_hashes_files_and_flags_loaded(raw_root, monkeypatch):
+    loaded = _write_extract(raw_root, "2025-01-01", b"id\n1\n", manifest=True)
+    fresh = [
+        _write_extract(raw_root, f"2025-01-0{day}", f"id\n{day}\n".encode(), manifest=False)
+        for day in (2, 3, 4)
+    ]
+    loaded_hash = hashlib.md5(loaded.read_bytes(), usedforsecurity=False).hexdigest()
+    monkeypatch.setattr(
+        bq_load,
+        "load_ingestion_log_cache",
+        lambda _client, **_kwargs: {bq_load.ingestion_log_key(str(loaded), loaded_hash)},
+    )
+
+    plan = bq_load.build_plan(
+        bq_client=None,
+        storage_client=None,
+        bucket=None,
+        source="local",
+        start_date=None,
+        end_date=None,
+    )
+
+    by_path = {item.file.local_path: item for item in plan}
+    assert by_path[loaded].already_loaded
+    for path in fresh:
+        item = by_path[path]
+        assert not item.already_loaded
+        assert item.hash_md5 == hashlib.md5(path.read_bytes(), usedforsecurity=False).hexdigest()
+
+
+def test_build_plan_skips_out_of_range_without_hashing(raw_root, monkeypatch):
+    _write_extract(raw_root, "2024-12-31", b"id\n1\n", manifest=False)
+    monkeypatch.setattr(bq_load, "load_ingestion_log_cache", lambda _client, **_kwargs: set())
+
+    plan = bq_load.build_plan(
+        bq_client=None,
+        storage_client=None,
+        bucket=None,
+        source="local",
+        start_date=date(2025, 1, 1),
+        end_date=None,
+    )
+
+    assert len(plan) == 1
+    assert plan[0].skip_reason
+    assert plan[0].hash_md5 is None
+
+
+def test_ingestion_log_cache_is_scoped_to_run_prefixes(monkeypatch):
+    monkeypatch.setattr(bq_load, "JOBS", (JOB,))
+    prefixes = bq_load.ingestion_log_prefixes(
+        source="gcs", bucket="bucket", start_date=date(2025, 1, 1), end_date=date(2025, 1, 2)
+    )
+    bq_client = MagicMock()
+    bq_client.query.return_value.result.return_value = [
+        SimpleNamespace(_source_path="gs://bucket/raw/sample/x.csv.gz", _hash_md5="aa")
+    ]
+
+    cache = bq_load.load_ingestion_log_cache(bq_client, prefixes=prefixes)
+
+    assert prefixes == [
+        "gs://bucket/raw/sample/extract_date=2025-01-01",
+        "gs://bucket/raw/sample/extract_date=2025-01-02",
+    ]
+    assert "STARTS_WITH(_source_path, prefix)" in bq_client.query.call_args.args[0]
+    params = bq_client.query.call_args.kwargs["job_config"].query_parameters
+    assert params[0].values == prefixes
+    assert cache == {
+        bq_load.ingestion_log_key("gs://bucket/raw/sample/x.csv.gz", "aa"),
+        bq_load.ingestion_log_path_key("gs://bucket/raw/sample/x.csv.gz"),
+    }
+
+
+def test_local_until_only_run_keeps_earlier_log_rows_in_scope(raw_root, monkeypatch):
+    path = _write_extract(raw_root, "2025-01-01", b"old", manifest=True)
+    digest = hashlib.md5(b"old", usedforsecurity=False).hexdigest()
+    bq_client = MagicMock()
+    bq_client.query.return_value.result.return_value = [
+        SimpleNamespace(_source_path=str(path), _hash_md5=digest)
+    ]
+
+    prefixes = bq_load.ingestion_log_prefixes(
+        source="local", bucket=None, start_date=None, end_date=date(2025, 1, 5)
+    )
+    plan = bq_load.build_plan(
+        bq_client=bq_client,
+        storage_client=None,
+        bucket=None,
+        source="local",
+        start_date=None,
+        end_date=date(2025, 1, 5),
+    )
+
+    assert prefixes == [f"{raw_root.as_posix()}/sample/"]
+    assert str(path).startswith(prefixes[0])
+    assert [(item.skip_reason, item.already_loaded) for item in plan] == [(None, True)]
+
+
+def test_fingerprint_file_dispatches_on_algo(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"id\n1\n")
+
+    assert bq_load.fingerprint_file(path, algo="md5") == bq_load.md5_bytes(b"id\n1\n")
+    with pytest.raises(ValueError, match="WLD_HASH_ALGO"):
+        bq_load.fingerprint_file(path, algo="sha1")
+    if bq_load.xxhash is not None:
+        assert bq_load.fingerprint_file(path, algo="xxh3_128").startswith("xxh3_128:")
+
+
+class _Blob:
+    def __init__(self, name: str, *, md5_hash: str | None, crc32c: str | None) -> None:
+        self.name = name
+        self.md5_hash = md5_hash
+        self.crc32c = crc32c
+        self.size = 5
+
+    def download_as_bytes(self) -> bytes:  # pragma: no cover - must not be reached
+        raise AssertionError("hash fallback should not download the object")
+
+
+def test_gcs_hash_falls_back_to_crc32c_without_download(monkeypatch):
+    monkeypatch.setattr(bq_load, "hash_from_gcs_manifest", lambda _blob, _client: None)
+    blob = _Blob("raw/sample/extract_date=2025-01-01/data.csv.gz", md5_hash=None, crc32c="AAAAAQ==")
+    file_ref = bq_load.FileRef(
+        source_path=f"gs://bucket/{blob.name}",
+        relative_path="sample/extract_date=2025-01-01/data.csv.gz",
+        extract_date=date(2025, 1, 1),
+        size=5,
+        is_gcs=True,
+        blob=blob,
+    )
+
+    assert bq_load.compute_file_hash(file_ref, storage_client=object()) == "crc32c:00000001"
+
+
+def _legacy_gcs_file(payload: bytes) -> bq_load.FileRef:
+    blob = _Blob("raw/sample/extract_date=2025-01-01/data.csv.gz", md5_hash=None, crc32c="AAAAAQ==")
+    blob.open = lambda mode, chunk_size: io.BytesIO(payload)
+    return bq_load.FileRef(
+        source_path=f"gs://bucket/{blob.name}",
+        relative_path="sample/extract_date=2025-01-01/data.csv.gz",
+        extract_date=date(2025, 1, 1),
+        size=len(payload),
+        is_gcs=True,
+        blob=blob,
+    )
+
+
+def _legacy_item(file_ref: bq_load.FileRef, cache: set[bytes]) -> bq_load.PlanItem:
+    item = bq_load.PlanItem(
+        job=JOB, file=file_ref, hash_md5=bq_load.hash_from_metadata(file_ref, object())
+    )
+    bq_load.defer_legacy_md5(item, cache)
+    return item
+
+
+def test_gcs_objects_logged_by_downloaded_md5_migrate_to_crc32c_once(monkeypatch):
+    monkeypatch.setattr(bq_load, "hash_from_gcs_manifest", lambda _blob, _client: None)
+    payload = b"id\n1\n"
+    file_ref = _legacy_gcs_file(payload)
+    cache = {
+        bq_load.ingestion_log_key(file_ref.source_path, bq_load.md5_bytes(payload)),
+        bq_load.ingestion_log_path_key(file_ref.source_path),
+    }
+
+    item = _legacy_item(file_ref, cache)
+    # Deferred to resolve_pending_hashes rather than downloaded during discovery.
+    assert item.hash_md5 is None
+    assert item.crc32c_alias == "crc32c:00000001"
+
+    bq_load.resolve_pending_hashes([item], storage_client=None)
+    assert item.hash_md5 == bq_load.md5_bytes(payload)
+    item.already_loaded = bq_load.already_loaded(
+        ingestion_cache=cache, source_path=file_ref.source_path, hash_md5=item.hash_md5
+    )
+    bq_load.settle_crc32c_aliases([item])
+    assert item.already_loaded
+    assert item.crc32c_alias == "crc32c:00000001"
+
+    recorded: list[dict] = []
+    monkeypatch.setattr(bq_load, "flush_ingestion_log", lambda _client, rows: recorded.extend(rows))
+    bq_load.record_crc32c_aliases(object(), [item])
+    assert [(row["_hash_md5"], row["rows"]) for row in recorded] == [("crc32c:00000001", 0)]
+
+    cache.add(bq_load.ingestion_log_key(file_ref.source_path, recorded[0]["_hash_md5"]))
+    rerun = _legacy_item(file_ref, cache)
+    assert rerun.crc32c_alias is None
+    assert bq_load.already_loaded(
+        ingestion_cache=cache, source_path=file_ref.source_path, hash_md5=rerun.hash_md5
+    )
+
+
+def test_changed_legacy_gcs_object_is_loaded_under_crc32c(monkeypatch):
+    monkeypatch.setattr(bq_load, "hash_from_gcs_manifest", lambda _blob, _client: None)
+    file_ref = _legacy_gcs_file(b"id\n2\n")
+    cache = {
+        bq_load.ingestion_log_key(file_ref.source_path, bq_load.md5_bytes(b"id\n1\n")),
+        bq_load.ingestion_log_path_key(file_ref.source_path),
+    }
+
+    item = _legacy_item(file_ref, cache)
+    bq_load.resolve_pending_hashes([item], storage_client=None)
+    item.already_loaded = bq_load.already_loaded(
+        ingestion_cache=cache, source_path=file_ref.source_path, hash_md5=item.hash_md5
+    )
+    bq_load.settle_crc32c_aliases([item])
+
+    assert not item.already_loaded
+    assert item.hash_md5 == "crc32c:00000001"
+    assert item.crc32c_alias is None
+
+
+def test_gcs_objects_without_legacy_rows_hash_from_metadata(monkeypatch):
+    monkeypatch.setattr(bq_load, "hash_from_gcs_manifest", lambda _blob, _client: None)
+    item = _legacy_item(_legacy_gcs_file(b"id\n1\n"), set())
+
+    assert item.hash_md5 == "crc32c:00000001"
+    assert item.crc32c_alias is None
+
+
+def _gcs_item(extract_date: str, digest: str) -> bq_load.PlanItem:
+    path = f"sample/extract_date={extract_date}/data.csv.gz"
+    return bq_load.PlanItem(
+        job=JOB,
+        file=bq_load.FileRef(
+            source_path=f"gs://bucket/raw/{path}",
+            relative_path=path,
+            extract_date=date.fromisoformat(extract_date),
+            size=5,
+            is_gcs=True,
+        ),
+        hash_md5=digest,
+    )
+
+
+def test_gcs_md5_fallback_streams_the_object(monkeypatch):
+    monkeypatch.setattr(bq_load, "hash_from_gcs_manifest", lambda _blob, _client: None)
+    monkeypatch.setattr(bq_load, "HASH_STREAM_CHUNK", 4)
+    payload = b"id\n1\n2\n3\n"
+    blob = _Blob("raw/sample/extract_date=2025-01-01/data.csv.gz", md5_hash=None, crc32c=None)
+    blob.open = lambda mode, chunk_size: io.BytesIO(payload)
+    file_ref = bq_load.FileRef(
+        source_path=f"gs://bucket/{blob.name}",
+        relative_path="sample/extract_date=2025-01-01/data.csv.gz",
+        extract_date=date(2025, 1, 1),
+        size=len(payload),
+        is_gcs=True,
+        blob=blob,
+    )
+
+    assert bq_load.compute_file_hash(file_ref, storage_client=object()) == bq_load.md5_bytes(
+        payload
+    )
+
+
+def test_gcs_manifest_lookup_is_a_single_get(monkeypatch):
+    monkeypatch.setattr(bq_load, "_MANIFEST_CACHE_GCS", {})
+    manifest_blob = MagicMock()
+    manifest_blob.download_as_bytes.side_effect = NotFound("missing")
+    blob = SimpleNamespace(
+        name="raw/sample/extract_date=2025-01-01/data.csv.gz",
+        bucket=SimpleNamespace(name="bucket", blob=lambda _name: manifest_blob),
+    )
+
+    assert bq_load.hash_from_gcs_manifest(blob, storage_client=object()) is None
+    assert bq_load.hash_from_gcs_manifest(blob, storage_client=object()) is None
+    manifest_blob.exists.assert_not_called()
+    manifest_blob.download_as_bytes.assert_called_once()
+
+
+def test_build_plan_stops_listing_once_max_files_are_new(raw_root, monkeypatch):
+    monkeypatch.setattr(bq_load, "hash_from_gcs_manifest", lambda _blob, _client: None)
+    monkeypatch.setattr(bq_load, "load_ingestion_log_cache", lambda _client, **_kwargs: set())
+    listed: list[str] = []
+
+    def list_blobs(_bucket, *, prefix, **_kwargs):
+        for day in range(1, 10):
+            name = f"{prefix}extract_date=2025-01-0{day}/data.csv.gz"
+            listed.append(name)
+            yield _Blob(name, md5_hash="AAAAAAAAAAAAAAAAAAAAAA==", crc32c=None)
+
+    storage_client = SimpleNamespace(list_blobs=list_blobs)
+    plan = bq_load.build_plan(
+        bq_client=None,
+        storage_client=storage_client,
+        bucket="bucket",
+        source="gcs",
+        start_date=None,
+        end_date=None,
+        max_files=2,
+    )
+
+    assert len(plan) == 2
+    assert len(listed) == 2
+
+
+def test_gcs_listings_keep_prefix_order_when_fanned_out():
+    def list_blobs(_bucket, *, prefix, **_kwargs):
+        return [SimpleNamespace(name=f"{prefix}/data.csv.gz")]
+
+    prefixes = [f"raw/sample/extract_date=2025-01-{day:02d}" for day in range(1, 21)]
+    listings = bq_load.iter_gcs_listings(SimpleNamespace(list_blobs=list_blobs), "b", prefixes)
+
+    names = [blob.name for blobs in listings for blob in blobs]
+    assert names == [f"{prefix}/data.csv.gz" for prefix in prefixes]
+
+
+def test_execute_plan_runs_one_load_script_per_job_batch():
+    bq_client = MagicMock()
+    items = [_gcs_item("2025-01-01", "aa"), _gcs_item("2025-01-02", "bb")]
+    bq_client.query.return_value.result.return_value = [
+        SimpleNamespace(source_path=items[1].file.source_path, row_count=3),
+        SimpleNamespace(source_path=items[0].file.source_path, row_count=7),
+    ]
+    bq_client.insert_rows_json.return_value = []
+
+    loaded = bq_load.execute_plan(items, bq_client=bq_client)
+
+    assert loaded == 2
+    bq_client.load_table_from_uri.assert_not_called()
+    bq_client.delete_table.assert_not_called()
+    assert bq_client.query.call_count == 1
+    script = bq_client.query.call_args.args[0]
+    assert script.count("CREATE EXTERNAL TABLE") == 1
+    assert "LOAD DATA" not in script
+    assert (
+        "uris = ['gs://bucket/raw/sample/extract_date=2025-01-01/data.csv.gz', "
+        "'gs://bucket/raw/sample/extract_date=2025-01-02/data.csv.gz']" in script
+    )
+    assert "compression = 'GZIP'" in script
+    assert script.count("INSERT INTO") == 1
+    assert script.count("DROP EXTERNAL TABLE") == 1
+    params = bq_client.query.call_args.kwargs["job_config"].query_parameters
+    files = next(param for param in params if param.name == "files")
+    assert [value.struct_values["hash_md5"] for value in files.values] == ["aa", "bb"]
+    log_rows = bq_client.insert_rows_json.call_args.args[1]
+    assert [row["_hash_md5"] for row in log_rows] == ["aa", "bb"]
+    assert [row["rows"] for row in log_rows] == [7, 3]
+
+
+def test_remote_load_drops_external_table_when_script_fails():
+    bq_client = MagicMock()
+    bq_client.query.side_effect = RuntimeError("load failed")
+
+    with pytest.raises(RuntimeError, match="load failed"):
+        bq_load.stage_remote_files(
+            bq_client=bq_client,
+            job=JOB,
+            items=[_gcs_item("2025-01-01", "aa")],
+            ingested_at=datetime(2025, 1, 2, tzinfo=UTC),
+        )
+
+    external_id = bq_client.delete_table.call_args.args[0]
+    assert external_id.rsplit(".", 1)[-1].startswith("_staging_")
+    assert bq_client.delete_table.call_args.kwargs == {"not_found_ok": True}
+
+
+def test_execute_plan_flushes_log_rows_for_loaded_batches_on_failure():
+    other_job = JobSpec(name="other", patterns=JOB.patterns, table="raw_other", columns=JOB.columns)
+    first = MagicMock()
+    first.result.return_value = [
+        SimpleNamespace(source_path=_gcs_item("2025-01-01", "aa").file.source_path, row_count=4)
+    ]
+    bq_client = MagicMock()
+    bq_client.query.side_effect = [first, RuntimeError("load failed")]
+    bq_client.insert_rows_json.return_value = []
+    failing = _gcs_item("2025-01-02", "bb")
+    failing.job = other_job
+
+    with pytest.raises(RuntimeError, match="load failed"):
+        bq_load.execute_plan(
+            [_gcs_item("2025-01-01", "aa"), failing],
+            bq_client=bq_client,
+        )
+
+    bq_client.insert_rows_json.assert_called_once()
+    log_rows = bq_client.insert_rows_json.call_args.args[1]
+    assert [(row["table"], row["_hash_md5"]) for row in log_rows] == [("raw_sample", "aa")]
+
+
+def test_destination_table_is_checked_once_per_process(monkeypatch):
+    monkeypatch.setattr(bq_load, "_ENSURED_TABLES", set())
+    bq_client = MagicMock()
+
+    bq_load.ensure_destination_table(bq_client, JOB)
+    bq_load.ensure_destination_table(bq_client, JOB)
+
+    bq_client.get_table.assert_called_once_with(JOB.fq_table())
+    bq_client.create_table.assert_not_called()
+
+
+def test_local_files_load_directly_without_temp_objects(raw_root):
+    path = _write_extract(raw_root, "2025-01-01", b"", manifest=False)
+    with gzip.open(path, "wt") as handle:
+        handle.write("id\n1\n2\n")
+    item = _gcs_item("2025-01-01", "aa")
+    item.file.is_gcs = False
+    item.file.local_path = path
+    bq_client = MagicMock()
+    bq_client.load_table_from_file.return_value.result.return_value.output_rows = 2
+    bq_client.insert_rows_json.return_value = []
+
+    assert bq_load.execute_plan([item], bq_client=bq_client) == 1
+
+    bq_client.load_table_from_uri.assert_not_called()
+    config = bq_client.load_table_from_file.call_args.kwargs["job_config"]
+    assert config.source_format == "PARQUET"
+    assert bq_client.insert_rows_json.call_args.args[1][0]["rows"] == 2
+
+
+def test_stamp_metadata_columns_appends_meta_values(tmp_path):
+    source = tmp_path / "data.csv.gz"
+    with gzip.open(source, "wt", encoding="utf-8", newline="") as handle:
+        handle.write('id\n1\n"multi\nline"\n')
+    target = tmp_path / "stamped.csv.gz"
+
+    rows = bq_load.stamp_metadata_columns(
+        source, target, job=JOB, meta_values=("ts", "src", "2025-01-01", "hash")
+    )
+
+    with gzip.open(target, "rt", encoding="utf-8", newline="") as handle:
+        stamped = list(csv.reader(handle))
+    assert rows == 2
+    assert stamped[0] == ["id", "_ingested_at", "_source_path", "_extract_date", "_hash_md5"]
+    assert stamped[2] == ["multi\nline", "ts", "src", "2025-01-01", "hash"]
+
+
+def test_write_parquet_with_metadata_types_columns_and_appends_meta(tmp_path):
+    job = JobSpec(
+        name="typed",
+        patterns=JOB.patterns,
+        table="raw_typed",
+        columns=_cols(("id", "STRING"), ("count", "INT64"), ("amount", "NUMERIC")),
+    )
+    source = tmp_path / "data.csv.gz"
+    with gzip.open(source, "wt", encoding="utf-8", newline="") as handle:
+        handle.write('id,count,amount\n"multi\nline",3,1.25\nb,,\n')
+    target = tmp_path / "staged.parquet"
+    ingested_at = datetime(2025, 1, 2, tzinfo=UTC)
+
+    rows = bq_load.write_parquet_with_metadata(
+        source,
+        target,
+        job=job,
+        meta_values=(ingested_at, "src", date(2025, 1, 1), "hash"),
+    )
+
+    table = pq.read_table(target)
+    assert rows == 2
+    assert table.column_names == ["id", "count", "amount", *(m.name for m in META_COLUMNS)]
+    assert table.column("count").to_pylist() == [3, None]
+    assert table.column("amount").to_pylist() == [Decimal("1.25"), None]
+    assert table.column("_extract_date").to_pylist() == [date(2025, 1, 1)] * 2
+    assert table.column("_ingested_at").to_pylist()[0] == ingested_at
+
+
+def test_stage_local_file_falls_back_to_csv_when_types_do_not_parse(tmp_path):
+    job = JobSpec(
+        name="typed", patterns=JOB.patterns, table="raw_typed", columns=_cols(("n", "INT64"))
+    )
+    source = tmp_path / "data.csv"
+    source.write_text("n\nnot-a-number\n")
+    item = _gcs_item("2025-01-01", "aa")
+    item.file.local_path = source
+
+    staged, config = bq_load.stage_local_file(
+        item, job=job, workdir=tmp_path, ingested_at=datetime(2025, 1, 2, tzinfo=UTC)
+    )
+
+    assert staged.name.endswith(".csv.gz")
+    assert config.source_format == "CSV"
+
+
+def test_staged_parquet_schema_matches_destination_modes(tmp_path):
+    job = JobSpec(
+        name="typed",
+        patterns=JOB.patterns,
+        table="raw_typed",
+        columns=_cols(("id", "STRING", "REQUIRED"), ("count", "INT64")),
+    )
+    source = tmp_path / "data.csv"
+    source.write_text("id,count\na,1\nb,\n")
+    target = tmp_path / "staged.parquet"
+
+    bq_load.write_parquet_with_metadata(
+        source,
+        target,
+        job=job,
+        meta_values=(datetime(2025, 1, 2, tzinfo=UTC), "src", date(2025, 1, 1), "hash"),
+    )
+
+    schema = pq.read_schema(target)
+    expected = job.table_schema()
+    assert schema.names == [field.name for field in expected]
+    for field in expected:
+        assert schema.field(field.name).nullable == (field.mode != "REQUIRED")
+    assert bq_load.build_load_config(job, parquet=True).schema == expected
+
+
+def test_stage_local_file_falls_back_to_csv_when_required_column_is_null(tmp_path):
+    job = JobSpec(
+        name="typed",
+        patterns=JOB.patterns,
+        table="raw_typed",
+        columns=_cols(("id", "STRING", "REQUIRED")),
+    )
+    source = tmp_path / "data.csv"
+    source.write_text('id\na\n""\n')
+    item = _gcs_item("2025-01-01", "aa")
+    item.file.local_path = source
+
+    staged, config = bq_load.stage_local_file(
+        item, job=job, workdir=tmp_path, ingested_at=datetime(2025, 1, 2, tzinfo=UTC)
+    )
+
+    assert config.source_format == "CSV"
+
+
+def test_failed_log_flush_is_not_retried_and_keeps_only_rejected_rows(monkeypatch):
+    monkeypatch.setattr(bq_load, "INGESTION_LOG_INSERT_BATCH", 2)
+    rows = [{"_hash_md5": digest} for digest in ("aa", "bb", "cc")]
+    monkeypatch.setattr(bq_load, "load_batch", lambda **_kwargs: [dict(row) for row in rows])
+    bq_client = MagicMock()
+    bq_client.insert_rows_json.side_effect = [[], [{"index": 0, "errors": ["bad"]}]]
+
+    with pytest.raises(bq_load.IngestionLogError):
+        bq_load.execute_plan([_gcs_item("2025-01-01", "aa")], bq_client=bq_client)
+
+    assert bq_client.insert_rows_json.call_count == 2
+    pending: list[dict] = [dict(row) for row in rows]
+    bq_client.insert_rows_json.side_effect = [[], [{"index": 0, "errors": ["bad"]}]]
+    with pytest.raises(bq_load.IngestionLogError):
+        bq_load.flush_ingestion_log(bq_client, pending)
+    assert pending == [{"_hash_md5": "cc"}]
+
+
+def test_log_flush_error_does_not_mask_the_load_failure(monkeypatch):
+    calls = iter([[{"_hash_md5": "aa"}], RuntimeError("load failed")])
+
+    def load_batch(**_kwargs):
+        result = next(calls)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    other_job = JobSpec(name="other", patterns=JOB.patterns, table="raw_other", columns=JOB.columns)
+    failing = _gcs_item("2025-01-02", "bb")
+    failing.job = other_job
+    monkeypatch.setattr(bq_load, "load_batch", load_batch)
+    bq_client = MagicMock()
+    bq_client.insert_rows_json.side_effect = ConnectionError("log unavailable")
+
+    with pytest.raises(RuntimeError, match="load failed"):
+        bq_load.execute_plan([_gcs_item("2025-01-01", "aa"), failing], bq_client=bq_client)
+
+
+def test_local_load_failure_still_logs_files_that_were_appended(raw_root):
+    items = []
+    for day in ("2025-01-01", "2025-01-02", "2025-01-03"):
+        path = _write_extract(raw_root, day, b"", manifest=False)
+        with gzip.open(path, "wt") as handle:
+            handle.write("id\n1\n")
+        item = _gcs_item(day, day[-2:])
+        item.file.is_gcs = False
+        item.file.local_path = path
+        items.append(item)
+    jobs = [MagicMock(), MagicMock(), MagicMock()]
+    jobs[0].result.return_value.output_rows = 1
+    jobs[1].result.side_effect = RuntimeError("load failed")
+    jobs[2].result.return_value.output_rows = 1
+    bq_client = MagicMock()
+    bq_client.load_table_from_file.side_effect = jobs
+    bq_client.insert_rows_json.return_value = []
+
+    with pytest.raises(bq_load.BatchLoadError) as excinfo:
+        bq_load.execute_plan(items, bq_client=bq_client)
+
+    assert isinstance(excinfo.value.__cause__, RuntimeError)
+    for load_job in jobs:
+        load_job.result.assert_called_once()
+    log_rows = bq_client.insert_rows_json.call_args.args[1]
+    assert [row["_hash_md5"] for row in log_rows] == ["01", "03"]
+
+
+def test_local_upload_error_waits_on_and_logs_submitted_jobs(raw_root):
+    items = []
+    for day in ("2025-01-01", "2025-01-02"):
+        path = _write_extract(raw_root, day, b"", manifest=False)
+        with gzip.open(path, "wt") as handle:
+            handle.write("id\n1\n")
+        item = _gcs_item(day, day[-2:])
+        item.file.is_gcs = False
+        item.file.local_path = path
+        items.append(item)
+    first = MagicMock()
+    first.result.return_value.output_rows = 1
+    bq_client = MagicMock()
+    bq_client.load_table_from_file.side_effect = [first, ConnectionError("upload failed")]
+    bq_client.insert_rows_json.return_value = []
+
+    with pytest.raises(bq_load.BatchLoadError):
+        bq_load.execute_plan(items, bq_client=bq_client)
+
+    first.result.assert_called_once()
+    log_rows = bq_client.insert_rows_json.call_args.args[1]
+    assert [row["_hash_md5"] for row in log_rows] == ["01"]
@@ -4,7 +4,7 @@ from pathlib import Path
 
 import pytest
 
-from whyline.semantics.dbt_artifacts import DbtArtifacts
+from whyline.semantics.dbt_artifacts import ColumnInfo, DbtArtifacts, LazyColumns
 
 
 @pytest.fixture(scope="module")
@@ -44,3 +44,35 @@ def test_columns_and_descriptions_loaded(artifacts: DbtArtifacts) -> None:
     assert columns["service_date_mst"].type in {"DATE", "DATE32"}
     assert "route_id" in columns
     assert columns["route_id"].description
+
+
+def test_artifacts_are_parsed_once_per_file_version(tmp_path: Path) -> None:
+    (tmp_path / "manifest.json").write_text('{"nodes": {}}', encoding="utf-8")
+    (tmp_path / "catalog.json").write_text('{"nodes": {}}', encoding="utf-8")
+
+    first = DbtArtifacts(target_path=tmp_path)
+    second = DbtArtifacts(target_path=tmp_path)
+    assert first.manifest is second.manifest
+
+    (tmp_path / "manifest.json").write_text('{"nodes": {}, "metadata": {}}', encoding="utf-8")
+    assert DbtArtifacts(target_path=tmp_path).manifest == {"nodes": {}, "metadata": {}}
+
+
+def test_merge_column_names_keeps_first_seen_order() -> None:
+    merged = DbtArtifacts._merge_column_names({"b": {}, "a": {}}, {"a": {}, "c": {}})
+    assert merged == ["b", "a", "c"]
+
+
+def test_columns_are_materialized_on_access() -> None:
+    columns = LazyColumns(
+        ["b", "a"],
+        {"b": {"description": "from manifest", "data_type": "string"}},
+        {"a": {"type": "INT64"}, "b": {"type": "STRING"}},
+    )
+
+    assert list(columns) == ["b", "a"]
+    assert columns._built == {}
+    assert columns["b"] == ColumnInfo(type="STRING", description="from manifest")
+    assert list(columns._built) == ["b"]
+    assert "a" in columns and "c" not in columns
+    assert columns.get("c") is None
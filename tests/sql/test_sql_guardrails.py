@@ -101,3 +101,81 @@ def test_bigquery_allows_configured_namespace():
     )
     sanitized = sanitize_sql(sql, config)
     assert "mart_access_score_by_stop" in sanitized
+
+
+def test_disallowed_keyword_is_named_in_error():
+    sql = "WITH doomed AS (SELECT 1) SELECT * FROM mart_access_score_by_stop TRUNCATE doomed"
+    config = GuardrailConfig(allowed_models={"mart_access_score_by_stop"}, engine="duckdb")
+    with pytest.raises(SqlValidationError) as exc:
+        sanitize_sql(sql, config)
+    assert "TRUNCATE" in str(exc.value)
+
+
+def test_keyword_substrings_in_identifiers_are_allowed():
+    sql = "SELECT load_date, updated_at, copy2 FROM mart_access_score_by_stop"
+    config = GuardrailConfig(allowed_models={"mart_access_score_by_stop"}, engine="duckdb")
+    assert sanitize_sql(sql, config).startswith(sql)
+
+
+def test_allowed_sets_are_compiled_once_per_config():
+    config = GuardrailConfig(
+        allowed_models={"Proj.Mart_Denver.mart_access_score_by_stop"}, engine="bigquery"
+    )
+    sets = config.allowed_sets()
+    assert sets == (
+        frozenset({"mart_access_score_by_stop"}),
+        frozenset({"proj"}),
+        frozenset({"mart_denver"}),
+    )
+    assert config.allowed_sets() is sets
+
+
+def test_multiple_ctes_are_excluded_from_table_checks():
+    config = GuardrailConfig(allowed_models={"mart_a", "mart_b"}, engine="bigquery")
+    sql = (
+        "WITH a AS (SELECT * FROM `proj-x.mart.mart_a` WHERE service_date_mst = '2025-01-01'), "
+        "b AS (SELECT * FROM mart_b) SELECT * FROM a JOIN b USING (route_id)"
+    )
+
+    sanitized = sanitize_sql(sql, config)
+
+    assert sanitized.startswith(sql)
+    with pytest.raises(SqlValidationError, match="mart_c"):
+        sanitize_sql(sql.replace("FROM mart_b", "FROM mart_c"), config)
+
+
+def test_keywords_inside_string_literals_are_ignored():
+    config = GuardrailConfig(allowed_models={"mart_a"}, engine="duckdb")
+    sql = "SELECT 'pulled FROM secret, DELETE it' AS note, 'it''s' AS s FROM mart_a LIMIT 5"
+
+    assert sanitize_sql(sql, config) == sql
+    with pytest.raises(SqlValidationError, match="unauthorized tables: secret"):
+        sanitize_sql("SELECT 'x' AS note FROM secret", config)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        r"SELECT '\'; DROP TABLE mart_a; SELECT '\'",
+        r"SELECT '\' AS a, * FROM secret_table WHERE 'x' = 'x'",
+        r"SELECT '\' AS a, * FROM read_csv_auto('/etc/hostname') WHERE 'x' = 'x'",
+        "SELECT 'a;b' AS a FROM mart_a",
+        "SELECT 1 AS \"it's\" FROM secret_table WHERE 'x' = 'x'",
+        "SELECT 1 -- it's\nFROM secret_table WHERE 'x' = 'x'",
+        "SELECT $$'$$ AS a FROM secret_table WHERE 'x' = 'x'",
+        "SELECT 1 /* /* */ ' */ AS a FROM secret_table WHERE 'x' = 'x'",
+    ],
+)
+def test_duckdb_literal_masking_fails_closed(sql: str):
+    config = GuardrailConfig(allowed_models={"mart_a"}, engine="duckdb")
+    with pytest.raises(SqlValidationError):
+        sanitize_sql(sql, config)
+
+
+def test_bigquery_masks_backslash_escaped_and_triple_quoted_literals():
+    config = GuardrailConfig(allowed_models={"mart_a"}, engine="bigquery")
+    sql = r"SELECT 'it\'s FROM x' AS a, '''y'z FROM x''' AS b FROM mart_a LIMIT 5"
+
+    assert sanitize_sql(sql, config) == sql
+    with pytest.raises(SqlValidationError, match="secret_table"):
+        sanitize_sql("SELECT '''a'b''' AS a FROM secret_table WHERE 'x' = 'x'", config)
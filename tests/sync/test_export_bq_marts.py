@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import threading
 from datetime import UTC, date, datetime
 from typing import Dict, Iterable, Optional
 from unittest.mock import MagicMock
 
+import pytest
+
 from whyline.config import Settings
+from whyline.sync import export_bq_marts
 from whyline.sync.export_bq_marts import ALLOWLISTED_MARTS, MartExporter
 from whyline.sync.state import ExportState
 
@@ -21,6 +25,9 @@ class FakeStateStore:
         self.states[state.mart_name] = state
         self.written.append(state)
 
+    def write_checkpoint(self, state: ExportState) -> None:
+        self.write(state)
+
 
 class FakeQueryJob:
     def __init__(self, rows: Iterable[tuple] = ()) -> None:
@@ -43,10 +50,7 @@ def test_partitioned_mart_exports_new_partitions(monkeypatch):
     )
     state_store = FakeStateStore({mart_name: initial_state})
 
-    partition_rows = [
-        (date(2025, 1, 3),),
-        (date(2025, 1, 4),),
-    ]
+    partition_rows = [("20250102",), ("20250103",), ("20250104",), ("__NULL__",)]
     partition_job = FakeQueryJob(partition_rows)
     export_job = FakeQueryJob()
 
@@ -107,3 +111,119 @@ def test_snapshot_mart_skips_if_already_exported_today():
     assert results == []
     exporter._bq_client.query.assert_not_called()
     assert len(state_store.written) == 0
+
+
+def test_marts_export_concurrently_and_keep_requested_order():
+    marts = ["mart_access_score_by_stop", "mart_priority_hotspots", "mart_weather_impacts"]
+    barrier = threading.Barrier(len(marts), timeout=5)
+
+    def query(sql, **_kwargs):
+        barrier.wait()  # only passes if every snapshot export is in flight at once
+        return FakeQueryJob()
+
+    bq_client = MagicMock()
+    bq_client.query.side_effect = query
+    exporter = MartExporter(
+        Settings(),
+        bq_client=bq_client,
+        storage_client=MagicMock(),
+        state_store=FakeStateStore(),
+        allowlisted_marts=ALLOWLISTED_MARTS,
+    )
+    exporter._now = MagicMock(return_value=datetime(2025, 1, 20, tzinfo=UTC))  # type: ignore[assignment]
+
+    results = exporter.run(marts=marts)
+
+    assert [result.mart_name for result in results] == marts
+
+
+def test_partition_exports_are_submitted_ahead_and_checkpointed_in_order(monkeypatch):
+    monkeypatch.setattr(export_bq_marts, "PARTITION_EXPORT_WINDOW", 2)
+    mart_name = "mart_reliability_by_route_day"
+    events: list[str] = []
+
+    class ExportJob(FakeQueryJob):
+        def __init__(self, label: str) -> None:
+            super().__init__()
+            self.label = label
+
+        def result(self):
+            events.append(f"wait {self.label}")
+            return self
+
+    partitions = [date(2025, 1, day) for day in (3, 4, 5)]
+
+    def query(sql, **_kwargs):
+        if "EXPORT DATA" not in sql:
+            return FakeQueryJob([(day.strftime("%Y%m%d"),) for day in partitions])
+        label = sql.split("DATE('")[1][:10]
+        events.append(f"submit {label}")
+        return ExportJob(label)
+
+    class RecordingStore(FakeStateStore):
+        def write(self, state: ExportState) -> None:
+            super().write(state)
+            events.append(f"state {state.last_service_date}")
+
+    bq_client = MagicMock()
+    bq_client.query.side_effect = query
+    exporter = MartExporter(
+        Settings(),
+        bq_client=bq_client,
+        storage_client=MagicMock(),
+        state_store=RecordingStore(),
+        allowlisted_marts=ALLOWLISTED_MARTS,
+    )
+    exporter._now = MagicMock(return_value=datetime(2025, 1, 10, tzinfo=UTC))  # type: ignore[assignment]
+
+    exporter.run(marts=[mart_name])
+
+    assert events == [
+        "submit 2025-01-03",
+        "submit 2025-01-04",
+        "wait 2025-01-03",
+        "state 2025-01-03",
+        "submit 2025-01-05",
+        "wait 2025-01-04",
+        "state 2025-01-04",
+        "wait 2025-01-05",
+        "state 2025-01-05",
+        "state 2025-01-05",
+    ]
+
+
+def test_unpartitioned_mart_falls_back_to_distinct_scan():
+    bq_client = MagicMock()
+    bq_client.query.side_effect = [
+        FakeQueryJob([(None,)]),
+        FakeQueryJob([(date(2025, 1, 5),), (date(2025, 1, 1),)]),
+    ]
+    exporter = MartExporter(
+        Settings(),
+        bq_client=bq_client,
+        storage_client=MagicMock(),
+        state_store=FakeStateStore(),
+        allowlisted_marts=ALLOWLISTED_MARTS,
+    )
+
+    partitions = exporter._list_partitions_to_export(
+        "mart_reliability_by_route_day", None, date(2025, 1, 2)
+    )
+
+    assert partitions == [date(2025, 1, 5)]
+    assert "INFORMATION_SCHEMA.PARTITIONS" in bq_client.query.call_args_list[0].args[0]
+    assert "SELECT DISTINCT" in bq_client.query.call_args_list[1].args[0]
+
+
+def test_validate_marts_dedupes_in_order_and_rejects_unknown():
+    exporter = MartExporter(
+        Settings(),
+        bq_client=MagicMock(),
+        storage_client=MagicMock(),
+        state_store=FakeStateStore(),
+        allowlisted_marts=("mart_a", "mart_b"),
+    )
+
+    assert exporter._validate_marts(["mart_b", "mart_a", "mart_b"]) == ["mart_b", "mart_a"]
+    with pytest.raises(ValueError, match="Unsupported mart\\(s\\): mart_x, mart_z"):
+        exporter._validate_marts(["mart_z", "mart_a", "mart_x"])
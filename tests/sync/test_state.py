@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from datetime import UTC, date, datetime
+from unittest.mock import MagicMock
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from whyline.sync.state import BQStateStore, CompositeStateStore, ExportState, GCSStateStore
+
+
+def test_bq_state_store_checks_table_once():
+    client = MagicMock(project="proj")
+    client.get_table.side_effect = NotFound("missing")
+    client.query.return_value.__iter__.side_effect = lambda: iter(())
+    store = BQStateStore(client, "mart_denver")
+
+    assert store.load("mart_a") is None
+    store.write(ExportState(mart_name="mart_a", last_service_date=date(2025, 1, 1)))
+    store.load("mart_a")
+
+    client.get_table.assert_called_once_with("proj.mart_denver.__export_state")
+    assert client.create_table.call_count == 1
+    assert client.query.call_count == 3
+
+
+def test_checkpoints_skip_the_bigquery_merge():
+    bq_store, gcs_store = MagicMock(), MagicMock()
+    store = CompositeStateStore(bq_store, gcs_store)
+    state = ExportState(mart_name="mart_a", last_service_date=date(2025, 1, 1))
+
+    store.write_checkpoint(state)
+    store.write(state)
+
+    bq_store.write.assert_called_once_with(state)
+    assert gcs_store.write.call_count == 2
+
+
+def test_composite_loads_are_cached_until_invalidated():
+    bq_store, gcs_store = MagicMock(), MagicMock()
+    bq_store.load.return_value = None
+    gcs_store.load.return_value = None
+    store = CompositeStateStore(bq_store, gcs_store)
+
+    assert store.load("mart_a") is None
+    assert store.load("mart_a") is None
+    state = ExportState(mart_name="mart_a", last_service_date=date(2025, 1, 1))
+    store.write_checkpoint(state)
+    assert store.load("mart_a") is state
+    store.invalidate("mart_a")
+    store.load("mart_a")
+
+    assert bq_store.load.call_count == gcs_store.load.call_count == 2
+
+
+def test_export_state_json_round_trip():
+    state = ExportState(
+        mart_name="mart_a",
+        last_service_date=date(2025, 1, 2),
+        last_run_ts=datetime(2025, 1, 3, 4, 5, tzinfo=UTC),
+    )
+
+    payload = state.to_json()
+
+    assert payload == (
+        '{"mart_name":"mart_a","last_service_date":"2025-01-02",'
+        '"last_run_ts":"2025-01-03T04:05:00Z"}'
+    )
+    assert ExportState.from_json(payload) == state
+
+
+class _GCSBlob:
+    def __init__(self) -> None:
+        self.payload: str | None = None
+        self.generation: int | None = None
+        self.uploads: list[int | None] = []
+
+    def download_as_text(self) -> str:
+        if self.payload is None:
+            raise NotFound("missing")
+        return self.payload
+
+    def upload_from_string(self, payload, *, content_type, if_generation_match):
+        self.uploads.append(if_generation_match)
+        current = self.generation or 0
+        if if_generation_match is not None and if_generation_match != current:
+            raise PreconditionFailed("generation mismatch")
+        self.payload, self.generation = payload, current + 1
+
+
+def _gcs_store(blob: _GCSBlob) -> GCSStateStore:
+    client = MagicMock()
+    client.bucket.return_value.blob.return_value = blob
+    return GCSStateStore(client, "bucket")
+
+
+def test_gcs_marker_uploads_are_conditional_and_skip_unchanged_payloads():
+    blob = _GCSBlob()
+    store = _gcs_store(blob)
+    state = ExportState("mart_a", date(2025, 1, 1), datetime(2025, 1, 2, tzinfo=UTC))
+
+    assert store.load("mart_a") is None
+    store.write(state)
+    store.write(state)
+
+    assert blob.uploads == [0]
+
+    rival = _gcs_store(blob)
+    rival.load("mart_a")
+    newer = ExportState("mart_a", date(2025, 1, 5), datetime(2025, 1, 6, tzinfo=UTC))
+    rival.write(newer)
+    store.write(ExportState("mart_a", date(2025, 1, 3), datetime(2025, 1, 4, tzinfo=UTC)))
+
+    assert ExportState.from_json(blob.payload) == newer
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from google.api_core.exceptions import NotFound, NotModified
+
+from whyline.sync import state_store
+
+
+class _Blob:
+    def __init__(self, store: dict) -> None:
+        self.store = store
+        self.generation = None
+        self.calls: list[dict] = []
+
+    def download_as_bytes(self, **kwargs):
+        self.calls.append(kwargs)
+        if "payload" not in self.store:
+            raise NotFound("missing")
+        if kwargs.get("if_generation_not_match") == self.store["generation"]:
+            raise NotModified("unchanged")
+        self.generation = self.store["generation"]
+        return self.store["payload"]
+
+
+@pytest.fixture()
+def remote(monkeypatch):
+    store: dict = {}
+    blob = _Blob(store)
+    client = type("Client", (), {})()
+    client.bucket = lambda _name: type("Bucket", (), {"blob": lambda _self, _name: blob})()
+    monkeypatch.setenv("SYNC_STATE_GCS_BUCKET", "bucket")
+    monkeypatch.setattr(state_store, "_ensure_storage_client", lambda: client)
+    monkeypatch.setattr(state_store, "_REMOTE_STATE_CACHE", {})
+    return store, blob
+
+
+def test_download_sync_state_reports_missing_blob_without_exists_check(remote, tmp_path):
+    path = tmp_path / "sync_state.json"
+
+    assert state_store.download_sync_state(path=path) is False
+    assert not path.exists()
+
+
+def test_unchanged_remote_state_is_not_downloaded_again(remote, tmp_path):
+    store, blob = remote
+    store.update(payload=json.dumps({"duckdb_synced_at_utc": "a"}).encode(), generation=1)
+
+    first = state_store.load_sync_state(path=tmp_path / "s.json")
+    second = state_store.load_sync_state(path=tmp_path / "s.json")
+    store.update(payload=json.dumps({"duckdb_synced_at_utc": "b"}).encode(), generation=2)
+    third = state_store.load_sync_state(path=tmp_path / "s.json")
+
+    assert first == second == {"duckdb_synced_at_utc": "a"}
+    assert third == {"duckdb_synced_at_utc": "b"}
+    assert blob.calls == [{}, {"if_generation_not_match": 1}, {"if_generation_not_match": 1}]